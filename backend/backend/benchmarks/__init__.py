@@ -0,0 +1,5 @@
+"""Offline benchmarks for the LazyPOD backend.
+
+Run from ``backend/backend`` with ``python -m benchmarks.<module>``. Every benchmark
+works on a throwaway test database, so the development database is never touched.
+"""
@@ -0,0 +1,51 @@
+"""Query count and wall time of ``POST /api/drafts/bulk`` for growing batch sizes."""
+
+import argparse
+
+from benchmarks.common import setup, test_database, timed
+
+
+def run(sizes: list[int], assets_per_draft: int = 3) -> list[dict]:
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    from core.models import DesignAsset, Template
+
+    client = APIClient()
+    template = Template.objects.create(name="Bench", gelato_template_id="gelato-bench-bulk")
+    asset_ids = [
+        DesignAsset.objects.create(file=f"assets/bench-{index}.png", original_filename=f"bench-{index}.png").id
+        for index in range(assets_per_draft)
+    ]
+
+    rows = []
+    for size in sizes:
+        payload = {
+            "drafts": [
+                {"template_id": template.id, "title": f"Bench {index}", "price": "9.99", "asset_ids": asset_ids}
+                for index in range(size)
+            ]
+        }
+        timings = {}
+        with CaptureQueriesContext(connection) as ctx, timed(timings, "seconds"):
+            response = client.post("/api/drafts/bulk", payload, format="json")
+        assert response.status_code == 201, response.content
+        rows.append({"drafts": size, "queries": len(ctx.captured_queries), "seconds": timings["seconds"]})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,100,500,2000")
+    args = parser.parse_args()
+
+    setup()
+    with test_database():
+        rows = run([int(size) for size in args.sizes.split(",")])
+    for row in rows:
+        print(f"{row['drafts']:>6} drafts  {row['queries']:>3} queries  {row['seconds'] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Per-page latency of ``GET /api/drafts`` over a large seeded catalog.
+
+Seeds ``--drafts`` drafts (two assets each) and walks ``--pages`` consecutive pages
+for each projection, reporting p50/p95 latency. ``--max-p95-ms`` turns the run
+into a pass/fail check.
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.common import percentile, setup, test_database
+
+PROJECTIONS = {
+    "full": {},
+    "ids-only": {"expand": ""},
+    "summary": {"fields": "id,title,status,price", "expand": ""},
+}
+
+
+def seed(drafts: int, batch: int = 5000) -> None:
+    from core.models import DesignAsset, ProductDraft, Template
+
+    templates = Template.objects.bulk_create(
+        [Template(name=f"Template {index}", gelato_template_id=f"bench-{index}") for index in range(10)]
+    )
+    assets = DesignAsset.objects.bulk_create(
+        [DesignAsset(file=f"assets/bench-{index}.png", original_filename=f"bench-{index}.png") for index in range(50)]
+    )
+    through = ProductDraft.assets.through
+    statuses = [choice for choice, _label in ProductDraft.Status.choices]
+    for start in range(0, drafts, batch):
+        created = ProductDraft.objects.bulk_create(
+            [
+                ProductDraft(
+                    template=templates[index % len(templates)],
+                    title=f"Draft {index}",
+                    tags=["bench"],
+                    price="19.99",
+                    status=statuses[index % len(statuses)],
+                )
+                for index in range(start, min(start + batch, drafts))
+            ]
+        )
+        through.objects.bulk_create(
+            [
+                through(productdraft_id=draft.id, designasset_id=assets[(draft.id + offset) % len(assets)].id)
+                for draft in created
+                for offset in (0, 1)
+            ]
+        )
+
+
+def walk(params: dict, pages: int, limit: int) -> list[float]:
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    latencies = []
+    query = {**params, "limit": limit}
+    for _ in range(pages):
+        started = time.perf_counter()
+        response = client.get("/api/drafts", query)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.content
+        cursor = response.get("X-Next-Cursor")
+        if not cursor:
+            break
+        query["cursor"] = cursor
+    return latencies
+
+
+def run(drafts: int, pages: int, limit: int) -> dict:
+    seed(drafts)
+    results = {}
+    for name, params in PROJECTIONS.items():
+        latencies = walk(params, pages, limit)
+        results[name] = {"p50_ms": percentile(latencies, 50) * 1000, "p95_ms": percentile(latencies, 95) * 1000}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drafts", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--max-p95-ms", type=float)
+    args = parser.parse_args()
+
+    setup()
+    with test_database():
+        results = run(args.drafts, args.pages, args.limit)
+
+    failed = False
+    for name, row in results.items():
+        print(f"{name:>9}: p50 {row['p50_ms']:7.1f} ms  p95 {row['p95_ms']:7.1f} ms")
+        failed |= args.max_p95_ms is not None and row["p95_ms"] > args.max_p95_ms
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
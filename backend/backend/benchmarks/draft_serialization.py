@@ -0,0 +1,62 @@
+"""Time to fetch, serialize and render 1,000 drafts: ``ProductDraftSerializer`` vs ``DraftReader``."""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import setup, test_database
+
+
+def seed(drafts: int) -> None:
+    from benchmarks.draft_pagination import seed as seed_catalog
+
+    seed_catalog(drafts, batch=drafts)
+
+
+def measure(callback, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        callback()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def run(drafts: int, repeat: int) -> dict:
+    from rest_framework.renderers import JSONRenderer
+
+    from core.drafts import DraftProjection, DraftReader
+    from core.models import ProductDraft
+    from core.renderers import FastJSONRenderer
+    from core.serializers import ProductDraftSerializer
+
+    seed(drafts)
+    reader = DraftReader(DraftProjection())
+
+    def current():
+        queryset = ProductDraft.objects.select_related("template").prefetch_related("assets").order_by("-id")
+        return JSONRenderer().render(ProductDraftSerializer(queryset, many=True).data)
+
+    def fast():
+        return FastJSONRenderer().render(reader.render(list(reader.queryset().order_by("-id"))))
+
+    assert current() == fast()
+    return {"serializer_ms": measure(current, repeat) * 1000, "reader_ms": measure(fast, repeat) * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drafts", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    setup()
+    with test_database():
+        result = run(args.drafts, args.repeat)
+    print(f"ProductDraftSerializer: {result['serializer_ms']:8.1f} ms per {args.drafts} drafts")
+    print(f"DraftReader:            {result['reader_ms']:8.1f} ms per {args.drafts} drafts")
+    print(f"speedup:                {result['serializer_ms'] / result['reader_ms']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Peak memory and throughput of the streaming draft import and export.
+
+For each ``--rows`` size, writes a CSV file to disk, imports it with
+``core.transfer.import_drafts`` straight from the open file (as the view does with
+an upload Django has spooled to disk), then downloads ``GET /api/drafts/export``
+chunk by chunk. Each step runs once for time and once under ``tracemalloc``;
+the peaks should stay flat as the files grow. ``--max-growth-pct`` turns the run
+into a pass/fail check against the smallest size.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import setup, test_database
+
+
+def write_csv(path: Path, rows: int, template_ids: list[int], asset_ids: list[int]) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        handle.write("template_id,title,description,tags,price,asset_ids\n")
+        for index in range(rows):
+            assets = f"{asset_ids[index % len(asset_ids)]}|{asset_ids[(index + 1) % len(asset_ids)]}"
+            handle.write(
+                f"{template_ids[index % len(template_ids)]},Draft {index},Imported draft {index},a|b,19.99,{assets}\n"
+            )
+
+
+def measure(function, reset=lambda: None) -> tuple[float, int]:
+    reset()
+    started = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - started
+    reset()
+    tracemalloc.start()
+    try:
+        function()
+        return seconds, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(rows: int, workdir: Path) -> dict:
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient, override_settings
+
+    from benchmarks.suite import seed
+    from core.models import DesignAsset, ProductDraft, Template
+    from core.transfer import import_drafts
+
+    for model in (ProductDraft, DesignAsset, Template):
+        model.objects.all().delete()
+    with override_settings(MEDIA_ROOT=workdir / "media"):
+        seed(templates=5, assets=10, drafts=0)
+    path = workdir / f"drafts-{rows}.csv"
+    write_csv(
+        path,
+        rows,
+        list(Template.objects.values_list("id", flat=True)),
+        list(DesignAsset.objects.values_list("id", flat=True)),
+    )
+
+    def upload():
+        with path.open("rb") as handle:
+            report = import_drafts(handle, "csv")
+        assert report.created == rows, report.as_dict()
+
+    async def download():
+        response = await AsyncClient().get("/api/drafts/export", {"format": "csv"})
+        async for _chunk in response.streaming_content:
+            pass
+
+    import_seconds, import_peak = measure(upload, reset=ProductDraft.objects.all().delete)
+    export_seconds, export_peak = measure(async_to_sync(download))
+    return {
+        "rows": rows,
+        "file_mb": path.stat().st_size / 1e6,
+        "import_rows_per_s": rows / import_seconds,
+        "import_peak_kb": import_peak / 1024,
+        "export_rows_per_s": rows / export_seconds,
+        "export_peak_kb": export_peak / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--max-growth-pct", type=float, default=None)
+    args = parser.parse_args()
+
+    setup()
+    results = []
+    with test_database(), tempfile.TemporaryDirectory(prefix="lazypod-transfer-") as workdir:
+        for rows in sorted(args.rows):
+            row = run(rows, Path(workdir))
+            results.append(row)
+            print(
+                f"{row['rows']:>8} rows ({row['file_mb']:6.1f} MB): "
+                f"import {row['import_rows_per_s']:7.0f} rows/s, peak {row['import_peak_kb']:8.0f} KB; "
+                f"export {row['export_rows_per_s']:7.0f} rows/s, peak {row['export_peak_kb']:8.0f} KB"
+            )
+
+    if args.max_growth_pct is not None:
+        smallest, largest = results[0], results[-1]
+        for key in ("import_peak_kb", "export_peak_kb"):
+            growth = (largest[key] - smallest[key]) / smallest[key] * 100
+            if growth > args.max_growth_pct:
+                print(f"FAIL: {key} grew {growth:.0f}% from {smallest['rows']} to {largest['rows']} rows")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Batch preview/metadata extraction: one image at a time vs the process pool.
+
+Generates ``--images`` noisy JPEGs of ``--width`` x ``--height`` pixels in memory and
+runs ``analyze_many`` over them with ``ASSET_IMAGE_WORKERS`` set to 1 and to ``--workers``.
+"""
+
+import argparse
+import time
+
+from benchmarks.common import setup
+
+
+def make_images(count: int, width: int, height: int) -> list[bytes]:
+    import io
+
+    from PIL import Image
+
+    images = []
+    for index in range(count):
+        buffer = io.BytesIO()
+        image = Image.effect_noise((width, height), 40 + index).convert("RGB")
+        image.save(buffer, format="JPEG", quality=90, dpi=(300, 300))
+        images.append(buffer.getvalue())
+    return images
+
+
+def run(images: list[bytes], workers: int) -> float:
+    from django.conf import settings
+
+    from core.imaging import analyze_many
+
+    settings.ASSET_IMAGE_WORKERS = workers
+    started = time.perf_counter()
+    reports = analyze_many(images, settings.ASSET_PREVIEW_SIZES)
+    elapsed = time.perf_counter() - started
+    assert not any(isinstance(report, str) for report in reports), reports
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    setup()
+    images = make_images(args.images, args.width, args.height)
+    serial = run(images, 1)
+    # The worker keeps its pool for its lifetime, so start the interpreters before timing.
+    run(images[: args.workers], args.workers)
+    pooled = run(images, args.workers)
+    print(f"serial:            {serial:6.2f} s for {args.images} images")
+    print(f"pool ({args.workers} workers): {pooled:6.2f} s for {args.images} images")
+    print(f"speedup:           {serial / pooled:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
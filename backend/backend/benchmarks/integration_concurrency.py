@@ -0,0 +1,179 @@
+"""Concurrent ``POST /api/integrations/gelato`` load against WSGI and ASGI servers.
+
+A local stub stands in for Gelato and answers each key check after ``--delay``
+seconds, like a slow remote API. Each server under test is started as a
+subprocess on a throwaway SQLite database with ``GELATO_API_URL`` pointing at the
+stub, then hit with ``--concurrency`` simultaneous requests.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import percentile
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SERVERS = {
+    "wsgi-runserver": ["manage.py", "runserver", "--noreload", "127.0.0.1:{port}"],
+    "wsgi-4-threads": ["-m", "benchmarks.integration_concurrency", "wsgi", "--port", "{port}", "--threads", "4"],
+    "asgi-uvicorn": ["-m", "uvicorn", "config.asgi:application", "--port", "{port}", "--log-level", "warning"],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(delay: float) -> ThreadingHTTPServer:
+    class SlowGelatoHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(delay)
+            body = b'{"data": []}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowGelatoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_wsgi_with_threads(port: int, threads: int) -> None:
+    """Serve the WSGI app with a fixed thread pool, like a gthread worker."""
+    from concurrent.futures import ThreadPoolExecutor
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+    from config.wsgi import application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PooledWSGIServer(WSGIServer):
+        request_queue_size = 1024
+        pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledWSGIServer(("127.0.0.1", port), QuietHandler)
+    server.set_app(application)
+    server.serve_forever()
+
+
+async def fire(url: str, concurrency: int) -> dict:
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=concurrency)) as client:
+
+        async def one() -> tuple[float, int]:
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json={"apiKey": "bench"})
+                code = response.status_code
+            except httpx.HTTPError:
+                code = 0
+            return time.perf_counter() - started, code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies = [latency for latency, _ in results]
+    return {
+        "ok": sum(1 for _, code in results if code == 200),
+        "errors": sum(1 for _, code in results if code != 200),
+        "seconds": elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+    }
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up")
+
+
+def run(servers: list[str], concurrency: int, delay: float) -> list[dict]:
+    stub = start_stub(delay)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.sqlite3",
+            "GELATO_API_URL": f"http://127.0.0.1:{stub.server_port}",
+            "DEBUG": "false",
+            "HTTP_CLIENT_POOL_SIZE": str(concurrency),
+        }
+        subprocess.run([sys.executable, "manage.py", "migrate", "-v", "0"], cwd=BACKEND_DIR, env=env, check=True)
+        for name in servers:
+            port = free_port()
+            command = [sys.executable, *(part.format(port=port) for part in SERVERS[name])]
+            process = subprocess.Popen(
+                command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_until_up(f"http://127.0.0.1:{port}/api/health")
+                result = asyncio.run(fire(f"http://127.0.0.1:{port}/api/integrations/gelato", concurrency))
+                rows.append({"server": name, **result})
+            finally:
+                process.terminate()
+                process.wait()
+    stub.shutdown()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    subcommands = parser.add_subparsers(dest="command")
+    wsgi = subcommands.add_parser("wsgi", help="internal: serve WSGI with a fixed thread pool")
+    wsgi.add_argument("--port", type=int, required=True)
+    wsgi.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--servers", default=",".join(SERVERS))
+    args = parser.parse_args()
+
+    if args.command == "wsgi":
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+        serve_wsgi_with_threads(args.port, args.threads)
+        return
+
+    for row in run(args.servers.split(","), args.concurrency, args.delay):
+        print(
+            f"{row['server']:>16}: {row['ok']} ok, {row['errors']} errors in {row['seconds']:.2f}s "
+            f"(p50 {row['p50']:.2f}s, p95 {row['p95']:.2f}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Asset upload cost of a Shopify batch push: staged uploads in parallel and reused across drafts.
+
+Pushes ``--drafts`` drafts that share ``--assets`` artwork files of ``--mb``
+megabytes against a fake Shopify whose staged-upload target takes
+``--upload-ms`` per file. Runs the same batch with one upload in flight and with
+``--concurrency``, then pushes a second batch over the same assets, which should
+upload nothing. The upload count is compared to one upload per draft and asset.
+"""
+
+import argparse
+import itertools
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import setup, test_database
+
+
+class FakeShopify:
+    def __init__(self, upload_ms: float):
+        self.upload_ms = upload_ms
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                remaining = int(self.headers.get("Content-Length") or 0)
+                if self.path == "/upload":
+                    while remaining:
+                        remaining -= len(self.rfile.read(min(remaining, 1 << 20)))
+                    time.sleep(fake.upload_ms / 1000)
+                    with fake.lock:
+                        fake.uploads += 1
+                        fake.uploaded_bytes += int(self.headers["Content-Length"])
+                    return self.reply(201, {})
+                request = json.loads(self.rfile.read(remaining))
+                self.reply(200, {"data": fake.answer(request["query"], request["variables"], self.server)})
+
+            def reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def answer(self, query: str, variables: dict, server) -> dict:
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        if "stagedUploadsCreate" in query:
+            targets = [
+                {"url": f"{base_url}/upload", "resourceUrl": f"{base_url}/staged/{next(self.ids)}", "parameters": []}
+                for _file in variables["input"]
+            ]
+            return {"stagedUploadsCreate": {"stagedTargets": targets, "userErrors": []}}
+        if "fileCreate" in query:
+            files = [{"id": f"gid://shopify/MediaImage/{next(self.ids)}"} for _file in variables["files"]]
+            return {"fileCreate": {"files": files, "userErrors": []}}
+        if "fileUpdate" in query:
+            return {"fileUpdate": {"files": [], "userErrors": []}}
+        if "productVariantsBulkUpdate" in query:
+            return {"productVariantsBulkUpdate": {"productVariants": [], "userErrors": []}}
+        variants = {"nodes": [{"id": f"gid://shopify/ProductVariant/{next(self.ids)}"}]}
+        product = {"id": f"gid://shopify/Product/{next(self.ids)}", "variants": variants}
+        return {"productCreate": {"product": product, "userErrors": []}}
+
+
+def run(concurrency: int, args, media_root: str) -> dict:
+    from unittest import mock
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import override_settings
+
+    from core.integrations import IntegrationStore
+    from core.models import (
+        DesignAsset,
+        IntegrationConnection,
+        ProductDraft,
+        ShopifyFile,
+        Template,
+    )
+    from core.tasks import push_drafts_to_shopify_batch
+
+    fake = FakeShopify(args.upload_ms)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), fake.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    graphql_url = f"http://127.0.0.1:{server.server_port}/graphql.json"
+    overrides = {
+        "USE_MOCK_APIS": False,
+        "MEDIA_ROOT": media_root,
+        "SHOPIFY_MEDIA_UPLOAD_CONCURRENCY": concurrency,
+        "SHOPIFY_PUSH_BATCH_SIZE": args.drafts,
+        # The fake reports no query cost; keep the limiter out of the timings.
+        "SHOPIFY_THROTTLE_MAXIMUM": 1e9,
+        "SHOPIFY_THROTTLE_RESTORE_RATE": 1e9,
+    }
+    try:
+        with override_settings(**overrides), mock.patch("core.services.shopify_graphql_url", lambda shop: graphql_url):
+            connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.SHOPIFY)
+            IntegrationStore.set_secret(connection, {"shop": "bench.myshopify.com", "accessToken": "x"})
+            for model in (ShopifyFile, ProductDraft, DesignAsset, Template):
+                model.objects.all().delete()
+            template = Template.objects.create(name="Bench", gelato_template_id="bench")
+            content = b"\0" * int(args.mb * 1e6)
+            assets = [
+                DesignAsset.objects.create(
+                    file=SimpleUploadedFile(f"art-{index}.png", content),
+                    original_filename=f"art-{index}.png",
+                    mime_type="image/png",
+                    sha256=f"{index:064d}",
+                )
+                for index in range(args.assets)
+            ]
+
+            def batch(offset: int) -> list[int]:
+                drafts = ProductDraft.objects.bulk_create(
+                    [
+                        ProductDraft(template=template, title=f"Draft {offset + index}", price="9.99", status="queued")
+                        for index in range(args.drafts)
+                    ]
+                )
+                for index, draft in enumerate(drafts):
+                    draft.assets.set([assets[index % len(assets)], assets[(index + 1) % len(assets)]])
+                return [draft.id for draft in drafts]
+
+            first = batch(0)
+            started = time.perf_counter()
+            push_drafts_to_shopify_batch.apply(args=[first])
+            first_seconds = time.perf_counter() - started
+            first_uploads = fake.uploads
+
+            second = batch(args.drafts)
+            started = time.perf_counter()
+            push_drafts_to_shopify_batch.apply(args=[second])
+            second_seconds = time.perf_counter() - started
+            pushed = ProductDraft.objects.filter(status=ProductDraft.Status.PUSHED).count()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        "concurrency": concurrency,
+        "pushed": pushed,
+        "first_seconds": first_seconds,
+        "first_uploads": first_uploads,
+        "second_seconds": second_seconds,
+        "second_uploads": fake.uploads - first_uploads,
+        "uploaded_mb": fake.uploaded_bytes / 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drafts", type=int, default=100)
+    parser.add_argument("--assets", type=int, default=16)
+    parser.add_argument("--mb", type=float, default=2.0)
+    parser.add_argument("--upload-ms", type=float, default=250)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    setup()
+    with test_database(), tempfile.TemporaryDirectory(prefix="lazypod-media-") as media_root:
+        for concurrency in (1, args.concurrency):
+            row = run(concurrency, args, media_root)
+            print(
+                f"concurrency {row['concurrency']:>2}: {row['pushed']} pushed; first batch {row['first_seconds']:5.2f}s "
+                f"with {row['first_uploads']} uploads ({row['uploaded_mb']:.0f} MB); second batch "
+                f"{row['second_seconds']:5.2f}s with {row['second_uploads']} uploads; "
+                f"{2 * args.drafts * 2} uploads inline"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Cost of the metrics hooks on the hot paths.
+
+Times ``Histogram.observe`` and the per-query wrapper in isolation, then
+``GET /api/health`` and ``GET /api/drafts`` with and without
+``MetricsMiddleware``, alternating rounds so drift hits both sides equally.
+``--max-overhead-pct`` turns the run into a pass/fail check.
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.common import percentile, setup, test_database
+
+
+def per_call_ns(function, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def micro(calls: int) -> dict:
+    from django.db import connection
+
+    from core.metrics import QueryStats, _query_stats, http_request_seconds
+
+    def run_query():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    results = {"observe_ns": per_call_ns(lambda: http_request_seconds.observe(0.01, "GET", "bench", 200), calls)}
+    results["query_idle_ns"] = per_call_ns(run_query, calls)
+    token = _query_stats.set(QueryStats())
+    try:
+        results["query_counted_ns"] = per_call_ns(run_query, calls)
+    finally:
+        _query_stats.reset(token)
+    return results
+
+
+def request_latencies(path: str, requests: int, rounds: int) -> dict[str, list[float]]:
+    from django.conf import settings
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    without = [entry for entry in settings.MIDDLEWARE if entry != "core.metrics.MetricsMiddleware"]
+    samples = {"with": [], "without": []}
+    for _ in range(rounds):
+        for variant, middleware in (("with", settings.MIDDLEWARE), ("without", without)):
+            with override_settings(MIDDLEWARE=middleware):
+                client = APIClient()
+                client.get(path)  # warm the handler's middleware chain
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    client.get(path)
+                    samples[variant].append(time.perf_counter() - started)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--drafts", type=int, default=50)
+    parser.add_argument("--max-overhead-pct", type=float, default=None)
+    args = parser.parse_args()
+
+    setup()
+    from benchmarks.draft_pagination import seed
+
+    with test_database():
+        seed(args.drafts)
+        for name, value in micro(args.calls).items():
+            print(f"{name:>17}: {value:8.0f} ns")
+        worst = 0.0
+        for path in ("/api/health", "/api/drafts"):
+            samples = request_latencies(path, args.requests, args.rounds)
+            with_p50 = percentile(samples["with"], 50) * 1e6
+            without_p50 = percentile(samples["without"], 50) * 1e6
+            overhead = (with_p50 - without_p50) / without_p50 * 100
+            worst = max(worst, overhead)
+            print(f"{path:>17}: p50 {without_p50:7.0f} us -> {with_p50:7.0f} us with metrics ({overhead:+.1f}%)")
+
+    if args.max_overhead_pct is not None and worst > args.max_overhead_pct:
+        print(f"FAIL: overhead {worst:.1f}% exceeds {args.max_overhead_pct}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
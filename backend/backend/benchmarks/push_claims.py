@@ -0,0 +1,96 @@
+"""Many worker processes draining the same push batches; every draft must reach Shopify once.
+
+Seeds ``--drafts`` queued drafts, then forks ``--workers`` processes that each run
+``push_drafts_to_shopify_batch`` over *every* batch, in a different order: the worst
+case of duplicate delivery. Remote calls are counted per draft. Uses ``DATABASE_URL``
+when set (Postgres exercises ``SKIP LOCKED``), else a file-backed SQLite database.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.common import setup
+
+
+def seed(drafts: int) -> list[int]:
+    from core.models import ProductDraft, Template
+
+    template = Template.objects.create(name="Claims", gelato_template_id=f"claims-{time.time_ns()}")
+    created = ProductDraft.objects.bulk_create(
+        [
+            ProductDraft(template=template, title=f"Draft {index}", price="9.99", status=ProductDraft.Status.QUEUED)
+            for index in range(drafts)
+        ]
+    )
+    return [draft.id for draft in created]
+
+
+def worker(job: tuple[int, list[list[int]], float]) -> list[int]:
+    from core.services import PushResult, ShopifyAdapter
+    from core.tasks import push_drafts_to_shopify_batch
+
+    seed_value, batches, latency = job
+    calls = []
+
+    def create_product(self, draft_id, title, fields=None):
+        calls.append(draft_id)
+        time.sleep(latency)
+        return PushResult(external_id=f"bench-{draft_id}-{seed_value}", payload={"title": title})
+
+    ShopifyAdapter.create_product = create_product
+    order = list(batches)
+    random.Random(seed_value).shuffle(order)
+    for batch in order:
+        push_drafts_to_shopify_batch.apply(args=[batch])
+    return calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drafts", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--database", help="SQLite file to use instead of DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.database or not os.getenv("DATABASE_URL"):
+        path = args.database or os.path.join(tempfile.mkdtemp(), "claims.sqlite3")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    setup()
+
+    from django.core.management import call_command
+    from django.db import connections
+
+    from core.drafts import chunked
+    from core.models import ProductDraft
+
+    connections["default"].settings_dict["OPTIONS"].setdefault("timeout", 60)
+    call_command("migrate", verbosity=0)
+    draft_ids = seed(args.drafts)
+    batches = list(chunked(draft_ids, args.batch_size))
+    connections.close_all()
+
+    started = time.perf_counter()
+    context = multiprocessing.get_context("fork")
+    with context.Pool(args.workers) as pool:
+        jobs = [(index, batches, args.latency_ms / 1000) for index in range(args.workers)]
+        calls = Counter(draft_id for worker_calls in pool.map(worker, jobs) for draft_id in worker_calls)
+    elapsed = time.perf_counter() - started
+
+    duplicates = sum(count - 1 for count in calls.values() if count > 1)
+    pushed = ProductDraft.objects.filter(id__in=draft_ids, status=ProductDraft.Status.PUSHED).count()
+    print(f"drafts: {len(draft_ids)}, workers: {args.workers}, remote calls: {sum(calls.values())}")
+    print(f"duplicate remote calls: {duplicates}")
+    print(f"pushed: {pushed} in {elapsed:.2f}s ({pushed / elapsed:.0f} drafts/s)")
+    sys.exit(0 if duplicates == 0 and pushed == len(draft_ids) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Single-draft push latency while a large batch push drains, with shared vs dedicated workers.
+
+Queues a ``--batch-drafts`` batch push, then pushes ``--singles`` drafts one at a time
+and measures each from the API call until the draft is ``pushed``. ``shared`` runs
+one worker over every queue (the old single-queue setup); ``dedicated`` runs the
+interactive and bulk pools from docker-compose. Offline like ``benchmarks.suite``;
+``--shopify-latency-ms`` gives every mock product create a realistic round trip.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile, setup
+from benchmarks.suite import (
+    BACKEND_DIR,
+    all_queues,
+    configure_environment,
+    wait_until_pushed,
+)
+
+
+def start_workers(layout: str, concurrency: int) -> list[subprocess.Popen]:
+    if layout == "shared":
+        pools = [(all_queues(), concurrency * 2)]
+    else:
+        pools = [("interactive", concurrency), ("bulk", concurrency)]
+    return [
+        subprocess.Popen(
+            [sys.executable, "-m", "celery", "-A", "config", "worker", "-Q", queues, "-c", str(size)]
+            + ["-n", f"{layout}-{index}@%h", "-l", "warning"],
+            cwd=BACKEND_DIR,
+            env=os.environ.copy(),
+        )
+        for index, (queues, size) in enumerate(pools)
+    ]
+
+
+def run(layout: str, batch_drafts: int, singles: int, interval: float, concurrency: int) -> dict:
+    from django.db import connections
+    from rest_framework.test import APIClient
+
+    from benchmarks.suite import seed
+    from core.models import DesignAsset, ProductDraft, Template
+    from core.tasks import relay_outbox
+
+    for model in (ProductDraft, DesignAsset, Template):
+        model.objects.all().delete()
+    seed(templates=5, assets=10, drafts=batch_drafts + singles)
+    draft_ids = list(ProductDraft.objects.order_by("id").values_list("id", flat=True))
+    batch, single_ids = draft_ids[:batch_drafts], draft_ids[batch_drafts:]
+    client = APIClient()
+
+    connections.close_all()
+    workers = start_workers(layout, concurrency)
+    try:
+        time.sleep(3)
+        started = time.perf_counter()
+        assert client.post("/api/drafts/push", {"draft_ids": batch}, format="json").status_code == 202
+        relay_outbox()
+        latencies = []
+        for draft_id in single_ids:
+            time.sleep(interval)
+            assert client.post(f"/api/drafts/{draft_id}/push").status_code == 202
+            latencies.append(wait_until_pushed([draft_id], 300, relay_outbox))
+        batch_seconds = wait_until_pushed(batch, 1800, relay_outbox) + (time.perf_counter() - started)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait(30)
+    return {
+        "layout": layout,
+        "single_p50_ms": percentile(latencies, 50) * 1000,
+        "single_p95_ms": percentile(latencies, 95) * 1000,
+        "batch_seconds": batch_seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-drafts", type=int, default=10_000)
+    parser.add_argument("--singles", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--shopify-latency-ms", type=float, default=100)
+    parser.add_argument("--broker", help="broker URL (default: a temporary filesystem broker)")
+    args = parser.parse_args()
+
+    os.environ["SHOPIFY_MOCK_LATENCY_MS"] = str(args.shopify_latency_ms)
+    configure_environment(args, Path(tempfile.mkdtemp(prefix="lazypod-queues-")))
+    setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    for layout in ("shared", "dedicated"):
+        row = run(layout, args.batch_drafts, args.singles, args.interval, args.concurrency)
+        print(
+            f"{row['layout']:>9}: single push p50 {row['single_p50_ms']:8.0f} ms, p95 {row['single_p95_ms']:8.0f} ms; "
+            f"batch of {args.batch_drafts} done after {row['batch_seconds']:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
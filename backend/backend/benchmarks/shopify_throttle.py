@@ -0,0 +1,160 @@
+"""Simulated push throughput against a fake Shopify GraphQL server with a cost bucket.
+
+Compares the old behaviour (fire requests, let Celery's ``retry_backoff`` retry a
+throttled push after 1s/2s/4s with full jitter) with ``ShopifyCostLimiter`` pacing
+shared by every worker thread.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import setup
+
+
+class LeakyBucket:
+    def __init__(self, maximum: float, restore_rate: float):
+        self.maximum = maximum
+        self.restore_rate = restore_rate
+        self.available = maximum
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.throttled = 0
+
+    def spend(self, cost: float) -> tuple[bool, float]:
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.maximum, self.available + (now - self.updated_at) * self.restore_rate)
+            self.updated_at = now
+            if self.available < cost:
+                self.throttled += 1
+                return False, self.available
+            self.available -= cost
+            return True, self.available
+
+
+def make_handler(bucket: LeakyBucket, cost: float):
+    class FakeShopifyHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            ok, available = bucket.spend(cost)
+            extensions = {
+                "cost": {
+                    "requestedQueryCost": cost,
+                    "actualQueryCost": cost if ok else None,
+                    "throttleStatus": {
+                        "maximumAvailable": bucket.maximum,
+                        "currentlyAvailable": available,
+                        "restoreRate": bucket.restore_rate,
+                    },
+                }
+            }
+            if ok:
+                product = {"id": f"gid://shopify/Product/{random.randint(1, 10**9)}", "title": "bench"}
+                payload = {"data": {"productCreate": {"product": product, "userErrors": []}}, "extensions": extensions}
+            else:
+                payload = {
+                    "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                    "extensions": extensions,
+                }
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeShopifyHandler
+
+
+class NoopLimiter:
+    def acquire(self, cost):
+        return 0.0
+
+    def update(self, cost):
+        pass
+
+
+def simulate(mode: str, products: int, workers: int, maximum: float, restore_rate: float, cost: float) -> dict:
+    from django.core.cache.backends.locmem import LocMemCache
+    from django.test import override_settings
+
+    from core.http import HttpClient
+    from core.ratelimit import ShopifyCostLimiter
+    from core.services import ExternalServiceError, ShopifyAdapter
+
+    bucket = LeakyBucket(maximum, restore_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(bucket, cost))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}/graphql.json"
+    shared_cache = LocMemCache(f"bench-{mode}", {})
+    client = HttpClient(max_retries=0)
+
+    def push(draft_id: int) -> bool:
+        limiter = NoopLimiter() if mode == "blind" else ShopifyCostLimiter("bench.myshopify.com", backend=shared_cache)
+        adapter = ShopifyAdapter(
+            shop="bench.myshopify.com", access_token="x", api_url=api_url, client=client, limiter=limiter
+        )
+        for retries in range(4):
+            try:
+                adapter.create_product(draft_id=draft_id, title="bench")
+                return True
+            except ExternalServiceError:
+                if retries == 3:
+                    return False
+                time.sleep(random.uniform(0, 2**retries))
+        return False
+
+    overrides = {
+        "USE_MOCK_APIS": False,
+        "SHOPIFY_THROTTLE_MAXIMUM": maximum,
+        "SHOPIFY_THROTTLE_RESTORE_RATE": restore_rate,
+        "SHOPIFY_THROTTLED_MAX_ATTEMPTS": 1 if mode == "blind" else 10,
+    }
+    started = time.perf_counter()
+    with override_settings(**overrides), ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(push, range(products)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+
+    pushed = sum(outcomes)
+    return {
+        "mode": mode,
+        "pushed": pushed,
+        "failed": products - pushed,
+        "throttled_responses": bucket.throttled,
+        "seconds": elapsed,
+        "throughput": pushed / elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--maximum", type=float, default=200)
+    parser.add_argument("--restore-rate", type=float, default=200)
+    parser.add_argument("--cost", type=float, default=10)
+    args = parser.parse_args()
+
+    setup()
+    for mode in ("blind", "scheduled"):
+        row = simulate(mode, args.products, args.workers, args.maximum, args.restore_rate, args.cost)
+        print(
+            f"{row['mode']:>9}: {row['pushed']} pushed, {row['failed']} failed, "
+            f"{row['throttled_responses']} throttled responses, {row['throughput']:.1f} pushes/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
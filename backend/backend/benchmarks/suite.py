@@ -0,0 +1,379 @@
+"""Offline benchmark suite for the draft-to-Shopify pipeline, with regression checks.
+
+Seeds ``--templates`` templates, ``--assets`` assets and ``--drafts`` drafts into a
+fresh file-backed SQLite database (or ``DATABASE_URL``), with ``USE_MOCK_APIS=true``,
+then measures bulk create, listing, detail, asset upload, matrix generation and
+push throughput, the push once with Celery in eager mode and once through a real
+local worker. The
+worker talks to a filesystem broker by default, so nothing beyond Python is needed.
+
+Results go to ``--output`` as JSON. With ``--baseline`` the run is compared against
+an earlier result file and exits non-zero when a metric got worse by more than
+``--max-regression-pct`` (query counts may not grow at all).
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile, setup
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def metric(value: float, unit: str, better: str = "lower") -> dict:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def seed(templates: int, assets: int, drafts: int, batch: int = 5000) -> None:
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+
+    from core.models import DesignAsset, ProductDraft, Template
+
+    created_templates = Template.objects.bulk_create(
+        [Template(name=f"Template {index}", gelato_template_id=f"suite-{index}") for index in range(templates)]
+    )
+    created_assets = DesignAsset.objects.bulk_create(
+        [
+            # Pushes upload the files, so they have to exist in MEDIA_ROOT, also for the worker process.
+            DesignAsset(
+                file=default_storage.save(f"assets/suite-{index}.png", ContentFile(b"\x89PNG suite %d" % index)),
+                original_filename=f"suite-{index}.png",
+                mime_type="image/png",
+                sha256=f"{index:064d}",
+            )
+            for index in range(assets)
+        ]
+    )
+    through = ProductDraft.assets.through
+    for start in range(0, drafts, batch):
+        created = ProductDraft.objects.bulk_create(
+            [
+                ProductDraft(
+                    template=created_templates[index % templates],
+                    title=f"Draft {index}",
+                    tags=["suite"],
+                    price="19.99",
+                )
+                for index in range(start, min(start + batch, drafts))
+            ]
+        )
+        through.objects.bulk_create(
+            [
+                through(productdraft_id=draft.id, designasset_id=created_assets[(draft.id + offset) % assets].id)
+                for draft in created
+                for offset in (0, 1)
+            ]
+        )
+
+
+def bench_bulk_create(client, size: int, rounds: int) -> dict:
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from core.models import DesignAsset, Template
+
+    template_id = Template.objects.values_list("id", flat=True).first()
+    asset_ids = list(DesignAsset.objects.values_list("id", flat=True)[:3])
+    payload = {
+        "drafts": [
+            {"template_id": template_id, "title": f"Bulk {index}", "price": "9.99", "asset_ids": asset_ids}
+            for index in range(size)
+        ]
+    }
+    latencies = []
+    for _ in range(rounds):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.post("/api/drafts/bulk", payload, format="json")
+            latencies.append(time.perf_counter() - started)
+        assert response.status_code == 201, response.content
+    p50 = percentile(latencies, 50)
+    return {
+        "bulk_create.drafts_per_s": metric(size / p50, "drafts/s", "higher"),
+        "bulk_create.queries": metric(len(queries.captured_queries), "queries"),
+    }
+
+
+def bench_list(client, pages: int, limit: int) -> dict:
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencies = []
+    query = {"limit": limit}
+    for _ in range(pages):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get("/api/drafts", query)
+            latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.content
+        cursor = response.get("X-Next-Cursor")
+        if not cursor:
+            break
+        query["cursor"] = cursor
+    return {
+        "list.p50_ms": metric(percentile(latencies, 50) * 1000, "ms"),
+        "list.p95_ms": metric(percentile(latencies, 95) * 1000, "ms"),
+        "list.queries": metric(len(queries.captured_queries), "queries"),
+    }
+
+
+def bench_detail(client, requests: int) -> dict:
+    import random
+
+    from core.models import ProductDraft
+
+    ids = list(ProductDraft.objects.values_list("id", flat=True))
+    rng = random.Random(0)
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(f"/api/drafts/{rng.choice(ids)}")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.content
+    return {
+        "detail.p50_ms": metric(percentile(latencies, 50) * 1000, "ms"),
+        "detail.p95_ms": metric(percentile(latencies, 95) * 1000, "ms"),
+    }
+
+
+def bench_asset_upload(client, uploads: int) -> dict:
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    latencies = []
+    for index in range(uploads):
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 1200), (index % 256, 80, 160)).save(buffer, format="PNG", dpi=(300, 300))
+        upload = SimpleUploadedFile(f"upload-{index}.png", buffer.getvalue(), "image/png")
+        started = time.perf_counter()
+        response = client.post("/api/assets/upload", {"files": [upload]}, format="multipart")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 201, response.content
+    return {
+        "asset_upload.p50_ms": metric(percentile(latencies, 50) * 1000, "ms"),
+        "asset_upload.uploads_per_s": metric(uploads / sum(latencies), "uploads/s", "higher"),
+    }
+
+
+def bench_generate(client, templates: int, assets: int) -> dict:
+    from config.celery import app
+    from core.models import DesignAsset, JobRun, Template
+    from core.tasks import relay_outbox
+
+    payload = {
+        "template_ids": list(Template.objects.order_by("id").values_list("id", flat=True)[:templates]),
+        "asset_ids": list(DesignAsset.objects.order_by("id").values_list("id", flat=True)[:assets]),
+        "title": "{template} / {asset}",
+        "tags": ["{template}"],
+        "price": "24.90",
+    }
+    app.conf.task_always_eager = True
+    try:
+        started = time.perf_counter()
+        response = client.post("/api/drafts/generate", payload, format="json")
+        assert response.status_code == 202, response.content
+        request_seconds = time.perf_counter() - started
+        relay_outbox()
+        elapsed = time.perf_counter() - started
+    finally:
+        app.conf.task_always_eager = False
+    job = JobRun.objects.get(id=response.json()["id"])
+    assert job.status == JobRun.Status.SUCCESS, job.detail
+    return {
+        "generate.request_ms": metric(request_seconds * 1000, "ms"),
+        "generate.drafts_per_s": metric(job.detail["progress"]["created"] / elapsed, "drafts/s", "higher"),
+    }
+
+
+def queue_drafts(client, count: int) -> list[int]:
+    from core.models import ProductDraft
+
+    draft_ids = list(
+        ProductDraft.objects.filter(status=ProductDraft.Status.DRAFT)
+        .order_by("id")
+        .values_list("id", flat=True)[:count]
+    )
+    response = client.post("/api/drafts/push", {"draft_ids": draft_ids}, format="json")
+    assert response.status_code == 202, response.content
+    return draft_ids
+
+
+def wait_until_pushed(draft_ids: list[int], timeout: float, relay) -> float:
+    from core.models import ProductDraft
+
+    started = time.perf_counter()
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        relay()
+        pending = ProductDraft.objects.filter(id__in=draft_ids).exclude(status=ProductDraft.Status.PUSHED).count()
+        if not pending:
+            return time.perf_counter() - started
+        time.sleep(0.05)
+    raise RuntimeError(f"{pending} of {len(draft_ids)} drafts were not pushed within {timeout}s")
+
+
+def bench_push_eager(client, count: int) -> dict:
+    from config.celery import app
+    from core.tasks import relay_outbox
+
+    app.conf.task_always_eager = True
+    try:
+        started = time.perf_counter()
+        draft_ids = queue_drafts(client, count)
+        wait_until_pushed(draft_ids, 300, relay_outbox)
+        elapsed = time.perf_counter() - started
+    finally:
+        app.conf.task_always_eager = False
+    return {"push_eager.drafts_per_s": metric(len(draft_ids) / elapsed, "drafts/s", "higher")}
+
+
+def all_queues() -> str:
+    from django.conf import settings
+
+    queues = {route["queue"] for route in settings.CELERY_TASK_ROUTES.values()}
+    return ",".join(sorted(queues | {settings.CELERY_TASK_DEFAULT_QUEUE}))
+
+
+def bench_push_worker(client, count: int, concurrency: int, timeout: float) -> dict:
+    from django.db import connections
+
+    from core.tasks import relay_outbox
+
+    connections.close_all()
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "celery", "-A", "config", "worker", "-Q", all_queues()]
+        + ["-c", str(concurrency), "-l", "warning"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+    )
+    try:
+        time.sleep(3)  # let the pool come up so start-up time is not counted as throughput
+        started = time.perf_counter()
+        draft_ids = queue_drafts(client, count)
+        wait_until_pushed(draft_ids, timeout, relay_outbox)
+        elapsed = time.perf_counter() - started
+    finally:
+        worker.terminate()
+        worker.wait(30)
+    return {"push_worker.drafts_per_s": metric(len(draft_ids) / elapsed, "drafts/s", "higher")}
+
+
+def configure_environment(args, workdir: Path) -> None:
+    os.environ["USE_MOCK_APIS"] = "true"
+    os.environ["CACHE_URL"] = ""
+    os.environ["EVENTS_REDIS_URL"] = ""
+    os.environ["MEDIA_ROOT"] = str(workdir / "media")
+    if not os.getenv("DATABASE_URL"):
+        # Worker processes write too; IMMEDIATE avoids SQLite's instant BUSY on read-to-write upgrades.
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'suite.sqlite3'}?timeout=60&transaction_mode=IMMEDIATE"
+    if args.broker:
+        os.environ["CELERY_BROKER_URL"] = args.broker
+    else:
+        queue = workdir / "broker"
+        queue.mkdir()
+        os.environ["CELERY_BROKER_URL"] = "filesystem://"
+        os.environ["CELERY_BROKER_TRANSPORT_OPTIONS"] = json.dumps(
+            {"data_folder_in": str(queue), "data_folder_out": str(queue), "control_folder": str(workdir / "control")}
+        )
+    os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+
+
+def run(args) -> dict:
+    from django.core.management import call_command
+    from rest_framework.test import APIClient
+
+    call_command("migrate", verbosity=0)
+    seed(args.templates, args.assets, args.drafts)
+
+    client = APIClient()
+    metrics = {}
+    metrics.update(bench_bulk_create(client, args.bulk_size, args.rounds))
+    metrics.update(bench_list(client, args.pages, args.page_size))
+    metrics.update(bench_detail(client, args.detail_requests))
+    metrics.update(bench_asset_upload(client, args.uploads))
+    metrics.update(bench_generate(client, args.generate_templates, args.generate_assets))
+    metrics.update(bench_push_eager(client, args.push_drafts))
+    if not args.skip_worker:
+        metrics.update(bench_push_worker(client, args.push_drafts, args.worker_concurrency, args.worker_timeout))
+    return metrics
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, max_regression_pct: float) -> list[str]:
+    """Regressions of ``current`` against ``baseline``, as human-readable lines."""
+    failures = []
+    for name, entry in current.items():
+        previous = baseline.get(name)
+        if previous is None or not previous["value"]:
+            continue
+        if entry["unit"] == "queries":
+            if entry["value"] > previous["value"]:
+                failures.append(f"{name}: {previous['value']:g} -> {entry['value']:g} queries")
+            continue
+        change = (entry["value"] - previous["value"]) / previous["value"] * 100
+        worse = change if entry["better"] == "lower" else -change
+        if worse > max_regression_pct:
+            failures.append(f"{name}: {previous['value']:g} -> {entry['value']:g} {entry['unit']} ({worse:.1f}% worse)")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--assets", type=int, default=200)
+    parser.add_argument("--drafts", type=int, default=5000)
+    parser.add_argument("--bulk-size", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--detail-requests", type=int, default=200)
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--generate-templates", type=int, default=10)
+    parser.add_argument("--generate-assets", type=int, default=200)
+    parser.add_argument("--push-drafts", type=int, default=500)
+    parser.add_argument("--skip-worker", action="store_true", help="only measure the eager push")
+    parser.add_argument("--worker-concurrency", type=int, default=4)
+    parser.add_argument("--worker-timeout", type=float, default=300)
+    parser.add_argument("--broker", help="broker URL for the worker run (default: a temporary filesystem broker)")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--max-regression-pct", type=float, default=25)
+    args = parser.parse_args()
+
+    configure_environment(args, Path(tempfile.mkdtemp(prefix="lazypod-bench-")))
+    setup()
+    metrics = run(args)
+    result = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "params": {key: value for key, value in vars(args).items() if key not in {"output", "baseline"}},
+        "metrics": metrics,
+    }
+    Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+    for name, entry in metrics.items():
+        print(f"{name:>28}: {entry['value']:>10g} {entry['unit']}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["metrics"]
+        failures = compare(metrics, baseline, args.max_regression_pct)
+        for line in failures:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Shopify webhook burst: endpoint latency, then how fast the consumer applies the buffer.
+
+Posts ``--events`` signed ``products/update`` webhooks for ``--products``
+products through the full Django stack, with ``--duplicate-pct`` redeliveries
+and timestamps shuffled so that deliveries arrive out of order. Reports the
+endpoint's p50/p95/max latency and sustained rate, then runs
+``consume_shopify_webhooks`` once over the buffer.
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import percentile, setup, test_database
+
+SECRET = "bench-secret"
+
+
+def signed(payload: dict, event_id: str) -> tuple[bytes, dict]:
+    body = json.dumps(payload).encode()
+    digest = base64.b64encode(hmac.new(SECRET.encode(), body, hashlib.sha256).digest()).decode()
+    return body, {
+        "X-Shopify-Topic": "products/update",
+        "X-Shopify-Hmac-Sha256": digest,
+        "X-Shopify-Event-Id": event_id,
+        "X-Shopify-Shop-Domain": "bench.myshopify.com",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--duplicate-pct", type=float, default=10)
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client, override_settings
+
+    from core.models import ProductDraft, ShopifyProduct, ShopifyWebhookEvent, Template
+    from core.tasks import consume_shopify_webhooks
+
+    rng = random.Random(7)
+    started_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with test_database(), override_settings(SHOPIFY_WEBHOOK_SECRET=SECRET):
+        template = Template.objects.create(name="Bench", gelato_template_id="bench")
+        drafts = ProductDraft.objects.bulk_create(
+            [
+                ProductDraft(template=template, title=f"Draft {index}", price="9.99", status="pushed")
+                for index in range(args.products)
+            ]
+        )
+        ShopifyProduct.objects.bulk_create(
+            [ShopifyProduct(draft=draft, shopify_product_id=f"gid://shopify/Product/{draft.id}") for draft in drafts]
+        )
+
+        deliveries = []
+        for index in range(args.events):
+            draft = drafts[index % len(drafts)]
+            updated_at = started_at + timedelta(seconds=rng.randint(0, 3600))
+            payload = {"id": draft.id, "title": f"Edit {index}", "updated_at": updated_at.isoformat()}
+            deliveries.append(signed(payload, f"event-{index}"))
+        deliveries += rng.sample(deliveries, int(len(deliveries) * args.duplicate_pct / 100))
+        rng.shuffle(deliveries)
+
+        client = Client()
+        latencies = []
+        burst_started = time.perf_counter()
+        for body, headers in deliveries:
+            started = time.perf_counter()
+            response = client.post(
+                "/api/integrations/shopify/webhooks", body, content_type="application/json", headers=headers
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.status_code
+        burst_seconds = time.perf_counter() - burst_started
+        buffered = ShopifyWebhookEvent.objects.count()
+
+        started = time.perf_counter()
+        counts = consume_shopify_webhooks()
+        consume_seconds = time.perf_counter() - started
+
+    print(
+        f"ingest: {len(deliveries)} deliveries, {buffered} buffered after dedup; "
+        f"p50 {percentile(latencies, 50):.2f} ms, p95 {percentile(latencies, 95):.2f} ms, "
+        f"max {max(latencies):.2f} ms; {len(deliveries) / burst_seconds * 60:,.0f} webhooks/min"
+    )
+    print(
+        f"consume: {counts['events']} events -> {counts['updated']} product updates "
+        f"in {consume_seconds:.2f}s ({counts['events'] / consume_seconds * 60:,.0f} events/min)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_asgi_application()
+if settings.DEBUG:
+    # What runserver does for WSGI; uvicorn has no static file handling of its own.
+    application = ASGIStaticFilesHandler(application)
@@ -1,5 +1,6 @@
-from pathlib import Path
+import json
 import os
+from pathlib import Path
 
 import dj_database_url
 
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -67,7 +69,12 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 MEDIA_URL = "/media/"
-MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", BASE_DIR / "media"))
+ASSET_UPLOAD_STAGING_DIR = os.getenv("ASSET_UPLOAD_STAGING_DIR", str(MEDIA_ROOT / "uploads" / "partial"))
+ASSET_UPLOAD_CHUNK_SIZE = int(os.getenv("ASSET_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+ASSET_UPLOAD_MAX_BYTES = int(os.getenv("ASSET_UPLOAD_MAX_BYTES", str(2 * 1024 * 1024 * 1024 - 1)))
+ASSET_PREVIEW_SIZES = [int(size) for size in os.getenv("ASSET_PREVIEW_SIZES", "256,1024").split(",")]
+ASSET_IMAGE_WORKERS = int(os.getenv("ASSET_IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -82,12 +89,122 @@ SPECTACULAR_SETTINGS = {
 }
 
 USE_MOCK_APIS = os.getenv("USE_MOCK_APIS", "true").lower() == "true"
+# Simulated Shopify round trip for mock pushes, for load tests.
+SHOPIFY_MOCK_LATENCY_MS = float(os.getenv("SHOPIFY_MOCK_LATENCY_MS", "0"))
+DRAFT_BULK_CHUNK_SIZE = int(os.getenv("DRAFT_BULK_CHUNK_SIZE", "500"))
+DRAFT_GENERATE_MAX = int(os.getenv("DRAFT_GENERATE_MAX", "100000"))
+# Rejected rows listed in an import report; further rejections are only counted.
+DRAFT_IMPORT_MAX_ERRORS = int(os.getenv("DRAFT_IMPORT_MAX_ERRORS", "1000"))
+DRAFT_PAGE_SIZE = int(os.getenv("DRAFT_PAGE_SIZE", "100"))
+DRAFT_MAX_PAGE_SIZE = int(os.getenv("DRAFT_MAX_PAGE_SIZE", "1000"))
+SHOPIFY_PUSH_BATCH_SIZE = int(os.getenv("SHOPIFY_PUSH_BATCH_SIZE", "50"))
+# Batch pushes of at least this many drafts run as one Shopify bulk operation; 0 turns bulk mode off.
+SHOPIFY_BULK_OPERATION_THRESHOLD = int(os.getenv("SHOPIFY_BULK_OPERATION_THRESHOLD", "500"))
+SHOPIFY_BULK_POLL_INTERVAL = float(os.getenv("SHOPIFY_BULK_POLL_INTERVAL", "5"))
+SHOPIFY_BULK_OPERATION_TIMEOUT = int(os.getenv("SHOPIFY_BULK_OPERATION_TIMEOUT", "21600"))
+# Staged asset uploads in flight at once, and assets per stagedUploadsCreate/fileCreate call.
+SHOPIFY_MEDIA_UPLOAD_CONCURRENCY = int(os.getenv("SHOPIFY_MEDIA_UPLOAD_CONCURRENCY", "8"))
+SHOPIFY_MEDIA_BATCH_SIZE = int(os.getenv("SHOPIFY_MEDIA_BATCH_SIZE", "50"))
+DRAFT_PUSH_CLAIM_TIMEOUT = int(os.getenv("DRAFT_PUSH_CLAIM_TIMEOUT", "900"))
+
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_URL}
+        if CACHE_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", CACHE_URL)
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+METRICS_PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "10"))
+METRICS_SNAPSHOT_TTL = int(os.getenv("METRICS_SNAPSHOT_TTL", "3600"))
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+# Redis emulates priorities with one list per step; 0 is the most urgent.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "queue_order_strategy": "priority",
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    **json.loads(os.getenv("CELERY_BROKER_TRANSPORT_OPTIONS", "{}")),
+}
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", "1"))
+# interactive: single pushes and the outbox relay that dispatches them, I/O-bound, latency first.
+# bulk: batch pushes, I/O-bound, throughput first. media: image processing, CPU-bound.
+# periodic: catalog sync, housekeeping from beat and bulk-operation polls. Anything unrouted lands on "default".
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "core.tasks.relay_outbox": {"queue": "interactive", "priority": 0},
+    "core.tasks.push_draft_to_shopify": {"queue": "interactive", "priority": 2},
+    "core.tasks.push_drafts_to_shopify_batch": {"queue": "bulk", "priority": 5},
+    "core.tasks.push_drafts_to_shopify_bulk": {"queue": "bulk", "priority": 5},
+    "core.tasks.resync_drafts_to_shopify": {"queue": "bulk", "priority": 5},
+    "core.tasks.generate_drafts": {"queue": "bulk", "priority": 5},
+    "core.tasks.process_design_assets": {"queue": "media", "priority": 5},
+    "core.tasks.fail_stale_pushes": {"queue": "periodic", "priority": 3},
+    "core.tasks.resume_stale_generate_jobs": {"queue": "periodic", "priority": 3},
+    "core.tasks.finish_shopify_bulk_push": {"queue": "periodic", "priority": 3},
+    "core.tasks.consume_shopify_webhooks": {"queue": "periodic", "priority": 3},
+    "core.tasks.sync_gelato_templates": {"queue": "periodic", "priority": 5},
+    "core.tasks.resync_shopify_products": {"queue": "periodic", "priority": 8},
+    "core.tasks.prune_outbox": {"queue": "periodic", "priority": 8},
+    "core.tasks.prune_shopify_webhooks": {"queue": "periodic", "priority": 8},
+    "core.tasks.compact_job_runs": {"queue": "periodic", "priority": 8},
+}
+JOBRUN_RETENTION_DAYS = int(os.getenv("JOBRUN_RETENTION_DAYS", "30"))
+OUTBOX_RELAY_INTERVAL = float(os.getenv("OUTBOX_RELAY_INTERVAL", "1"))
+OUTBOX_RELAY_BATCH_SIZE = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", "500"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+SHOPIFY_WEBHOOK_CONSUME_INTERVAL = float(os.getenv("SHOPIFY_WEBHOOK_CONSUME_INTERVAL", "2"))
+SHOPIFY_WEBHOOK_BATCH_SIZE = int(os.getenv("SHOPIFY_WEBHOOK_BATCH_SIZE", "1000"))
+# Processed webhooks are kept this long so that a late redelivery is still recognised as a duplicate.
+SHOPIFY_WEBHOOK_RETENTION_HOURS = int(os.getenv("SHOPIFY_WEBHOOK_RETENTION_HOURS", "72"))
+CELERY_BEAT_SCHEDULE = {
+    "relay-outbox": {"task": "core.tasks.relay_outbox", "schedule": OUTBOX_RELAY_INTERVAL},
+    "prune-outbox": {"task": "core.tasks.prune_outbox", "schedule": 3600.0},
+    "consume-shopify-webhooks": {
+        "task": "core.tasks.consume_shopify_webhooks",
+        "schedule": SHOPIFY_WEBHOOK_CONSUME_INTERVAL,
+    },
+    "prune-shopify-webhooks": {"task": "core.tasks.prune_shopify_webhooks", "schedule": 3600.0},
+    "fail-stale-pushes": {"task": "core.tasks.fail_stale_pushes", "schedule": 300.0},
+    "resume-stale-generate-jobs": {"task": "core.tasks.resume_stale_generate_jobs", "schedule": 300.0},
+    "compact-job-runs": {"task": "core.tasks.compact_job_runs", "schedule": 86400.0},
+    "sync-gelato-templates": {
+        "task": "core.tasks.sync_gelato_templates",
+        "schedule": float(os.getenv("GELATO_TEMPLATE_SYNC_INTERVAL", "3600")),
+    },
+    "resync-shopify-products": {
+        "task": "core.tasks.resync_shopify_products",
+        "schedule": float(os.getenv("SHOPIFY_RESYNC_INTERVAL", "86400")),
+    },
+}
 
 
 APP_URL = os.getenv("APP_URL", "http://localhost:5173")
 SHOPIFY_CLIENT_ID = os.getenv("SHOPIFY_CLIENT_ID", "")
 SHOPIFY_CLIENT_SECRET = os.getenv("SHOPIFY_CLIENT_SECRET", "")
+# Webhooks of an app are signed with its client secret.
+SHOPIFY_WEBHOOK_SECRET = os.getenv("SHOPIFY_WEBHOOK_SECRET", SHOPIFY_CLIENT_SECRET)
 SHOPIFY_SCOPES = os.getenv("SHOPIFY_SCOPES", "read_products,write_products")
+INTEGRATION_STATE_TTL = float(os.getenv("INTEGRATION_STATE_TTL", "30"))
+SHOPIFY_API_VERSION = os.getenv("SHOPIFY_API_VERSION", "2026-01")
+GELATO_API_KEY = os.getenv("GELATO_API_KEY", "")
+GELATO_CATALOG_PAGE_SIZE = int(os.getenv("GELATO_CATALOG_PAGE_SIZE", "100"))
+TEMPLATE_CACHE_TIMEOUT = int(os.getenv("TEMPLATE_CACHE_TIMEOUT", "86400"))
+GELATO_API_URL = os.getenv("GELATO_API_URL", "https://product.gelatoapis.com/v3")
+
+SHOPIFY_THROTTLE_MAXIMUM = float(os.getenv("SHOPIFY_THROTTLE_MAXIMUM", "1000"))
+SHOPIFY_THROTTLE_RESTORE_RATE = float(os.getenv("SHOPIFY_THROTTLE_RESTORE_RATE", "50"))
+SHOPIFY_THROTTLE_SAFETY_MARGIN = float(os.getenv("SHOPIFY_THROTTLE_SAFETY_MARGIN", "20"))
+SHOPIFY_DEFAULT_QUERY_COST = float(os.getenv("SHOPIFY_DEFAULT_QUERY_COST", "10"))
+SHOPIFY_THROTTLED_MAX_ATTEMPTS = int(os.getenv("SHOPIFY_THROTTLED_MAX_ATTEMPTS", "5"))
+
+HTTP_CLIENT_TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", "15"))
+HTTP_CLIENT_MAX_RETRIES = int(os.getenv("HTTP_CLIENT_MAX_RETRIES", "2"))
+HTTP_CLIENT_BACKOFF_FACTOR = float(os.getenv("HTTP_CLIENT_BACKOFF_FACTOR", "0.5"))
+HTTP_CLIENT_POOL_SIZE = int(os.getenv("HTTP_CLIENT_POOL_SIZE", "10"))
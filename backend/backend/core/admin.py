@@ -1,9 +1,17 @@
 from django.contrib import admin
 
-from .models import DesignAsset, JobRun, ProductDraft, ShopifyProduct, Template
+from .models import (
+    DesignAsset,
+    JobRun,
+    JobRunDailyStat,
+    ProductDraft,
+    ShopifyProduct,
+    Template,
+)
 
 admin.site.register(Template)
 admin.site.register(DesignAsset)
 admin.site.register(ProductDraft)
 admin.site.register(ShopifyProduct)
 admin.site.register(JobRun)
+admin.site.register(JobRunDailyStat)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from . import catalog, events, integrations, metrics  # noqa: F401 - register their signal receivers
+
+        metrics.install_on_open_connections()
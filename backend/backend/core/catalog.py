@@ -0,0 +1,103 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Template
+from .serializers import TemplateSerializer
+from .services import GelatoAdapter
+
+VERSION_KEY = "templates:version"
+
+
+def content_hash(item: dict) -> str:
+    canonical = json.dumps({"name": item["name"], "metadata": item["metadata"]}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def catalog_version() -> str:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex[:16], timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version() -> None:
+    cache.set(VERSION_KEY, uuid.uuid4().hex[:16], timeout=None)
+
+
+@receiver([post_save, post_delete], sender=Template)
+def _template_changed(**_kwargs) -> None:
+    transaction.on_commit(bump_catalog_version)
+
+
+def sync_templates(pages) -> dict:
+    """Upsert the templates in ``pages`` and deactivate the ones no longer listed.
+
+    Each template's ``metadata["content_hash"]`` covers its name and upstream
+    metadata, so unchanged templates cost no writes. The catalog version is bumped
+    only when something changed.
+    """
+    seen = set()
+    created = updated = 0
+    now = timezone.now()
+    for page in pages:
+        incoming = {item["gelato_template_id"]: item for item in page}
+        seen.update(incoming)
+        existing = Template.objects.in_bulk(incoming.keys(), field_name="gelato_template_id")
+
+        new, changed = [], []
+        for gelato_id, item in incoming.items():
+            digest = content_hash(item)
+            metadata = {**item["metadata"], "content_hash": digest}
+            template = existing.get(gelato_id)
+            if template is None:
+                new.append(Template(gelato_template_id=gelato_id, name=item["name"], metadata=metadata))
+            elif template.metadata.get("content_hash") != digest or not template.is_active:
+                template.name = item["name"]
+                template.metadata = metadata
+                template.is_active = True
+                template.updated_at = now
+                changed.append(template)
+
+        with transaction.atomic():
+            Template.objects.bulk_create(new)
+            Template.objects.bulk_update(changed, ["name", "metadata", "is_active", "updated_at"])
+        created += len(new)
+        updated += len(changed)
+
+    deactivated = 0
+    if seen:  # an empty listing is far more likely an upstream hiccup than an empty catalog
+        deactivated = (
+            Template.objects.filter(is_active=True)
+            .exclude(gelato_template_id__in=seen)
+            .update(is_active=False, updated_at=now)
+        )
+    if created or updated or deactivated:
+        bump_catalog_version()
+    return {"created": created, "updated": updated, "deactivated": deactivated, "total": len(seen)}
+
+
+def _list_key(version: str) -> str:
+    return f"templates:list:{version}"
+
+
+def cached_template_list() -> tuple[str, list]:
+    """Active templates as rendered by ``TemplateSerializer``, cached per catalog version."""
+    version = catalog_version()
+    data = cache.get(_list_key(version))
+    if data is None:
+        if settings.USE_MOCK_APIS and not Template.objects.exists():
+            sync_templates(GelatoAdapter().iter_template_pages())
+            version = catalog_version()
+        templates = Template.objects.filter(is_active=True).order_by("id")
+        data = list(TemplateSerializer(templates, many=True).data)
+        cache.set(_list_key(version), data, settings.TEMPLATE_CACHE_TIMEOUT)
+    return version, data
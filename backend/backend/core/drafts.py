@@ -0,0 +1,309 @@
+import functools
+import itertools
+from dataclasses import dataclass
+from pathlib import PurePath
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, QuerySet
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from rest_framework import serializers
+
+from .events import draft_status_events, publish_events
+from .models import DesignAsset, JobRun, ProductDraft, Template
+from .serializers import (
+    DesignAssetSerializer,
+    ProductDraftSerializer,
+    TemplateSerializer,
+)
+
+
+def chunked(items, size: int):
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def draft_reference_errors(items: list[dict]) -> dict[int, dict]:
+    """Errors for items pointing at templates or assets that do not exist, keyed by item index."""
+    template_ids = {item["template_id"] for item in items}
+    asset_ids = {asset_id for item in items for asset_id in item["asset_ids"]}
+
+    known_templates = set(Template.objects.filter(id__in=template_ids).values_list("id", flat=True))
+    known_assets = set(DesignAsset.objects.filter(id__in=asset_ids).values_list("id", flat=True))
+
+    errors = {}
+    for index, item in enumerate(items):
+        item_errors = {}
+        if item["template_id"] not in known_templates:
+            item_errors["template_id"] = [f"Unknown template {item['template_id']}."]
+        missing_assets = sorted(set(item["asset_ids"]) - known_assets)
+        if missing_assets:
+            item_errors["asset_ids"] = [f"Unknown assets {missing_assets}."]
+        if item_errors:
+            errors[index] = item_errors
+    return errors
+
+
+def validate_draft_references(items: list[dict]) -> None:
+    errors = draft_reference_errors(items)
+    if errors:
+        raise serializers.ValidationError({"drafts": errors})
+
+
+def _insert_drafts(items: list[dict]) -> list[ProductDraft]:
+    drafts = ProductDraft.objects.bulk_create(
+        [
+            ProductDraft(
+                template_id=item["template_id"],
+                title=item["title"],
+                description=item.get("description", ""),
+                tags=item.get("tags", []),
+                seo=item.get("seo", {}),
+                price=item["price"],
+            )
+            for item in items
+        ]
+    )
+    through = ProductDraft.assets.through
+    through.objects.bulk_create(
+        [
+            through(productdraft_id=draft.id, designasset_id=asset_id)
+            for draft, item in zip(drafts, items)
+            for asset_id in dict.fromkeys(item["asset_ids"])
+        ]
+    )
+    return drafts
+
+
+def bulk_create_drafts(items: list[dict], chunk_size: int | None = None) -> list[ProductDraft]:
+    """Insert validated draft items with a fixed number of queries per chunk."""
+    chunk_size = chunk_size or settings.DRAFT_BULK_CHUNK_SIZE
+    validate_draft_references(items)
+
+    created = []
+    with transaction.atomic():
+        for chunk in chunked(items, chunk_size):
+            created.extend(_insert_drafts(chunk))
+    return created
+
+
+def validate_matrix_references(template_ids: list[int], asset_ids: list[int]) -> None:
+    known_templates = set(Template.objects.filter(id__in=template_ids).values_list("id", flat=True))
+    known_assets = set(DesignAsset.objects.filter(id__in=asset_ids).values_list("id", flat=True))
+    errors = {}
+    if missing := sorted(set(template_ids) - known_templates):
+        errors["template_ids"] = [f"Unknown templates {missing}."]
+    if missing := sorted(set(asset_ids) - known_assets):
+        errors["asset_ids"] = [f"Unknown assets {missing}."]
+    if errors:
+        raise serializers.ValidationError(errors)
+
+
+def iter_matrix_items(rule: dict, templates: dict[int, str], assets: dict[int, str], start: int = 0):
+    """Yield one draft item per (template, asset) pair, template-major, from position ``start`` on.
+
+    Pairs whose template or asset no longer exists yield ``None`` so positions stay stable.
+    """
+    pairs = itertools.product(rule["template_ids"], rule["asset_ids"])
+    for index, (template_id, asset_id) in enumerate(itertools.islice(pairs, start, None), start=start + 1):
+        if template_id not in templates or asset_id not in assets:
+            yield None
+            continue
+        filename = assets[asset_id]
+        values = {
+            "template": templates[template_id],
+            "asset": PurePath(filename).stem,
+            "filename": filename,
+            "index": index,
+        }
+        yield {
+            "template_id": template_id,
+            "asset_ids": [asset_id],
+            "title": rule["title"].format_map(values)[:255],
+            "description": rule.get("description", "").format_map(values),
+            "tags": [tag.format_map(values) for tag in rule.get("tags", [])],
+            "price": rule["price"],
+        }
+
+
+def generate_matrix(job: JobRun, chunk_size: int | None = None) -> dict:
+    """Create the drafts described by ``job.detail["rule"]``, one chunk per transaction.
+
+    The position reached is saved with each chunk, so a restarted job resumes where
+    the last committed chunk ended instead of creating duplicates. Every progress
+    save also goes out as a job event.
+    """
+    chunk_size = chunk_size or settings.DRAFT_BULK_CHUNK_SIZE
+    rule = job.detail["rule"]
+    progress = job.detail["progress"]
+    templates = dict(Template.objects.filter(id__in=rule["template_ids"]).values_list("id", "name"))
+    assets = dict(DesignAsset.objects.filter(id__in=rule["asset_ids"]).values_list("id", "original_filename"))
+
+    for chunk in chunked(iter_matrix_items(rule, templates, assets, progress["done"]), chunk_size):
+        items = [item for item in chunk if item is not None]
+        with transaction.atomic():
+            _insert_drafts(items)
+            progress = {
+                **progress,
+                "done": progress["done"] + len(chunk),
+                "created": progress["created"] + len(items),
+                "skipped": progress["skipped"] + len(chunk) - len(items),
+            }
+            job.detail = {**job.detail, "progress": progress}
+            job.save(update_fields=["detail", "updated_at"])
+    return progress
+
+
+def claim_drafts(draft_ids: list[int]) -> list[ProductDraft]:
+    """Move the given ``QUEUED`` drafts to ``PUSHING`` and return the ones this caller won.
+
+    On databases with ``SKIP LOCKED`` the candidates are locked and flipped in one
+    transaction, so concurrent workers split a shared batch without waiting on each
+    other. Elsewhere (SQLite) each draft is a compare-and-set UPDATE, which the
+    database's single writer makes atomic. Either way a draft is claimed at most once.
+    """
+    now = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            drafts = list(
+                ProductDraft.objects.select_for_update(skip_locked=True)
+                .filter(id__in=draft_ids, status=ProductDraft.Status.QUEUED)
+                .order_by("id")
+            )
+            ProductDraft.objects.filter(id__in=[draft.id for draft in drafts]).update(
+                status=ProductDraft.Status.PUSHING, updated_at=now
+            )
+    else:
+        won = [
+            draft_id
+            for draft_id in dict.fromkeys(draft_ids)
+            if ProductDraft.objects.filter(id=draft_id, status=ProductDraft.Status.QUEUED).update(
+                status=ProductDraft.Status.PUSHING, updated_at=now
+            )
+        ]
+        drafts = list(ProductDraft.objects.filter(id__in=won).order_by("id"))
+    for draft in drafts:
+        draft.status = ProductDraft.Status.PUSHING
+        draft.updated_at = now
+    publish_events(draft_status_events([draft.id for draft in drafts], ProductDraft.Status.PUSHING))
+    return drafts
+
+
+def _csv_param(params, name: str, allowed) -> tuple[str, ...] | None:
+    raw = params.get(name)
+    if raw is None:
+        return None
+    values = tuple(value for value in (part.strip() for part in raw.split(",")) if value)
+    unknown = sorted(set(values) - set(allowed))
+    if unknown:
+        raise serializers.ValidationError({name: [f"Unknown values: {', '.join(unknown)}."]})
+    return values
+
+
+@dataclass(frozen=True)
+class DraftProjection:
+    fields: tuple[str, ...] = tuple(ProductDraftSerializer.Meta.fields)
+    expand: frozenset[str] = frozenset(ProductDraftSerializer.EXPANDABLE)
+
+    @classmethod
+    def from_query(cls, params) -> "DraftProjection":
+        fields = _csv_param(params, "fields", ProductDraftSerializer.Meta.fields)
+        expand = _csv_param(params, "expand", ProductDraftSerializer.EXPANDABLE)
+        return cls(
+            fields=fields if fields is not None else cls.fields,
+            expand=frozenset(expand) if expand is not None else cls.expand,
+        )
+
+    def includes(self, relation: str) -> tuple[bool, bool]:
+        """Return (rendered, expanded) for a relation."""
+        rendered = relation in self.fields
+        return rendered, rendered and relation in self.expand
+
+    def serializer_kwargs(self) -> dict:
+        return {"fields": self.fields, "expand": self.expand}
+
+
+DRAFT_VALUE_FIELDS = ("id", "title", "description", "tags", "seo", "status", "price", "created_at", "updated_at")
+
+
+@functools.cache
+def _representers(serializer_class) -> dict:
+    """Bound ``to_representation`` of each serializer field, looked up once per process."""
+    return {name: field.to_representation for name, field in serializer_class().fields.items()}
+
+
+def _render(row: dict, names, representers: dict) -> dict:
+    return {name: None if row[name] is None else representers[name](row[name]) for name in names}
+
+
+class DraftReader:
+    """Read path for draft listings that skips per-row ``ModelSerializer`` work.
+
+    Rows come from ``.values()`` and are rendered with the very field objects
+    ``ProductDraftSerializer`` uses, so the output is identical to the serializer's
+    for the same projection. Assets shared by several drafts are rendered once per
+    page. A page costs at most three queries.
+    """
+
+    def __init__(self, projection: DraftProjection):
+        self.projection = projection
+        self.names = [name for name in ProductDraftSerializer.Meta.fields if name in projection.fields]
+        self.template_rendered, self.template_expanded = projection.includes("template")
+        self.assets_rendered, self.assets_expanded = projection.includes("assets")
+
+    def queryset(self) -> QuerySet:
+        columns = [name for name in DRAFT_VALUE_FIELDS if name in self.names]
+        for key in ("id", "created_at"):
+            if key not in columns:
+                columns.append(key)
+        if self.template_rendered:
+            columns.append("template_id")
+        return ProductDraft.objects.values(*columns)
+
+    def _templates(self, rows: list[dict]) -> dict:
+        template_fields = TemplateSerializer.Meta.fields
+        representers = _representers(TemplateSerializer)
+        templates = Template.objects.filter(id__in={row["template_id"] for row in rows}).values(*template_fields)
+        return {template["id"]: _render(template, template_fields, representers) for template in templates}
+
+    def _assets(self, rows: list[dict]) -> dict:
+        assets_by_draft = {row["id"]: [] for row in rows}
+        queryset = DesignAsset.objects.filter(drafts__in=assets_by_draft.keys())
+        if not self.assets_expanded:
+            for draft_id, asset_id in queryset.values_list("drafts", "id"):
+                assets_by_draft[draft_id].append(asset_id)
+            return assets_by_draft
+
+        asset_fields = DesignAssetSerializer.Meta.fields
+        representers = _representers(DesignAssetSerializer)
+        file_field = DesignAsset._meta.get_field("file")
+        rendered = {}
+        for asset in queryset.values(*asset_fields, draft_id=F("drafts")):
+            if asset["id"] not in rendered:
+                asset["file"] = FieldFile(None, file_field, asset["file"])
+                rendered[asset["id"]] = _render(asset, asset_fields, representers)
+            assets_by_draft[asset["draft_id"]].append(rendered[asset["id"]])
+        return assets_by_draft
+
+    def render(self, rows: list[dict]) -> list[dict]:
+        if not rows:
+            return []
+        representers = _representers(ProductDraftSerializer)
+        templates = self._templates(rows) if self.template_expanded else None
+        assets = self._assets(rows) if self.assets_rendered else None
+
+        rendered = []
+        for row in rows:
+            item = {}
+            for name in self.names:
+                if name == "template":
+                    item[name] = templates[row["template_id"]] if templates is not None else row["template_id"]
+                elif name == "assets":
+                    item[name] = assets[row["id"]]
+                else:
+                    value = row[name]
+                    item[name] = None if value is None else representers[name](value)
+            rendered.append(item)
+        return rendered
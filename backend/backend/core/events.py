@@ -0,0 +1,139 @@
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import JobRun
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis ships with celery[redis]
+    redis = aioredis = None
+
+EVENTS_CHANNEL = "lazypod:events"
+# A closed subscriber loop, or Redis being unreachable.
+PUBLISH_ERRORS = (RuntimeError,) + ((redis.RedisError,) if redis else ())
+
+logger = logging.getLogger(__name__)
+
+
+class LocalEventBus:
+    """In-process pub/sub for development and tests, when no ``EVENTS_REDIS_URL`` is set.
+
+    Only subscribers in the publishing process see events, so pushes running on a
+    separate Celery worker are invisible here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+
+    def publish(self, events: list[dict]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, events)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self):
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.add(entry)
+
+        async def receive(timeout: float) -> list[dict] | None:
+            try:
+                return await asyncio.wait_for(entry[1].get(), timeout)
+            except TimeoutError:
+                return None
+
+        try:
+            yield receive
+        finally:
+            with self._lock:
+                self._subscribers.discard(entry)
+
+
+class RedisEventBus:
+    """Redis pub/sub, so every ASGI process sees what any worker publishes."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+
+    def publish(self, events: list[dict]) -> None:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(EVENTS_CHANNEL, json.dumps(events))
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self):
+        client = aioredis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(EVENTS_CHANNEL)
+
+        async def receive(timeout: float) -> list[dict] | None:
+            deadline = asyncio.get_running_loop().time() + timeout
+            while (remaining := deadline - asyncio.get_running_loop().time()) > 0:
+                message = await pubsub.get_message(timeout=remaining)
+                if message is not None:
+                    return json.loads(message["data"])
+            return None
+
+        try:
+            yield receive
+        finally:
+            await pubsub.unsubscribe(EVENTS_CHANNEL)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus():
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = RedisEventBus(settings.EVENTS_REDIS_URL) if settings.EVENTS_REDIS_URL else LocalEventBus()
+        return _bus
+
+
+def publish_events(events: list[dict]) -> None:
+    """Publish ``events`` once the current transaction commits; a publishing failure never breaks the caller."""
+    if not events:
+        return
+
+    def send():
+        try:
+            get_event_bus().publish(events)
+        except PUBLISH_ERRORS:
+            # Events are best effort; the database stays the source of truth.
+            logger.warning("Could not publish %d events", len(events), exc_info=True)
+
+    transaction.on_commit(send)
+
+
+def draft_status_events(draft_ids, status: str, **extra) -> list[dict]:
+    return [{"type": "draft.status", "draft_id": draft_id, "status": status, **extra} for draft_id in draft_ids]
+
+
+@receiver(post_save, sender=JobRun)
+def _job_saved(instance: JobRun, **_kwargs) -> None:
+    event = {
+        "type": "job",
+        "id": instance.id,
+        "task_name": instance.task_name,
+        "reference_id": instance.reference_id,
+        "status": instance.status,
+    }
+    if "progress" in instance.detail:
+        event["progress"] = instance.detail["progress"]
+    publish_events([event])
@@ -0,0 +1,319 @@
+import asyncio
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.parse
+import uuid
+import weakref
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import httpx
+from django.conf import settings
+
+from .metrics import external_request_seconds
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class HttpError(Exception):
+    pass
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def json(self):
+        if not self.body:
+            return {}
+        return json.loads(self.body.decode("utf-8"))
+
+
+def _multipart_envelope(
+    fields: dict[str, str], file_field: str, filename: str, content_type: str
+) -> tuple[bytes, bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n".encode()
+    )
+    return b"".join(parts), f"\r\n--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def multipart_body(
+    fields: dict[str, str], file_field: str, filename: str, content: bytes, content_type: str
+) -> tuple[bytes, str]:
+    """Encode form fields followed by one file as ``multipart/form-data``; returns (body, Content-Type)."""
+    head, tail, multipart_type = _multipart_envelope(fields, file_field, filename, content_type)
+    return head + content + tail, multipart_type
+
+
+class MultipartFileBody:
+    """A ``multipart/form-data`` body whose file part is read from ``open_file`` in blocks while it is sent.
+
+    Pass it as ``body`` with ``headers`` from ``headers()``: the length is known up
+    front, so the request is not chunked, and the file is never held in memory.
+    Each iteration reopens the file, so a retried request sends the whole body again.
+    """
+
+    block_size = 256 * 1024
+
+    def __init__(
+        self,
+        fields: dict[str, str],
+        file_field: str,
+        filename: str,
+        open_file: Callable[[], BinaryIO],
+        size: int,
+        content_type: str,
+    ):
+        self.head, self.tail, self.content_type = _multipart_envelope(fields, file_field, filename, content_type)
+        self.open_file = open_file
+        self.size = size
+
+    def __len__(self) -> int:
+        return len(self.head) + self.size + len(self.tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.head
+        with self.open_file() as handle:
+            while block := handle.read(self.block_size):
+                yield block
+        yield self.tail
+
+    def headers(self) -> dict[str, str]:
+        return {"Content-Type": self.content_type, "Content-Length": str(len(self))}
+
+
+class ConnectionPool:
+    """Idle keep-alive connections for a single scheme/host/port."""
+
+    def __init__(self, scheme: str, host: str, port: int | None, maxsize: int):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                connection = self._idle.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=timeout), False
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool) -> None:
+        if reusable:
+            with self._lock:
+                if len(self._idle) < self.maxsize:
+                    self._idle.append(connection)
+                    return
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class HttpClient:
+    """Thread-safe HTTP/1.1 client with per-host keep-alive pools and retry/backoff.
+
+    Connection errors and ``RETRY_STATUSES`` are retried with exponential backoff,
+    but only for idempotent requests unless the caller opts in. For those, a reused
+    keep-alive socket that fails before any response arrives is retried once more
+    right away on a fresh connection, without counting against ``max_retries``.
+    """
+
+    def __init__(
+        self,
+        timeout: float | None = None,
+        max_retries: int | None = None,
+        backoff_factor: float | None = None,
+        pool_size: int | None = None,
+    ):
+        self.timeout = settings.HTTP_CLIENT_TIMEOUT if timeout is None else timeout
+        self.max_retries = settings.HTTP_CLIENT_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_factor = settings.HTTP_CLIENT_BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+        self.pool_size = settings.HTTP_CLIENT_POOL_SIZE if pool_size is None else pool_size
+        self._pools: dict[tuple[str, str, int | None], ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def _pool_for(self, scheme: str, host: str, port: int | None) -> ConnectionPool:
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = ConnectionPool(scheme, host, port, self.pool_size)
+            return pool
+
+    def _backoff(self, attempt: int, response: HttpResponse | None = None) -> float:
+        if response is not None and "retry-after" in response.headers:
+            try:
+                return float(response.headers["retry-after"])
+            except ValueError:
+                pass
+        return self.backoff_factor * (2**attempt)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        body: bytes | Iterable[bytes] | None = None,
+        json_body=None,
+        form: dict | None = None,
+        timeout: float | None = None,
+        retry: bool | None = None,
+    ) -> HttpResponse:
+        method = method.upper()
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in {"http", "https"} or not parsed.hostname:
+            raise HttpError(f"Unsupported URL: {url}")
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+
+        headers = dict(headers or {})
+        if json_body is not None:
+            body = json.dumps(json_body).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        elif form is not None:
+            body = urllib.parse.urlencode(form).encode("utf-8")
+            headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
+
+        retry = method in IDEMPOTENT_METHODS if retry is None else retry
+        pool = self._pool_for(parsed.scheme, parsed.hostname, parsed.port)
+        timeout = self.timeout if timeout is None else timeout
+
+        started = time.perf_counter()
+        try:
+            response = self._send(method, parsed, path, headers, body, pool, timeout, retry)
+        except HttpError:
+            external_request_seconds.observe(time.perf_counter() - started, parsed.hostname, "error")
+            raise
+        external_request_seconds.observe(time.perf_counter() - started, parsed.hostname, response.status)
+        return response
+
+    def _send(self, method, parsed, path, headers, body, pool, timeout, retry) -> HttpResponse:
+        attempt = 0
+        stale_retried = False
+        while True:
+            connection, reused = pool.acquire(timeout)
+            raw = None
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                raw = connection.getresponse()
+                response = HttpResponse(
+                    status=raw.status,
+                    headers={key.lower(): value for key, value in raw.getheaders()},
+                    body=raw.read(),
+                )
+            except (OSError, http.client.HTTPException) as exc:
+                pool.release(connection, reusable=False)
+                # An idle socket the server already closed fails before any response arrives.
+                stale = reused and raw is None and not isinstance(exc, TimeoutError)
+                if stale and retry and not stale_retried:
+                    stale_retried = True
+                    continue
+                if not retry or attempt >= self.max_retries:
+                    raise HttpError(f"{method} {parsed.hostname} failed: {exc}") from exc
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            pool.release(connection, reusable=not raw.will_close)
+            if response.status in RETRY_STATUSES and retry and attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, response))
+                attempt += 1
+                continue
+            return response
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+_client: HttpClient | None = None
+_client_pid: int | None = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide client; a forked worker gets its own pools."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = HttpClient()
+            _client_pid = os.getpid()
+        return _client
+
+
+class TimedAsyncTransport(httpx.AsyncBaseTransport):
+    """Records time to response headers for the async client, like ``HttpClient.request`` does."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.HTTPError:
+            external_request_seconds.observe(time.perf_counter() - started, request.url.host, "error")
+            raise
+        external_request_seconds.observe(time.perf_counter() - started, request.url.host, response.status_code)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the pooled non-blocking client for the running event loop.
+
+    Under an ASGI server there is one loop per process, so this is effectively a
+    process-wide pool; under WSGI each ``async_to_sync`` call gets a fresh loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=settings.HTTP_CLIENT_TIMEOUT,
+            # httpx ignores the client's limits once a transport is given, so the pool size goes here.
+            transport=TimedAsyncTransport(
+                httpx.AsyncHTTPTransport(
+                    retries=settings.HTTP_CLIENT_MAX_RETRIES,
+                    limits=httpx.Limits(max_keepalive_connections=settings.HTTP_CLIENT_POOL_SIZE),
+                )
+            ),
+        )
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,163 @@
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import DesignAsset
+
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:  # pragma: no cover - Pillow is optional
+    Image = None
+    UnidentifiedImageError = OSError
+
+
+@dataclass
+class ImageReport:
+    width: int
+    height: int
+    dpi: int | None
+    color_mode: str
+    previews: dict[int, bytes]
+
+
+def analyze_image(source, sizes: list[int], quality: int = 80) -> ImageReport:
+    """Decode an image once and derive its print metadata and WebP previews.
+
+    ``source`` is a file path or the raw bytes. Previews are scaled down from the
+    next larger preview rather than from the original, and JPEGs are decoded at
+    a reduced scale when the largest preview allows it.
+    """
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as original:
+        width, height = original.size
+        color_mode = original.mode
+        dpi = original.info.get("dpi")
+        has_alpha = "A" in color_mode or "transparency" in original.info
+        original.draft("RGB", (max(sizes), max(sizes)))
+        image = original.convert("RGBA" if has_alpha else "RGB")
+
+    previews = {}
+    for size in sorted(sizes, reverse=True):
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=quality)
+        previews[size] = buffer.getvalue()
+    return ImageReport(
+        width=width,
+        height=height,
+        dpi=round(min(dpi)) if dpi and min(dpi) > 0 else None,
+        color_mode=color_mode,
+        previews=previews,
+    )
+
+
+def _analyze_or_error(source, sizes: list[int], quality: int) -> ImageReport | str:
+    try:
+        return analyze_image(source, sizes, quality)
+    except UnidentifiedImageError:
+        return DesignAsset.ProcessingStatus.SKIPPED
+    except Exception as exc:  # noqa: BLE001
+        return f"{type(exc).__name__}: {exc}"
+
+
+def _use_pool(count: int) -> bool:
+    # Celery's prefork children are daemonic and may not start processes of their own; the media worker uses threads.
+    return count > 1 and settings.ASSET_IMAGE_WORKERS > 1 and not multiprocessing.current_process().daemon
+
+
+_pools: dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    """The process pool of this worker, started on first use and kept so its interpreters load Django only once.
+
+    Spawned, not forked: the media worker runs threads, and a fork could copy a lock
+    another thread holds. The children set up Django themselves; the worker function
+    never touches the database.
+    """
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+            )
+        return _pools[workers]
+
+
+def analyze_many(sources: list, sizes: list[int], quality: int = 80) -> list[ImageReport | str]:
+    """``analyze_image`` for a batch, spread over a process pool when there is more than one image."""
+    if not _use_pool(len(sources)):
+        return [_analyze_or_error(source, sizes, quality) for source in sources]
+    pool = _pool(settings.ASSET_IMAGE_WORKERS)
+    try:
+        return list(pool.map(_analyze_or_error, sources, [sizes] * len(sources), [quality] * len(sources)))
+    except BrokenProcessPool:
+        # A child died (e.g. killed for memory); the next batch starts a fresh pool.
+        with _pools_lock:
+            if _pools.get(settings.ASSET_IMAGE_WORKERS) is pool:
+                del _pools[settings.ASSET_IMAGE_WORKERS]
+        raise
+
+
+def _source(asset: DesignAsset):
+    try:
+        return asset.file.path
+    except NotImplementedError:
+        with asset.file.open("rb") as handle:
+            return handle.read()
+
+
+def preview_name(asset: DesignAsset, size: int) -> str:
+    return f"previews/{asset.sha256 or asset.id}/{size}.webp"
+
+
+def process_assets(asset_ids: list[int]) -> dict:
+    """Fill in dimensions, DPI, color mode and previews for pending assets."""
+    assets = list(DesignAsset.objects.filter(id__in=asset_ids, processing_status=DesignAsset.ProcessingStatus.PENDING))
+    summary = {"ready": [], "skipped": [], "failed": {}}
+    if not assets:
+        return summary
+    if Image is None:
+        DesignAsset.objects.filter(id__in=[asset.id for asset in assets]).update(
+            processing_status=DesignAsset.ProcessingStatus.SKIPPED
+        )
+        summary["skipped"] = [asset.id for asset in assets]
+        return summary
+
+    reports = analyze_many([_source(asset) for asset in assets], settings.ASSET_PREVIEW_SIZES)
+    now = timezone.now()
+    for asset, report in zip(assets, reports):
+        asset.updated_at = now
+        if report == DesignAsset.ProcessingStatus.SKIPPED:
+            asset.processing_status = DesignAsset.ProcessingStatus.SKIPPED
+            summary["skipped"].append(asset.id)
+        elif isinstance(report, str):
+            asset.processing_status = DesignAsset.ProcessingStatus.FAILED
+            summary["failed"][asset.id] = report
+        else:
+            previews = {}
+            for size, data in report.previews.items():
+                name = preview_name(asset, size)
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                previews[str(size)] = default_storage.save(name, ContentFile(data))
+            asset.width_px = report.width
+            asset.height_px = report.height
+            asset.dpi = report.dpi
+            asset.color_mode = report.color_mode
+            asset.previews = previews
+            asset.processing_status = DesignAsset.ProcessingStatus.READY
+            summary["ready"].append(asset.id)
+
+    DesignAsset.objects.bulk_update(
+        assets, ["width_px", "height_px", "dpi", "color_mode", "previews", "processing_status", "updated_at"]
+    )
+    return summary
@@ -1,20 +1,33 @@
+import base64
 import hashlib
 import hmac
 import json
 import secrets
+import threading
+import time
 import urllib.parse
-import urllib.request
 from dataclasses import dataclass
 
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core import signing
 from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
+from .http import HttpError, get_async_http_client, get_http_client
 from .models import IntegrationConnection
 
 SHOPIFY_STATE_CACHE_PREFIX = "shopify_oauth_state:"
 SHOPIFY_STATE_TTL_SECONDS = 600
+SHOPIFY_SHOP_QUERY = "{ shop { name myshopifyDomain } }"
+
+
+def shopify_graphql_url(shop: str) -> str:
+    return f"https://{shop}/admin/api/{settings.SHOPIFY_API_VERSION}/graphql.json"
 
 
 class IntegrationError(Exception):
@@ -37,12 +50,22 @@ class IntegrationStore:
         connection, _ = IntegrationConnection.objects.get_or_create(provider=provider)
         return connection
 
+    @classmethod
+    async def aget_or_create(cls, provider: str) -> IntegrationConnection:
+        connection, _ = await IntegrationConnection.objects.aget_or_create(provider=provider)
+        return connection
+
     @classmethod
     def set_secret(cls, connection: IntegrationConnection, secret: dict) -> None:
         payload = json.dumps(secret)
         connection.encrypted_secret = cls.signer.sign(payload)
         connection.save(update_fields=["encrypted_secret", "updated_at"])
 
+    @classmethod
+    async def aset_secret(cls, connection: IntegrationConnection, secret: dict) -> None:
+        connection.encrypted_secret = cls.signer.sign(json.dumps(secret))
+        await connection.asave(update_fields=["encrypted_secret", "updated_at"])
+
     @classmethod
     def get_secret(cls, connection: IntegrationConnection) -> dict | None:
         if not connection.encrypted_secret:
@@ -54,28 +77,99 @@ class IntegrationStore:
             return None
 
     @staticmethod
-    def clear(connection: IntegrationConnection) -> None:
+    def _reset(connection: IntegrationConnection) -> list[str]:
         connection.encrypted_secret = ""
         connection.metadata = {}
         connection.last_error = ""
         connection.last_verified_at = None
-        connection.save(update_fields=["encrypted_secret", "metadata", "last_error", "last_verified_at", "updated_at"])
+        return ["encrypted_secret", "metadata", "last_error", "last_verified_at", "updated_at"]
+
+    @classmethod
+    def clear(cls, connection: IntegrationConnection) -> None:
+        connection.save(update_fields=cls._reset(connection))
+
+    @classmethod
+    async def aclear(cls, connection: IntegrationConnection) -> None:
+        await connection.asave(update_fields=cls._reset(connection))
+
+
+class IntegrationStateCache:
+    """Process-local snapshot of every ``IntegrationConnection`` row and its decoded secret.
+
+    All providers load with one query and stay cached for ``INTEGRATION_STATE_TTL``
+    seconds. Saving or deleting a connection in this process drops the snapshot
+    right away; other processes see the change once their TTL runs out.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[IntegrationConnection, dict | None]] | None = None
+        self._expires_at = 0.0
+
+    def _current(self) -> dict[str, tuple[IntegrationConnection, dict | None]]:
+        with self._lock:
+            if self._entries is None or self.clock() >= self._expires_at:
+                self._entries = {
+                    connection.provider: (connection, IntegrationStore.get_secret(connection))
+                    for connection in IntegrationConnection.objects.all()
+                }
+                self._expires_at = self.clock() + settings.INTEGRATION_STATE_TTL
+            return self._entries
+
+    def connection(self, provider: str) -> IntegrationConnection | None:
+        """The cached row, shared between threads: read it, never modify or save it."""
+        entry = self._current().get(provider)
+        return entry[0] if entry else None
+
+    def secret(self, provider: str) -> dict | None:
+        entry = self._current().get(provider)
+        return dict(entry[1]) if entry and entry[1] is not None else None
+
+    async def asecret(self, provider: str) -> dict | None:
+        return await sync_to_async(self.secret)(provider)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries = None
+
+
+integration_state = IntegrationStateCache()
+
+
+@receiver([post_save, post_delete], sender=IntegrationConnection)
+def _connection_changed(**_kwargs) -> None:
+    integration_state.invalidate()
+    # Inside a transaction another thread may reload the old rows before the commit lands.
+    transaction.on_commit(integration_state.invalidate)
 
 
 class GelatoService:
+    @staticmethod
+    def _key_check_request(api_key: str) -> dict:
+        return {
+            "url": f"{settings.GELATO_API_URL}/catalogs",
+            "headers": {"X-API-KEY": api_key, "Accept": "application/json"},
+            "timeout": 12,
+        }
+
     @staticmethod
     def test_key(api_key: str) -> None:
-        request = urllib.request.Request(
-            "https://product.gelatoapis.com/v3/catalogs",
-            headers={"X-API-KEY": api_key, "Accept": "application/json"},
-            method="GET",
-        )
         try:
-            with urllib.request.urlopen(request, timeout=12) as response:
-                if response.status >= 400:
-                    raise IntegrationError("Invalid API key")
-        except Exception as exc:  # noqa: BLE001
+            response = get_http_client().request("GET", **GelatoService._key_check_request(api_key))
+        except HttpError as exc:
             raise IntegrationError("Invalid API key") from exc
+        if not response.ok:
+            raise IntegrationError("Invalid API key")
+
+    @staticmethod
+    async def atest_key(api_key: str) -> None:
+        try:
+            response = await get_async_http_client().get(**GelatoService._key_check_request(api_key))
+        except httpx.HTTPError as exc:
+            raise IntegrationError("Invalid API key") from exc
+        if response.is_error:
+            raise IntegrationError("Invalid API key")
 
 
 class ShopifyService:
@@ -105,6 +199,14 @@ class ShopifyService:
         digest = hmac.new(client_secret.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
         return hmac.compare_digest(digest, provided_hmac)
 
+    @staticmethod
+    def verify_webhook_hmac(body: bytes, provided_hmac: str, client_secret: str) -> bool:
+        """Check ``X-Shopify-Hmac-Sha256``, the base64 HMAC of the raw request body; no secret rejects everything."""
+        if not client_secret:
+            return False
+        digest = base64.b64encode(hmac.new(client_secret.encode("utf-8"), body, hashlib.sha256).digest()).decode()
+        return hmac.compare_digest(digest, provided_hmac)
+
     @staticmethod
     def create_oauth_redirect(shop_domain: str, redirect_uri: str) -> tuple[str, str]:
         state = secrets.token_urlsafe(24)
@@ -128,55 +230,93 @@ class ShopifyService:
             raise IntegrationError("State validation failed")
 
     @staticmethod
-    def exchange_token(shop: str, code: str) -> str:
-        payload = urllib.parse.urlencode(
-            {
-                "client_id": settings.SHOPIFY_CLIENT_ID,
-                "client_secret": settings.SHOPIFY_CLIENT_SECRET,
-                "code": code,
-            }
-        ).encode("utf-8")
-        request = urllib.request.Request(
-            f"https://{shop}/admin/oauth/access_token",
-            data=payload,
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            method="POST",
-        )
-        try:
-            with urllib.request.urlopen(request, timeout=15) as response:
-                body = json.loads(response.read().decode("utf-8"))
-        except Exception as exc:  # noqa: BLE001
-            raise IntegrationError("Token exchange failed") from exc
+    async def averify_state(state: str, shop: str) -> None:
+        cached_shop = await cache.aget(f"{SHOPIFY_STATE_CACHE_PREFIX}{state}")
+        await cache.adelete(f"{SHOPIFY_STATE_CACHE_PREFIX}{state}")
+        if not cached_shop or cached_shop != shop:
+            raise IntegrationError("State validation failed")
+
+    @staticmethod
+    def _token_form(code: str) -> dict:
+        return {
+            "client_id": settings.SHOPIFY_CLIENT_ID,
+            "client_secret": settings.SHOPIFY_CLIENT_SECRET,
+            "code": code,
+        }
 
+    @staticmethod
+    def _token_from(body: dict) -> str:
         token = body.get("access_token")
         if not token:
             raise IntegrationError("Token exchange failed")
         return token
 
+    @staticmethod
+    def exchange_token(shop: str, code: str) -> str:
+        try:
+            response = get_http_client().request(
+                "POST",
+                f"https://{shop}/admin/oauth/access_token",
+                form=ShopifyService._token_form(code),
+                timeout=15,
+            )
+            body = response.json() if response.ok else {}
+        except (HttpError, ValueError) as exc:
+            raise IntegrationError("Token exchange failed") from exc
+        return ShopifyService._token_from(body)
+
+    @staticmethod
+    async def aexchange_token(shop: str, code: str) -> str:
+        try:
+            response = await get_async_http_client().post(
+                f"https://{shop}/admin/oauth/access_token",
+                data=ShopifyService._token_form(code),
+                timeout=15,
+            )
+            body = response.json() if response.is_success else {}
+        except (httpx.HTTPError, ValueError) as exc:
+            raise IntegrationError("Token exchange failed") from exc
+        return ShopifyService._token_from(body)
+
     @staticmethod
     def test_connection(shop: str, access_token: str) -> None:
-        request = urllib.request.Request(
-            f"https://{shop}/admin/api/2026-01/graphql.json",
-            data=json.dumps({"query": "{ shop { name myshopifyDomain } }"}).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "X-Shopify-Access-Token": access_token,
-            },
-            method="POST",
-        )
         try:
-            with urllib.request.urlopen(request, timeout=15) as response:
-                if response.status >= 400:
-                    raise IntegrationError("Shop not reachable")
-        except Exception as exc:  # noqa: BLE001
+            response = get_http_client().request(
+                "POST",
+                shopify_graphql_url(shop),
+                json_body={"query": SHOPIFY_SHOP_QUERY},
+                headers={"X-Shopify-Access-Token": access_token},
+                timeout=15,
+                retry=True,
+            )
+        except HttpError as exc:
             raise IntegrationError("Shop not reachable") from exc
+        if not response.ok:
+            raise IntegrationError("Shop not reachable")
+
+    @staticmethod
+    async def atest_connection(shop: str, access_token: str) -> None:
+        try:
+            response = await get_async_http_client().post(
+                shopify_graphql_url(shop),
+                json={"query": SHOPIFY_SHOP_QUERY},
+                headers={"X-Shopify-Access-Token": access_token},
+                timeout=15,
+            )
+        except httpx.HTTPError as exc:
+            raise IntegrationError("Shop not reachable") from exc
+        if response.is_error:
+            raise IntegrationError("Shop not reachable")
 
 
 def integration_status_payload() -> list[IntegrationStatus]:
     providers = [IntegrationConnection.Provider.SHOPIFY, IntegrationConnection.Provider.GELATO]
     payload = []
     for provider in providers:
-        connection = IntegrationStore.get_or_create(provider)
+        connection = integration_state.connection(provider)
+        if connection is None:
+            payload.append(IntegrationStatus(provider=provider, status="disconnected", error_message=None, metadata={}))
+            continue
         status = "connected" if connection.encrypted_secret else "disconnected"
         if connection.last_error:
             status = "error"
@@ -185,15 +325,23 @@ def integration_status_payload() -> list[IntegrationStatus]:
                 provider=provider,
                 status=status,
                 error_message=connection.last_error or None,
-                metadata=connection.metadata,
+                metadata=dict(connection.metadata),
             )
         )
     return payload
 
 
-def mark_verified(connection: IntegrationConnection) -> None:
+def _apply_verified(connection: IntegrationConnection) -> list[str]:
     connection.last_verified_at = timezone.now()
     if connection.provider == IntegrationConnection.Provider.GELATO:
         connection.metadata = {**connection.metadata, "lastVerified": connection.last_verified_at.isoformat()}
     connection.last_error = ""
-    connection.save(update_fields=["last_verified_at", "metadata", "last_error", "updated_at"])
+    return ["last_verified_at", "metadata", "last_error", "updated_at"]
+
+
+def mark_verified(connection: IntegrationConnection) -> None:
+    connection.save(update_fields=_apply_verified(connection))
+
+
+async def amark_verified(connection: IntegrationConnection) -> None:
+    await connection.asave(update_fields=_apply_verified(connection))
@@ -0,0 +1,116 @@
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Max,
+    QuerySet,
+    Sum,
+)
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import JobRun, JobRunDailyStat
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.get_current_timezone())
+
+
+def _seconds(duration: timedelta | None) -> float:
+    return duration.total_seconds() if duration else 0.0
+
+
+def _rollup(queryset: QuerySet) -> list[dict]:
+    duration = ExpressionWrapper(F("updated_at") - F("created_at"), output_field=DurationField())
+    return list(
+        queryset.annotate(day=TruncDate("created_at"))
+        .values("day", "task_name", "status")
+        .annotate(count=Count("id"), total=Sum(duration), longest=Max(duration))
+        .order_by()
+    )
+
+
+def compact_job_history(retention_days: int | None = None) -> dict:
+    """Fold ``JobRun`` rows from days older than the retention window into ``JobRunDailyStat``.
+
+    Works one day per transaction, so a large backlog never holds long locks and a
+    crash loses no counts. Returns the number of compacted rows and days.
+    """
+    retention_days = settings.JOBRUN_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = _day_start(timezone.localdate() - timedelta(days=retention_days))
+    oldest = JobRun.objects.filter(created_at__lt=cutoff).order_by("created_at").values_list("created_at", flat=True)
+    first = oldest.first()
+    if first is None:
+        return {"rows": 0, "days": 0}
+
+    compacted = days = 0
+    day = timezone.localdate(first)
+    while _day_start(day) < cutoff:
+        rows = JobRun.objects.filter(
+            created_at__gte=_day_start(day), created_at__lt=_day_start(day + timedelta(days=1))
+        )
+        with transaction.atomic():
+            groups = _rollup(rows)
+            for group in groups:
+                stat, _ = JobRunDailyStat.objects.select_for_update().get_or_create(
+                    day=group["day"], task_name=group["task_name"], status=group["status"]
+                )
+                stat.count += group["count"]
+                stat.total_seconds += _seconds(group["total"])
+                stat.max_seconds = max(stat.max_seconds, _seconds(group["longest"]))
+                stat.save()
+            deleted, _ = rows.delete()
+        compacted += deleted
+        days += bool(groups)
+        day += timedelta(days=1)
+    return {"rows": compacted, "days": days}
+
+
+def job_stats(days: int, task_name: str | None = None) -> dict:
+    """Per-day counts and durations for the last ``days`` days.
+
+    Compacted days come from ``JobRunDailyStat``; the retention window that still
+    has raw rows is rolled up on the fly through the ``created_at`` index.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    stats = JobRunDailyStat.objects.filter(day__gte=since)
+    live = JobRun.objects.filter(created_at__gte=_day_start(since))
+    if task_name:
+        stats = stats.filter(task_name=task_name)
+        live = live.filter(task_name=task_name)
+
+    merged: dict[tuple, dict] = {}
+    for stat in stats.values("day", "task_name", "status", "count", "total_seconds", "max_seconds"):
+        merged[(stat["day"], stat["task_name"], stat["status"])] = stat
+    for group in _rollup(live):
+        key = (group["day"], group["task_name"], group["status"])
+        entry = merged.setdefault(
+            key,
+            {**dict(zip(("day", "task_name", "status"), key)), "count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+        )
+        entry["count"] += group["count"]
+        entry["total_seconds"] += _seconds(group["total"])
+        entry["max_seconds"] = max(entry["max_seconds"], _seconds(group["longest"]))
+
+    items = []
+    totals: dict[str, dict[str, int]] = {}
+    for key in sorted(merged, reverse=True):
+        entry = merged[key]
+        items.append(
+            {
+                "day": entry["day"].isoformat(),
+                "task_name": entry["task_name"],
+                "status": entry["status"],
+                "count": entry["count"],
+                "avg_seconds": round(entry["total_seconds"] / entry["count"], 3) if entry["count"] else 0.0,
+                "max_seconds": round(entry["max_seconds"], 3),
+            }
+        )
+        task_totals = totals.setdefault(entry["task_name"], {})
+        task_totals[entry["status"]] = task_totals.get(entry["status"], 0) + entry["count"]
+    return {"since": since.isoformat(), "items": items, "totals": totals}
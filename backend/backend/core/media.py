@@ -0,0 +1,71 @@
+from dataclasses import dataclass, field
+from functools import partial
+
+from django.conf import settings
+
+from .drafts import chunked
+from .models import DesignAsset, ShopifyFile
+from .services import ExternalServiceError, ShopifyAdapter, StagedFile
+
+
+class UnreadableAssetError(Exception):
+    """An asset's file cannot be read from storage; pushing it again will not help."""
+
+
+@dataclass
+class StagedAssets:
+    """Upload errors by asset id, and which of those assets have no readable file at all."""
+
+    errors: dict[int, str] = field(default_factory=dict)
+    unreadable: set[int] = field(default_factory=set)
+
+
+def _staged_file(asset: DesignAsset) -> StagedFile:
+    if not asset.file.name:
+        raise ValueError("no file stored")
+    storage = asset.file.storage
+    return StagedFile(
+        filename=asset.original_filename or asset.file.name.rsplit("/", 1)[-1],
+        mime_type=asset.mime_type or "application/octet-stream",
+        size=storage.size(asset.file.name),
+        open=partial(storage.open, asset.file.name, "rb"),
+    )
+
+
+def stage_draft_assets(adapter: ShopifyAdapter, draft_ids: list[int]) -> StagedAssets:
+    """Upload the assets of these drafts that are not Shopify files yet; returns the errors by asset id.
+
+    Runs once per push batch, before any product is touched, so an asset shared by
+    the whole batch is uploaded once and every later push only references it.
+    Drafts whose assets failed are left to ``core.sync.push_product``, which refuses
+    to push them: for good if a file is unreadable, retryably if only its upload failed. Two batches racing for the same new asset may both upload it;
+    the first ``ShopifyFile`` wins and both batches use it.
+    """
+    assets = (
+        DesignAsset.objects.filter(drafts__in=draft_ids, shopify_file__isnull=True)
+        .distinct()
+        .order_by("id")
+        .only("id", "file", "original_filename", "mime_type")
+    )
+    result = StagedAssets()
+    for chunk in chunked(assets, settings.SHOPIFY_MEDIA_BATCH_SIZE):
+        staged = []
+        for asset in chunk:
+            try:
+                staged.append((asset, _staged_file(asset)))
+            except (OSError, ValueError) as exc:
+                result.errors[asset.id] = f"Asset file is not readable: {exc}"
+                result.unreadable.add(asset.id)
+        if not staged:
+            continue
+        try:
+            uploaded, failed = adapter.upload_files([file for _asset, file in staged])
+        except ExternalServiceError as exc:
+            result.errors.update((asset.id, str(exc)) for asset, _file in staged)
+            continue
+        ShopifyFile.objects.bulk_create(
+            [ShopifyFile(asset=staged[index][0], shopify_file_id=file_id) for index, file_id in uploaded.items()],
+            ignore_conflicts=True,
+        )
+        result.errors.update((staged[index][0].id, error) for index, error in failed.items())
+    return result
@@ -0,0 +1,280 @@
+import bisect
+import contextvars
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction
+from celery import signals as celery_signals
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.decorators import sync_and_async_middleware
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis ships with celery[redis]
+    redis = None
+
+SNAPSHOT_INDEX_KEY = "metrics:processes"
+# What the Redis cache backend raises when the server is unreachable.
+CACHE_ERRORS = (OSError,) + ((redis.RedisError,) if redis else ())
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+PUBLISHED_AT_HEADER = "lazypod_published_at"
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Cumulative Prometheus histogram; one lock-protected list of counts per label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # one count per bucket plus +Inf, then sum and count
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> dict[tuple, list[float]]:
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+    def render(self, series: dict[tuple, list[float]]) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), values):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le=le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {values[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {values[-1]}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Registry:
+    """The metrics of this process, plus the snapshots other processes leave in the cache.
+
+    Every process (ASGI server, Celery workers) records into its own in-memory
+    histograms and at most every ``METRICS_PUBLISH_INTERVAL`` seconds copies them to
+    the cache, so one ``/api/metrics`` scrape covers web and worker processes alike.
+    """
+
+    def __init__(self):
+        self.metrics: dict[str, Histogram] = {}
+        self.key = f"metrics:process:{socket.gethostname()}:{os.getpid()}"
+        self._published_at = 0.0
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...], buckets=LATENCY_BUCKETS):
+        metric = self.metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return metric
+
+    def snapshot(self) -> dict[str, dict[tuple, list[float]]]:
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def publish(self) -> None:
+        self._published_at = time.monotonic()
+        # A forked worker starts from its parent's histograms but must not overwrite its parent's snapshot.
+        self.key = f"metrics:process:{socket.gethostname()}:{os.getpid()}"
+        ttl = settings.METRICS_SNAPSHOT_TTL
+        cache.set(self.key, self.snapshot(), ttl)
+        now = time.time()
+        members = {key: seen for key, seen in (cache.get(SNAPSHOT_INDEX_KEY) or {}).items() if now - seen < ttl}
+        members[self.key] = now
+        cache.set(SNAPSHOT_INDEX_KEY, members, None)
+
+    def maybe_publish(self) -> None:
+        if time.monotonic() - self._published_at >= settings.METRICS_PUBLISH_INTERVAL:
+            try:
+                self.publish()
+            except CACHE_ERRORS:
+                # Metrics never break the request or task that fed them.
+                logger.warning("Could not publish the metrics snapshot", exc_info=True)
+
+    def collect(self) -> dict[str, dict[tuple, list[float]]]:
+        merged = self.snapshot()
+        others = [key for key in cache.get(SNAPSHOT_INDEX_KEY) or {} if key != self.key]
+        for snapshot in cache.get_many(others).values():
+            for name, series in snapshot.items():
+                target = merged.setdefault(name, {})
+                for labels, values in series.items():
+                    current = target.get(labels)
+                    target[labels] = values if current is None else [a + b for a, b in zip(current, values)]
+        return merged
+
+    def render(self) -> str:
+        collected = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.extend(metric.render(collected.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+http_request_seconds = registry.histogram(
+    "lazypod_http_request_duration_seconds", "Time spent handling API requests.", ("method", "route", "status")
+)
+task_seconds = registry.histogram("lazypod_task_duration_seconds", "Celery task run time.", ("task", "state"))
+task_queue_seconds = registry.histogram(
+    "lazypod_task_queue_wait_seconds", "Time between publishing a Celery task and a worker starting it.", ("task",)
+)
+db_queries = registry.histogram(
+    "lazypod_db_queries", "Database queries per request or task.", ("scope", "name"), QUERY_COUNT_BUCKETS
+)
+db_query_seconds = registry.histogram(
+    "lazypod_db_query_duration_seconds", "Database time per request or task.", ("scope", "name")
+)
+external_request_seconds = registry.histogram(
+    "lazypod_external_request_duration_seconds",
+    "Outbound HTTP requests to Shopify and Gelato, including retries.",
+    ("host", "status"),
+)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+_query_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
+
+
+def _count_queries(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def install_query_counter(connection) -> None:
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+@receiver(connection_created)
+def _connection_created(connection, **_kwargs) -> None:
+    install_query_counter(connection)
+
+
+def install_on_open_connections() -> None:
+    for connection in connections.all(initialized_only=True):
+        install_query_counter(connection)
+
+
+def _route(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return match.route if match is not None else "unmatched"
+
+
+@sync_and_async_middleware
+def MetricsMiddleware(get_response):
+    """Record latency, query count and DB time for every request, labelled by URL pattern."""
+
+    def record(request, response, started: float, stats: QueryStats) -> None:
+        route = _route(request)
+        http_request_seconds.observe(time.perf_counter() - started, request.method, route, response.status_code)
+        db_queries.observe(stats.count, "http", route)
+        db_query_seconds.observe(stats.seconds, "http", route)
+        registry.maybe_publish()
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            stats = QueryStats()
+            token = _query_stats.set(stats)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _query_stats.reset(token)
+            record(request, response, started, stats)
+            return response
+
+    else:
+
+        def middleware(request):
+            stats = QueryStats()
+            token = _query_stats.set(stats)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _query_stats.reset(token)
+            record(request, response, started, stats)
+            return response
+
+    return middleware
+
+
+_running_tasks: dict[str, tuple[float, QueryStats, contextvars.Token]] = {}
+
+
+@celery_signals.before_task_publish.connect
+def _stamp_published_at(headers=None, **_kwargs) -> None:
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+@celery_signals.task_prerun.connect
+def _task_started(task_id=None, task=None, **_kwargs) -> None:
+    published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+    if published_at is not None and not task.request.is_eager:
+        eta = task.request.eta
+        ready_at = max(published_at, _timestamp(eta)) if eta else published_at
+        task_queue_seconds.observe(max(0.0, time.time() - ready_at), task.name)
+    stats = QueryStats()
+    _running_tasks[task_id] = (time.perf_counter(), stats, _query_stats.set(stats))
+
+
+@celery_signals.task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **_kwargs) -> None:
+    entry = _running_tasks.pop(task_id, None)
+    if entry is None:
+        return
+    started, stats, token = entry
+    _query_stats.reset(token)
+    task_seconds.observe(time.perf_counter() - started, task.name, state or "UNKNOWN")
+    db_queries.observe(stats.count, "task", task.name)
+    db_query_seconds.observe(stats.seconds, "task", task.name)
+    registry.maybe_publish()
+
+
+def _timestamp(eta) -> float:
+    return (datetime.fromisoformat(eta) if isinstance(eta, str) else eta).timestamp()
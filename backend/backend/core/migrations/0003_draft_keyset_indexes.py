@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_integrationconnection"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productdraft",
+            index=models.Index(fields=["-created_at", "-id"], name="draft_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="productdraft",
+            index=models.Index(
+                fields=["status", "-created_at", "-id"], name="draft_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productdraft",
+            index=models.Index(
+                fields=["template", "-created_at", "-id"],
+                name="draft_template_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_asset_sha256_and_uploads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="designasset",
+            name="color_mode",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name="designasset",
+            name="dpi",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="designasset",
+            name="height_px",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="designasset",
+            name="previews",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="designasset",
+            name="processing_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("skipped", "Skipped"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name="designasset",
+            name="width_px",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="designasset",
+            index=models.Index(
+                fields=["width_px", "height_px"], name="asset_dimensions_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="designasset",
+            index=models.Index(fields=["dpi"], name="asset_dpi_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="designasset",
+            index=models.Index(fields=["color_mode"], name="asset_color_mode_idx"),
+        ),
+    ]
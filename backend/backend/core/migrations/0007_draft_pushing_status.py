@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_outbox"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="productdraft",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("draft", "Draft"),
+                    ("queued", "Queued"),
+                    ("pushing", "Pushing"),
+                    ("pushed", "Pushed"),
+                    ("failed", "Failed"),
+                ],
+                default="draft",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_draft_pushing_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobRunDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("day", models.DateField()),
+                ("task_name", models.CharField(max_length=120)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("success", "Success"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total_seconds", models.FloatField(default=0)),
+                ("max_seconds", models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="jobrun",
+            index=models.Index(
+                fields=["task_name", "reference_id", "-created_at"],
+                name="jobrun_task_reference_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobrun",
+            index=models.Index(fields=["created_at"], name="jobrun_created_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="jobrundailystat",
+            constraint=models.UniqueConstraint(
+                fields=("day", "task_name", "status"), name="jobrun_daily_stat_unique"
+            ),
+        ),
+    ]
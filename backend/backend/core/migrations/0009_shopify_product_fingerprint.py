@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_jobrun_indexes_and_daily_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shopifyproduct",
+            name="field_hashes",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="shopifyproduct",
+            name="fingerprint",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_shopify_file"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shopifyproduct",
+            name="remote_updated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="ShopifyWebhookEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("event_id", models.CharField(max_length=120, unique=True)),
+                ("topic", models.CharField(max_length=64)),
+                ("shop_domain", models.CharField(blank=True, max_length=255)),
+                ("triggered_at", models.DateTimeField(blank=True, null=True)),
+                ("body", models.TextField()),
+                (
+                    "processed_at",
+                    models.DateTimeField(blank=True, db_index=True, null=True),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("processed_at__isnull", True)),
+                        fields=["id"],
+                        name="webhook_pending_idx",
+                    )
+                ],
+            },
+        ),
+    ]
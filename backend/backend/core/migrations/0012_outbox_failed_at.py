@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_shopify_webhooks"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="outboxmessage",
+            name="outbox_pending_idx",
+        ),
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="failed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="outboxmessage",
+            index=models.Index(
+                condition=models.Q(
+                    ("dispatched_at__isnull", True), ("failed_at__isnull", True)
+                ),
+                fields=["id"],
+                name="outbox_pending_idx",
+            ),
+        ),
+    ]
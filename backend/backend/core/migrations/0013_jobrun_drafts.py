@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_outbox_failed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobrun",
+            name="drafts",
+            field=models.ManyToManyField(
+                blank=True, related_name="job_runs", to="core.productdraft"
+            ),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 
 
@@ -20,16 +22,53 @@ class Template(TimestampedModel):
 
 
 class DesignAsset(TimestampedModel):
+    class ProcessingStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        READY = "ready", "Ready"
+        SKIPPED = "skipped", "Skipped"
+        FAILED = "failed", "Failed"
+
     file = models.FileField(upload_to="assets/")
     original_filename = models.CharField(max_length=255)
     mime_type = models.CharField(max_length=100, blank=True)
     size_bytes = models.PositiveIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    width_px = models.PositiveIntegerField(null=True, blank=True)
+    height_px = models.PositiveIntegerField(null=True, blank=True)
+    dpi = models.PositiveIntegerField(null=True, blank=True)
+    color_mode = models.CharField(max_length=16, blank=True)
+    previews = models.JSONField(default=dict, blank=True)
+    processing_status = models.CharField(
+        max_length=16, choices=ProcessingStatus.choices, default=ProcessingStatus.PENDING
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["width_px", "height_px"], name="asset_dimensions_idx"),
+            models.Index(fields=["dpi"], name="asset_dpi_idx"),
+            models.Index(fields=["color_mode"], name="asset_color_mode_idx"),
+        ]
+
+
+class AssetUpload(TimestampedModel):
+    class Status(models.TextChoices):
+        RECEIVING = "receiving", "Receiving"
+        COMPLETE = "complete", "Complete"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    original_filename = models.CharField(max_length=255)
+    mime_type = models.CharField(max_length=100, blank=True)
+    size_bytes = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.RECEIVING)
+    asset = models.ForeignKey(DesignAsset, null=True, blank=True, on_delete=models.SET_NULL, related_name="uploads")
 
 
 class ProductDraft(TimestampedModel):
     class Status(models.TextChoices):
         DRAFT = "draft", "Draft"
         QUEUED = "queued", "Queued"
+        PUSHING = "pushing", "Pushing"
         PUSHED = "pushed", "Pushed"
         FAILED = "failed", "Failed"
 
@@ -42,11 +81,29 @@ class ProductDraft(TimestampedModel):
     template = models.ForeignKey(Template, on_delete=models.PROTECT, related_name="drafts")
     assets = models.ManyToManyField(DesignAsset, related_name="drafts")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="draft_created_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="draft_status_created_idx"),
+            models.Index(fields=["template", "-created_at", "-id"], name="draft_template_created_idx"),
+        ]
+
 
 class ShopifyProduct(TimestampedModel):
     draft = models.OneToOneField(ProductDraft, on_delete=models.CASCADE, related_name="shopify_product")
     shopify_product_id = models.CharField(max_length=120, unique=True)
     payload = models.JSONField(default=dict, blank=True)
+    # Per-field content hashes as last sent to Shopify, and one hash over all of them.
+    field_hashes = models.JSONField(default=dict, blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True)
+    # When the newest product webhook applied here happened; older deliveries are dropped.
+    remote_updated_at = models.DateTimeField(null=True, blank=True)
+
+
+class ShopifyFile(TimestampedModel):
+    # The asset as a file in the Shopify admin; every product that uses the asset references this one upload.
+    asset = models.OneToOneField(DesignAsset, on_delete=models.CASCADE, related_name="shopify_file")
+    shopify_file_id = models.CharField(max_length=120, unique=True)
 
 
 class JobRun(TimestampedModel):
@@ -60,6 +117,76 @@ class JobRun(TimestampedModel):
     reference_id = models.CharField(max_length=100)
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
     detail = models.JSONField(default=dict, blank=True)
+    # Every draft a push or re-sync run handled, so a draft's history covers batch and bulk runs too.
+    drafts = models.ManyToManyField(ProductDraft, blank=True, related_name="job_runs")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["task_name", "reference_id", "-created_at"], name="jobrun_task_reference_idx"),
+            models.Index(fields=["created_at"], name="jobrun_created_idx"),
+        ]
+
+
+class JobRunDailyStat(TimestampedModel):
+    """Per-day rollup of ``JobRun`` rows that were compacted away."""
+
+    day = models.DateField()
+    task_name = models.CharField(max_length=120)
+    status = models.CharField(max_length=16, choices=JobRun.Status.choices)
+    count = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    max_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "task_name", "status"], name="jobrun_daily_stat_unique"),
+        ]
+
+
+class OutboxMessage(TimestampedModel):
+    """A Celery task call recorded in the same transaction as the state change that caused it.
+
+    ``idempotency_key`` doubles as the Celery task id, so a task can tell a
+    duplicate delivery from the first one. A message that still cannot be sent
+    after ``OUTBOX_MAX_ATTEMPTS`` gets ``failed_at`` and is left for inspection.
+    """
+
+    idempotency_key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    task_name = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(dispatched_at__isnull=True, failed_at__isnull=True),
+                name="outbox_pending_idx",
+            ),
+        ]
+
+
+class ShopifyWebhookEvent(TimestampedModel):
+    """A Shopify webhook as received, kept until ``consume_shopify_webhooks`` has applied it.
+
+    ``event_id`` is Shopify's id for the event, so a redelivery is dropped on insert.
+    """
+
+    event_id = models.CharField(max_length=120, unique=True)
+    topic = models.CharField(max_length=64)
+    shop_domain = models.CharField(max_length=255, blank=True)
+    triggered_at = models.DateTimeField(null=True, blank=True)
+    body = models.TextField()
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(processed_at__isnull=True), name="webhook_pending_idx"),
+        ]
 
 
 class IntegrationConnection(TimestampedModel):
@@ -0,0 +1,74 @@
+import logging
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from kombu.exceptions import OperationalError as KombuOperationalError
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, **kwargs) -> OutboxMessage:
+    """Record a call to ``task``; the relay hands it to the broker after the current transaction commits."""
+    return OutboxMessage.objects.create(task_name=task.name, kwargs=kwargs)
+
+
+def enqueue_many(task, calls: list[dict]) -> list[OutboxMessage]:
+    return OutboxMessage.objects.bulk_create([OutboxMessage(task_name=task.name, kwargs=kwargs) for kwargs in calls])
+
+
+def relay_batch(batch_size: int | None = None) -> int:
+    """Send up to ``batch_size`` pending messages to Celery, oldest first. Returns how many were sent.
+
+    Rows are locked with ``SKIP LOCKED`` where the database supports it, so several
+    relays can drain the table side by side. A broker or connection error stops
+    the batch; the message is retried on the next run. Any other error only skips
+    the message, and after ``OUTBOX_MAX_ATTEMPTS`` it is marked failed, so it cannot
+    hold up the messages behind it. A message that was sent but not marked may be
+    sent twice, which the idempotency key absorbs.
+    """
+    batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True, failed_at__isnull=True)
+            .order_by("id")[:batch_size]
+        )
+        sent = []
+        for message in messages:
+            try:
+                current_app.tasks[message.task_name].apply_async(
+                    kwargs=message.kwargs, task_id=str(message.idempotency_key)
+                )
+            except Exception as exc:  # noqa: BLE001
+                broker_down = isinstance(exc, (KombuOperationalError, OSError))
+                attempts = message.attempts + 1
+                failed = not broker_down and attempts >= settings.OUTBOX_MAX_ATTEMPTS
+                OutboxMessage.objects.filter(id=message.id).update(
+                    attempts=attempts,
+                    last_error=str(exc),
+                    failed_at=timezone.now() if failed else None,
+                    updated_at=timezone.now(),
+                )
+                if failed:
+                    logger.error("Outbox message %s for %s failed for good: %s", message.id, message.task_name, exc)
+                if broker_down:
+                    break
+                continue
+            sent.append(message.id)
+        OutboxMessage.objects.filter(id__in=sent).update(dispatched_at=timezone.now(), updated_at=timezone.now())
+    return len(sent)
+
+
+def is_processed(idempotency_key: str | None) -> bool:
+    if idempotency_key is None:
+        return False
+    return OutboxMessage.objects.filter(idempotency_key=idempotency_key, processed_at__isnull=False).exists()
+
+
+def mark_processed(idempotency_key: str | None) -> None:
+    if idempotency_key is not None:
+        OutboxMessage.objects.filter(idempotency_key=idempotency_key).update(processed_at=timezone.now())
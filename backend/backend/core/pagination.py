@@ -0,0 +1,48 @@
+import base64
+import json
+from dataclasses import dataclass
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+
+def encode_cursor(created_at, pk: int) -> str:
+    raw = json.dumps([created_at.isoformat(), pk]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        parsed = parse_datetime(created_at)
+        if parsed is None or not isinstance(pk, int):
+            raise ValueError
+        return parsed, pk
+    except (ValueError, TypeError):
+        raise serializers.ValidationError({"cursor": ["Invalid cursor."]}) from None
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str | None
+
+
+def paginate_newest_first(queryset: QuerySet, cursor: str | None, limit: int) -> KeysetPage:
+    """Keyset page over ``(-created_at, -id)``; the cursor is the last row of the previous page.
+
+    Works for model querysets and for ``.values()`` querysets that include both columns.
+    """
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    items = list(queryset.order_by("-created_at", "-id")[: limit + 1])
+    if len(items) <= limit:
+        return KeysetPage(items=items, next_cursor=None)
+    items = items[:limit]
+    last = items[-1]
+    if isinstance(last, dict):
+        return KeysetPage(items=items, next_cursor=encode_cursor(last["created_at"], last["id"]))
+    return KeysetPage(items=items, next_cursor=encode_cursor(last.created_at, last.id))
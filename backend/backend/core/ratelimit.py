@@ -0,0 +1,123 @@
+import time
+import uuid
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+SHOPIFY_THROTTLE_CACHE_PREFIX = "shopify_throttle:"
+LOCK_TIMEOUT_SECONDS = 5
+
+
+@dataclass
+class BucketState:
+    available: float
+    maximum: float
+    restore_rate: float
+    updated_at: float
+
+    @property
+    def fill(self) -> float:
+        return self.available / self.maximum if self.maximum else 0.0
+
+
+class ShopifyCostLimiter:
+    """Client-side mirror of Shopify's GraphQL cost bucket for one shop.
+
+    The state lives in the Django cache so every worker sharing the cache paces
+    against the same bucket. ``acquire`` reserves the estimated query cost before a
+    request and sleeps until enough points have leaked back; ``update`` replaces the
+    estimate with the ``throttleStatus`` Shopify returns in ``extensions.cost``.
+    """
+
+    def __init__(self, shop: str, backend=None, clock=time.time, sleep=time.sleep):
+        self.shop = shop
+        self.cache = backend or cache
+        self.clock = clock
+        self.sleep = sleep
+        self.key = f"{SHOPIFY_THROTTLE_CACHE_PREFIX}{shop}"
+        self.lock_key = f"{self.key}:lock"
+
+    def _initial_state(self) -> BucketState:
+        return BucketState(
+            available=settings.SHOPIFY_THROTTLE_MAXIMUM,
+            maximum=settings.SHOPIFY_THROTTLE_MAXIMUM,
+            restore_rate=settings.SHOPIFY_THROTTLE_RESTORE_RATE,
+            updated_at=self.clock(),
+        )
+
+    def state(self) -> BucketState:
+        raw = self.cache.get(self.key)
+        state = BucketState(**raw) if raw else self._initial_state()
+        now = self.clock()
+        state.available = min(state.maximum, state.available + (now - state.updated_at) * state.restore_rate)
+        state.updated_at = now
+        return state
+
+    def _save(self, state: BucketState) -> None:
+        self.cache.set(self.key, asdict(state), timeout=None)
+
+    def _locked(self, callback):
+        """Run ``callback`` while holding the shop's lock; waits for it as long as it takes.
+
+        The lock expires after ``LOCK_TIMEOUT_SECONDS``, so a holder that died only
+        delays the others. It is released only if it still holds this call's token,
+        never after it expired and another worker took it.
+        """
+        token = uuid.uuid4().hex
+        while not self.cache.add(self.lock_key, token, timeout=LOCK_TIMEOUT_SECONDS):
+            self.sleep(0.01)
+        try:
+            return callback()
+        finally:
+            # Not atomic, but the callbacks take milliseconds against a five second lease.
+            if self.cache.get(self.lock_key) == token:
+                self.cache.delete(self.lock_key)
+
+    def acquire(self, cost: float) -> float:
+        """Reserve ``cost`` points, sleeping until they are available. Returns seconds waited."""
+        margin = settings.SHOPIFY_THROTTLE_SAFETY_MARGIN
+        waited = 0.0
+        while True:
+
+            def reserve():
+                state = self.state()
+                cost_needed = min(cost + margin, state.maximum)
+                if state.available >= cost_needed:
+                    state.available -= cost
+                    self._save(state)
+                    return 0.0
+                return (cost_needed - state.available) / state.restore_rate
+
+            delay = self._locked(reserve)
+            if delay <= 0:
+                return waited
+            self.sleep(delay)
+            waited += delay
+
+    def update(self, cost: dict) -> None:
+        throttle = cost.get("throttleStatus") or {}
+        if "currentlyAvailable" not in throttle:
+            return
+
+        def apply():
+            self._save(
+                BucketState(
+                    available=float(throttle["currentlyAvailable"]),
+                    maximum=float(throttle["maximumAvailable"]),
+                    restore_rate=float(throttle["restoreRate"]),
+                    updated_at=self.clock(),
+                )
+            )
+
+        self._locked(apply)
+
+    def snapshot(self) -> dict:
+        state = self.state()
+        return {
+            "shop": self.shop,
+            "available": round(state.available, 2),
+            "maximum": state.maximum,
+            "restoreRate": state.restore_rate,
+            "fill": round(state.fill, 4),
+        }
@@ -1,6 +1,17 @@
+import string
+
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
-from .models import DesignAsset, ProductDraft, ShopifyProduct, Template
+from .models import (
+    AssetUpload,
+    DesignAsset,
+    JobRun,
+    ProductDraft,
+    ShopifyProduct,
+    Template,
+)
 
 
 class TemplateSerializer(serializers.ModelSerializer):
@@ -9,16 +20,87 @@ class TemplateSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "gelato_template_id", "metadata", "is_active"]
 
 
+class PreviewURLField(serializers.Field):
+    """Maps stored preview names (``{"256": "previews/..."}``) to their storage URLs."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value: dict) -> dict:
+        return {size: default_storage.url(name) for size, name in value.items()}
+
+
 class DesignAssetSerializer(serializers.ModelSerializer):
+    previews = PreviewURLField()
+
     class Meta:
         model = DesignAsset
-        fields = ["id", "file", "original_filename", "mime_type", "size_bytes", "created_at"]
+        fields = [
+            "id",
+            "file",
+            "original_filename",
+            "mime_type",
+            "size_bytes",
+            "sha256",
+            "width_px",
+            "height_px",
+            "dpi",
+            "color_mode",
+            "previews",
+            "processing_status",
+            "created_at",
+        ]
+
+
+class AssetUploadSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AssetUpload
+        fields = [
+            "id",
+            "original_filename",
+            "mime_type",
+            "size_bytes",
+            "received_bytes",
+            "status",
+            "asset",
+            "chunk_size",
+        ]
+        read_only_fields = ["received_bytes", "status", "asset"]
+
+    def get_chunk_size(self, _obj) -> int:
+        return settings.ASSET_UPLOAD_CHUNK_SIZE
+
+    def validate_size_bytes(self, value: int) -> int:
+        if value < 1 or value > settings.ASSET_UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(f"Must be between 1 and {settings.ASSET_UPLOAD_MAX_BYTES} bytes.")
+        return value
 
 
 class ProductDraftSerializer(serializers.ModelSerializer):
+    """Nested draft representation with optional ``fields``/``expand`` projection.
+
+    Relations left out of ``expand`` are rendered as primary keys instead of nested objects.
+    """
+
+    EXPANDABLE = ("template", "assets")
+
     assets = DesignAssetSerializer(many=True, read_only=True)
     template = TemplateSerializer(read_only=True)
 
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand is not None:
+            if "template" not in expand:
+                self.fields["template"] = serializers.PrimaryKeyRelatedField(read_only=True)
+            if "assets" not in expand:
+                self.fields["assets"] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = ProductDraft
         fields = [
@@ -36,6 +118,19 @@ class ProductDraftSerializer(serializers.ModelSerializer):
         ]
 
 
+class DraftListQuerySerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=ProductDraft.Status.choices, required=False)
+    template_id = serializers.IntegerField(required=False)
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+
+class DraftExportQuerySerializer(serializers.Serializer):
+    format = serializers.ChoiceField(choices=("csv", "ndjson"), default="csv")
+    status = serializers.ChoiceField(choices=ProductDraft.Status.choices, required=False)
+    template_id = serializers.IntegerField(required=False)
+
+
 class DraftCreateItemSerializer(serializers.Serializer):
     template_id = serializers.IntegerField()
     title = serializers.CharField(max_length=255)
@@ -50,6 +145,75 @@ class BulkDraftCreateSerializer(serializers.Serializer):
     drafts = DraftCreateItemSerializer(many=True)
 
 
+class PlaceholderField(serializers.CharField):
+    """Text with ``str.format`` placeholders, limited to the names in ``PLACEHOLDERS``."""
+
+    PLACEHOLDERS = ("template", "asset", "filename", "index")
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        try:
+            names = {name for _text, name, _spec, _conversion in string.Formatter().parse(value) if name is not None}
+        except ValueError as exc:
+            raise serializers.ValidationError(f"Invalid placeholder syntax: {exc}.") from exc
+        unknown = sorted(names - set(self.PLACEHOLDERS))
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown placeholders {unknown}; use {', '.join('{' + name + '}' for name in self.PLACEHOLDERS)}."
+            )
+        try:
+            value.format_map({"template": "", "asset": "", "filename": "", "index": 1})
+        except (KeyError, ValueError, IndexError) as exc:
+            raise serializers.ValidationError(f"Invalid placeholder format: {exc}.") from exc
+        return value
+
+
+class DraftGenerateSerializer(serializers.Serializer):
+    template_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    asset_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    title = PlaceholderField(max_length=255)
+    description = PlaceholderField(allow_blank=True, required=False, default="")
+    tags = serializers.ListField(child=PlaceholderField(), required=False, default=list)
+    price = serializers.DecimalField(max_digits=8, decimal_places=2)
+
+    def validate(self, attrs):
+        attrs["template_ids"] = list(dict.fromkeys(attrs["template_ids"]))
+        attrs["asset_ids"] = list(dict.fromkeys(attrs["asset_ids"]))
+        total = len(attrs["template_ids"]) * len(attrs["asset_ids"])
+        if total > settings.DRAFT_GENERATE_MAX:
+            raise serializers.ValidationError(
+                f"{total} drafts requested; at most {settings.DRAFT_GENERATE_MAX} per generation."
+            )
+        return attrs
+
+
+class JobRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobRun
+        fields = ["id", "task_name", "reference_id", "status", "detail", "created_at", "updated_at"]
+
+
+class DraftPushSerializer(serializers.Serializer):
+    draft_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    status = serializers.ChoiceField(choices=ProductDraft.Status.choices, required=False)
+    template_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Provide draft_ids or at least one filter (status, template_id).")
+        return attrs
+
+
+class DraftResyncSerializer(serializers.Serializer):
+    draft_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    template_id = serializers.IntegerField(required=False)
+
+
+class JobStatsQuerySerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=1, max_value=366, default=7)
+    task_name = serializers.CharField(required=False)
+
+
 class ShopifyProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShopifyProduct
@@ -1,8 +1,104 @@
+import json
 import random
-from dataclasses import dataclass
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO
 
 from django.conf import settings
 
+from .http import (
+    HttpClient,
+    HttpError,
+    MultipartFileBody,
+    get_http_client,
+    multipart_body,
+)
+from .integrations import integration_state, shopify_graphql_url
+from .models import IntegrationConnection
+from .ratelimit import ShopifyCostLimiter
+
+PRODUCT_CREATE_MUTATION = """
+mutation productCreate($product: ProductCreateInput!) {
+  productCreate(product: $product) {
+    product { id title handle variants(first: 1) { nodes { id } } }
+    userErrors { field message }
+  }
+}
+"""
+
+PRODUCT_UPDATE_MUTATION = """
+mutation productUpdate($product: ProductUpdateInput!) {
+  productUpdate(product: $product) {
+    product { id title handle variants(first: 1) { nodes { id } } }
+    userErrors { field message }
+  }
+}
+"""
+
+PRODUCT_VARIANTS_QUERY = """
+query productVariants($id: ID!) {
+  product(id: $id) { variants(first: 1) { nodes { id } } }
+}
+"""
+
+VARIANTS_BULK_UPDATE_MUTATION = """
+mutation productVariantsBulkUpdate($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
+  productVariantsBulkUpdate(productId: $productId, variants: $variants) {
+    productVariants { id price }
+    userErrors { field message }
+  }
+}
+"""
+
+
+STAGED_UPLOADS_CREATE_MUTATION = """
+mutation stagedUploadsCreate($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+"""
+
+FILE_CREATE_MUTATION = """
+mutation fileCreate($files: [FileCreateInput!]!) {
+  fileCreate(files: $files) {
+    files { id fileStatus }
+    userErrors { field message }
+  }
+}
+"""
+
+FILE_UPDATE_MUTATION = """
+mutation fileUpdate($files: [FileUpdateInput!]!) {
+  fileUpdate(files: $files) {
+    files { id }
+    userErrors { field message }
+  }
+}
+"""
+
+BULK_OPERATION_RUN_MUTATION = """
+mutation bulkOperationRunMutation($mutation: String!, $stagedUploadPath: String!) {
+  bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $stagedUploadPath) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+BULK_OPERATION_QUERY = """
+query bulkOperation($id: ID!) {
+  node(id: $id) {
+    ... on BulkOperation { id status errorCode objectCount url partialDataUrl }
+  }
+}
+"""
+
+BULK_OPERATION_FINISHED = frozenset({"COMPLETED", "FAILED", "CANCELED", "EXPIRED"})
+
 
 class ExternalServiceError(Exception):
     pass
@@ -12,21 +108,396 @@ class ExternalServiceError(Exception):
 class PushResult:
     external_id: str
     payload: dict
+    # Hashes of the draft fields now on Shopify, and the fields an update sent (None after a create).
+    field_hashes: dict = field(default_factory=dict)
+    changed: list[str] | None = None
+
+
+@dataclass
+class StagedFile:
+    filename: str
+    mime_type: str
+    size: int
+    open: Callable[[], BinaryIO]
+
+    @property
+    def content_type(self) -> str:
+        return "IMAGE" if self.mime_type.startswith("image/") else "FILE"
+
+
+@dataclass
+class BulkOperation:
+    id: str
+    status: str
+    error_code: str | None = None
+    object_count: int = 0
+    url: str | None = None
+    partial_data_url: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in BULK_OPERATION_FINISHED
+
+    @property
+    def results_url(self) -> str | None:
+        return self.url or self.partial_data_url
+
+
+def _stored_secret(provider: str) -> dict:
+    return integration_state.secret(provider) or {}
 
 
 class ShopifyAdapter:
-    def create_product(self, draft_id: int, title: str) -> PushResult:
+    _cost_estimates: dict[str, float] = {}
+
+    def __init__(
+        self,
+        shop: str | None = None,
+        access_token: str | None = None,
+        api_url: str | None = None,
+        client: HttpClient | None = None,
+        limiter: ShopifyCostLimiter | None = None,
+    ):
+        self.client = client or get_http_client()
+        self.shop = shop
+        self.access_token = access_token
+        self.api_url = api_url
+        self.limiter = limiter
+
+    def _ensure_credentials(self) -> None:
+        if self.shop and self.access_token:
+            return
+        secret = _stored_secret(IntegrationConnection.Provider.SHOPIFY)
+        if not secret:
+            raise ExternalServiceError("Shopify is not connected.")
+        self.shop = self.shop or secret["shop"]
+        self.access_token = self.access_token or secret["accessToken"]
+
+    def _post(self, query: str, variables: dict | None) -> dict:
+        try:
+            response = self.client.request(
+                "POST",
+                self.api_url or shopify_graphql_url(self.shop),
+                json_body={"query": query, "variables": variables or {}},
+                headers={"X-Shopify-Access-Token": self.access_token},
+            )
+            body = response.json()
+        except (HttpError, ValueError) as exc:
+            raise ExternalServiceError(f"Shopify request failed: {exc}") from exc
+        if not response.ok:
+            raise ExternalServiceError(f"Shopify returned HTTP {response.status}")
+        return body
+
+    def graphql(self, query: str, variables: dict | None = None) -> dict:
+        self._ensure_credentials()
+        self.limiter = self.limiter or ShopifyCostLimiter(self.shop)
+        for _attempt in range(settings.SHOPIFY_THROTTLED_MAX_ATTEMPTS):
+            self.limiter.acquire(self._cost_estimates.get(query, settings.SHOPIFY_DEFAULT_QUERY_COST))
+            body = self._post(query, variables)
+            cost = body.get("extensions", {}).get("cost", {})
+            if cost:
+                self.limiter.update(cost)
+                self._cost_estimates[query] = cost.get("requestedQueryCost", settings.SHOPIFY_DEFAULT_QUERY_COST)
+            errors = body.get("errors")
+            if errors and any(error.get("extensions", {}).get("code") == "THROTTLED" for error in errors):
+                continue
+            if errors:
+                raise ExternalServiceError(f"Shopify returned errors: {errors}")
+            return body["data"]
+        raise ExternalServiceError("Shopify kept throttling the request.")
+
+    @staticmethod
+    def _product_input(fields: dict, names=None) -> dict:
+        """``ProductCreateInput``/``ProductUpdateInput`` values for the given ``core.sync.product_fields`` keys."""
+        names = fields.keys() if names is None else names
+        product = {}
+        if "title" in names:
+            product["title"] = fields["title"]
+        if "description" in names:
+            product["descriptionHtml"] = fields["description"]
+        if "tags" in names:
+            product["tags"] = fields["tags"]
+        if "seo" in names:
+            product["seo"] = {key: fields["seo"][key] for key in ("title", "description") if key in fields["seo"]}
+        if "template" in names:
+            product["productType"] = fields["template"]["name"]
+        return product
+
+    @staticmethod
+    def _user_errors(result: dict) -> None:
+        if result["userErrors"]:
+            raise ExternalServiceError("; ".join(error["message"] for error in result["userErrors"]))
+
+    def create_product(self, draft_id: int, title: str, fields: dict | None = None) -> PushResult:
         if settings.USE_MOCK_APIS:
+            if settings.SHOPIFY_MOCK_LATENCY_MS:
+                time.sleep(settings.SHOPIFY_MOCK_LATENCY_MS / 1000)
             fake_id = f"mock-shopify-{draft_id}-{random.randint(1000,9999)}"
             return PushResult(external_id=fake_id, payload={"title": title, "mode": "mock"})
-        raise ExternalServiceError("Real Shopify integration is not configured for this environment.")
+        product = self._product_input(fields) if fields else {"title": title}
+        data = self.graphql(PRODUCT_CREATE_MUTATION, {"product": {**product, "status": "DRAFT"}})
+        result = data["productCreate"]
+        self._user_errors(result)
+        return PushResult(external_id=result["product"]["id"], payload=result["product"])
+
+    def update_product(self, product_id: str, fields: dict, changed: list[str], payload: dict) -> dict:
+        """Send only the ``changed`` fields of an existing product; returns its updated payload.
+
+        Product-level fields go out as one ``productUpdate``, the price as a
+        ``productVariantsBulkUpdate`` of the default variant. Assets are not sent
+        here; ``core.sync.push_product`` attaches their files with ``attach_files``.
+        """
+        product = self._product_input(fields, changed)
+        if settings.USE_MOCK_APIS:
+            if settings.SHOPIFY_MOCK_LATENCY_MS and (product or "price" in changed):
+                time.sleep(settings.SHOPIFY_MOCK_LATENCY_MS / 1000)
+            return {**payload, **product, "mode": "mock"}
+
+        payload = dict(payload)
+        if product:
+            data = self.graphql(PRODUCT_UPDATE_MUTATION, {"product": {"id": product_id, **product}})
+            self._user_errors(data["productUpdate"])
+            payload.update(data["productUpdate"]["product"])
+        if "price" in changed:
+            variants = payload.get("variants", {}).get("nodes") or []
+            if not variants:
+                data = self.graphql(PRODUCT_VARIANTS_QUERY, {"id": product_id})
+                if data["product"] is None:
+                    raise ExternalServiceError(f"Shopify product {product_id} no longer exists.")
+                payload["variants"] = data["product"]["variants"]
+                variants = payload["variants"]["nodes"]
+            data = self.graphql(
+                VARIANTS_BULK_UPDATE_MUTATION,
+                {"productId": product_id, "variants": [{"id": variants[0]["id"], "price": fields["price"]}]},
+            )
+            self._user_errors(data["productVariantsBulkUpdate"])
+        return payload
+
+    def start_bulk_product_create(self, products: list[dict]) -> BulkOperation:
+        """Create one product per ``core.sync.product_fields`` dict with a single ``bulkOperationRunMutation``.
+
+        The ``productCreate`` variables go to Shopify as one staged JSONL upload, so
+        the whole batch costs three GraphQL calls instead of one mutation per product.
+        Result line ``n`` belongs to ``products[n]``.
+        """
+        if settings.USE_MOCK_APIS:
+            if settings.SHOPIFY_MOCK_LATENCY_MS:
+                time.sleep(settings.SHOPIFY_MOCK_LATENCY_MS / 1000)
+            return BulkOperation(id=f"mock-bulk-{len(products)}-{random.randint(1000,9999)}", status="CREATED")
+
+        lines = b"".join(
+            json.dumps({"product": {**self._product_input(fields), "status": "DRAFT"}}).encode() + b"\n"
+            for fields in products
+        )
+        data = self.graphql(
+            STAGED_UPLOADS_CREATE_MUTATION,
+            {
+                "input": [
+                    {
+                        "resource": "BULK_MUTATION_VARIABLES",
+                        "filename": "drafts.jsonl",
+                        "mimeType": "text/jsonl",
+                        "httpMethod": "POST",
+                    }
+                ]
+            },
+        )
+        self._user_errors(data["stagedUploadsCreate"])
+        target = data["stagedUploadsCreate"]["stagedTargets"][0]
+        fields = {parameter["name"]: parameter["value"] for parameter in target["parameters"]}
+        body, content_type = multipart_body(fields, "file", "drafts.jsonl", lines, "text/jsonl")
+        self._post_staged(target["url"], body, {"Content-Type": content_type})
+
+        data = self.graphql(
+            BULK_OPERATION_RUN_MUTATION, {"mutation": PRODUCT_CREATE_MUTATION, "stagedUploadPath": fields["key"]}
+        )
+        self._user_errors(data["bulkOperationRunMutation"])
+        operation = data["bulkOperationRunMutation"]["bulkOperation"]
+        return BulkOperation(id=operation["id"], status=operation["status"])
+
+    def _post_staged(self, url: str, body, headers: dict[str, str]) -> None:
+        try:
+            response = self.client.request("POST", url, body=body, headers=headers, retry=True)
+        except HttpError as exc:
+            raise ExternalServiceError(f"Staged upload failed: {exc}") from exc
+        if not response.ok:
+            raise ExternalServiceError(f"Staged upload returned HTTP {response.status}")
+
+    def _upload_staged_file(self, target: dict, file: StagedFile) -> str:
+        fields = {parameter["name"]: parameter["value"] for parameter in target["parameters"]}
+        body = MultipartFileBody(fields, "file", file.filename, file.open, file.size, file.mime_type)
+        self._post_staged(target["url"], body, body.headers())
+        return target["resourceUrl"]
+
+    def upload_files(self, files: list[StagedFile]) -> tuple[dict[int, str], dict[int, str]]:
+        """Turn local files into Shopify files; returns ``({index: file id}, {index: error})``.
+
+        One ``stagedUploadsCreate`` and one ``fileCreate`` cover the whole list; the
+        file contents go to the staged targets concurrently, at most
+        ``SHOPIFY_MEDIA_UPLOAD_CONCURRENCY`` at a time, streamed from storage. A failed
+        upload only fails its own file.
+        """
+        if settings.USE_MOCK_APIS:
+            if settings.SHOPIFY_MOCK_LATENCY_MS:
+                time.sleep(settings.SHOPIFY_MOCK_LATENCY_MS / 1000)
+            return {index: f"mock-file-{random.randint(100000, 999999)}" for index in range(len(files))}, {}
+
+        data = self.graphql(
+            STAGED_UPLOADS_CREATE_MUTATION,
+            {
+                "input": [
+                    {
+                        "resource": file.content_type,
+                        "filename": file.filename,
+                        "mimeType": file.mime_type,
+                        "fileSize": str(file.size),
+                        "httpMethod": "POST",
+                    }
+                    for file in files
+                ]
+            },
+        )
+        self._user_errors(data["stagedUploadsCreate"])
+        targets = data["stagedUploadsCreate"]["stagedTargets"]
+
+        sources: dict[int, str] = {}
+        errors: dict[int, str] = {}
+        with ThreadPoolExecutor(max_workers=min(settings.SHOPIFY_MEDIA_UPLOAD_CONCURRENCY, len(files))) as pool:
+            futures = {
+                index: pool.submit(self._upload_staged_file, target, file)
+                for index, (target, file) in enumerate(zip(targets, files, strict=True))
+            }
+            for index, future in futures.items():
+                try:
+                    sources[index] = future.result()
+                except (ExternalServiceError, OSError) as exc:
+                    errors[index] = str(exc)
+        if not sources:
+            return {}, errors
+
+        data = self.graphql(
+            FILE_CREATE_MUTATION,
+            {
+                "files": [
+                    {
+                        "originalSource": source,
+                        "contentType": files[index].content_type,
+                        "filename": files[index].filename,
+                    }
+                    for index, source in sources.items()
+                ]
+            },
+        )
+        self._user_errors(data["fileCreate"])
+        created = data["fileCreate"]["files"]
+        return {index: file["id"] for index, file in zip(sources, created, strict=True)}, errors
+
+    def attach_files(self, product_id: str, add: list[str], remove: list[str]) -> None:
+        """Reference existing Shopify files from a product (and drop old references) without uploading them again."""
+        if not add and not remove:
+            return
+        if settings.USE_MOCK_APIS:
+            if settings.SHOPIFY_MOCK_LATENCY_MS:
+                time.sleep(settings.SHOPIFY_MOCK_LATENCY_MS / 1000)
+            return
+        files = [{"id": file_id, "referencesToAdd": [product_id]} for file_id in add]
+        files += [{"id": file_id, "referencesToRemove": [product_id]} for file_id in remove]
+        self._user_errors(self.graphql(FILE_UPDATE_MUTATION, {"files": files})["fileUpdate"])
+
+    def bulk_operation(self, operation_id: str) -> BulkOperation:
+        if settings.USE_MOCK_APIS:
+            count = int(operation_id.split("-")[2])
+            return BulkOperation(id=operation_id, status="COMPLETED", object_count=count, url=f"mock://{operation_id}")
+        node = self.graphql(BULK_OPERATION_QUERY, {"id": operation_id})["node"]
+        if node is None:
+            raise ExternalServiceError(f"Unknown bulk operation {operation_id}.")
+        return BulkOperation(
+            id=node["id"],
+            status=node["status"],
+            error_code=node.get("errorCode"),
+            object_count=int(node.get("objectCount") or 0),
+            url=node.get("url"),
+            partial_data_url=node.get("partialDataUrl"),
+        )
+
+    def bulk_results(self, url: str):
+        """Yield ``(line number, PushResult or error message)`` for each line of a bulk result file."""
+        if settings.USE_MOCK_APIS and url.startswith("mock://"):
+            for line_number in range(int(url.split("-")[2])):
+                fake_id = f"mock-shopify-bulk-{line_number}-{random.randint(1000,9999)}"
+                yield line_number, PushResult(external_id=fake_id, payload={"mode": "mock"})
+            return
+        try:
+            response = self.client.request("GET", url)
+        except HttpError as exc:
+            raise ExternalServiceError(f"Bulk result download failed: {exc}") from exc
+        if not response.ok:
+            raise ExternalServiceError(f"Bulk result download returned HTTP {response.status}")
+        for raw in response.body.splitlines():
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            result = (line.get("data") or {}).get("productCreate")
+            if line.get("errors") or result is None:
+                yield line["__lineNumber"], f"Shopify returned errors: {line.get('errors')}"
+            elif result["userErrors"]:
+                yield line["__lineNumber"], "; ".join(error["message"] for error in result["userErrors"])
+            else:
+                yield line["__lineNumber"], PushResult(external_id=result["product"]["id"], payload=result["product"])
 
 
 class GelatoAdapter:
-    def list_templates(self) -> list[dict]:
+    def __init__(self, api_key: str | None = None, api_url: str | None = None, client: HttpClient | None = None):
+        self.client = client or get_http_client()
+        self.api_key = api_key
+        self.api_url = api_url or settings.GELATO_API_URL
+
+    def _ensure_api_key(self) -> None:
+        if self.api_key:
+            return
+        self.api_key = _stored_secret(IntegrationConnection.Provider.GELATO).get("apiKey") or settings.GELATO_API_KEY
+        if not self.api_key:
+            raise ExternalServiceError("Gelato is not connected.")
+
+    def get(self, path: str) -> dict:
+        self._ensure_api_key()
+        try:
+            response = self.client.request(
+                "GET",
+                f"{self.api_url}{path}",
+                headers={"X-API-KEY": self.api_key, "Accept": "application/json"},
+            )
+            body = response.json()
+        except (HttpError, ValueError) as exc:
+            raise ExternalServiceError(f"Gelato request failed: {exc}") from exc
+        if not response.ok:
+            raise ExternalServiceError(f"Gelato returned HTTP {response.status}")
+        return body
+
+    def iter_template_pages(self, page_size: int | None = None):
+        """Yield the Gelato catalog one page of template dicts at a time."""
         if settings.USE_MOCK_APIS:
-            return [
+            yield [
                 {"gelato_template_id": "gelato-tee-unisex", "name": "Unisex Tee", "metadata": {"category": "apparel"}},
                 {"gelato_template_id": "gelato-poster-a3", "name": "Poster A3", "metadata": {"category": "wall-art"}},
             ]
-        raise ExternalServiceError("Real Gelato integration is not configured for this environment.")
+            return
+        page_size = page_size or settings.GELATO_CATALOG_PAGE_SIZE
+        offset = 0
+        while True:
+            catalogs = self.get(f"/catalogs?limit={page_size}&offset={offset}").get("data", [])
+            if catalogs:
+                yield [
+                    {
+                        "gelato_template_id": catalog["catalogUid"],
+                        "name": catalog.get("title") or catalog["catalogUid"],
+                        "metadata": {"category": catalog["catalogUid"]},
+                    }
+                    for catalog in catalogs
+                ]
+            if len(catalogs) < page_size:
+                return
+            offset += page_size
+
+    def list_templates(self) -> list[dict]:
+        return [item for page in self.iter_template_pages() for item in page]
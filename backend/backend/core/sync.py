@@ -0,0 +1,167 @@
+import hashlib
+import json
+from collections.abc import Set
+from decimal import Decimal
+
+from django.db.models import Prefetch, QuerySet
+
+from .drafts import chunked
+from .media import UnreadableAssetError
+from .models import DesignAsset, ProductDraft, ShopifyFile, ShopifyProduct
+from .services import ExternalServiceError, PushResult, ShopifyAdapter
+
+SYNC_FIELDS = ("title", "description", "tags", "seo", "price", "template", "assets")
+# productCreate has no variants; push_product sets the price of the default variant right after it.
+CREATE_FIELDS = tuple(name for name in SYNC_FIELDS if name != "price")
+# A bulk operation only runs productCreate; the first re-sync sets the price and attaches the asset files.
+BULK_CREATE_FIELDS = tuple(name for name in CREATE_FIELDS if name != "assets")
+
+
+def with_sync_fields(queryset: QuerySet) -> QuerySet:
+    """Drafts with everything ``product_fields`` reads, in a fixed number of queries."""
+    return queryset.select_related("template", "shopify_product").prefetch_related(
+        Prefetch(
+            "assets",
+            queryset=DesignAsset.objects.select_related("shopify_file").only(
+                "id", "sha256", "shopify_file__shopify_file_id"
+            ),
+        )
+    )
+
+
+def product_fields(draft: ProductDraft) -> dict:
+    """The draft content that ends up on its Shopify product, in a canonical form."""
+    return {
+        "title": draft.title,
+        "description": draft.description,
+        "tags": sorted(draft.tags),
+        "seo": draft.seo,
+        "price": str(draft.price),
+        "template": {"id": draft.template.gelato_template_id, "name": draft.template.name},
+        "assets": sorted(asset.sha256 or f"asset:{asset.id}" for asset in draft.assets.all()),
+    }
+
+
+def field_hashes(fields: dict, names=SYNC_FIELDS) -> dict[str, str]:
+    return {
+        name: hashlib.sha256(
+            json.dumps(fields[name], sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+        ).hexdigest()[:16]
+        for name in names
+    }
+
+
+def fingerprint(hashes: dict[str, str]) -> str:
+    """One hash over all synced fields; a field missing from ``hashes`` never matches a complete set."""
+    return hashlib.sha256(";".join(f"{name}={hashes.get(name, '')}" for name in SYNC_FIELDS).encode()).hexdigest()
+
+
+def published_product(draft: ProductDraft) -> ShopifyProduct | None:
+    try:
+        return draft.shopify_product
+    except ShopifyProduct.DoesNotExist:
+        return None
+
+
+def changed_fields(product: ShopifyProduct, hashes: dict[str, str]) -> list[str]:
+    return [name for name in SYNC_FIELDS if product.field_hashes.get(name) != hashes[name]]
+
+
+def drifted_fields(draft: ProductDraft, remote: dict) -> list[str]:
+    """Synced fields whose value in a Shopify product webhook payload differs from the draft.
+
+    Only fields the REST payload carries are compared; ``draft`` needs its template.
+    """
+    drifted = []
+    if "title" in remote and remote["title"] != draft.title:
+        drifted.append("title")
+    if "body_html" in remote and (remote["body_html"] or "") != draft.description:
+        drifted.append("description")
+    if "tags" in remote:
+        tags = sorted(tag.strip() for tag in remote["tags"].split(",") if tag.strip())
+        if tags != sorted(draft.tags):
+            drifted.append("tags")
+    if "product_type" in remote and remote["product_type"] != draft.template.name:
+        drifted.append("template")
+    variants = remote.get("variants") or []
+    if variants and Decimal(variants[0]["price"]) != draft.price:
+        drifted.append("price")
+    return drifted
+
+
+def file_ids(draft: ProductDraft, unreadable: Set[int] = frozenset()) -> list[str]:
+    """Shopify file ids of the draft's assets, as uploaded by ``core.media.stage_draft_assets``.
+
+    A missing file is an ``ExternalServiceError`` worth retrying, unless its asset
+    is in ``unreadable``: then no later attempt can upload it either.
+    """
+    ids = []
+    missing = []
+    for asset in draft.assets.all():
+        try:
+            ids.append(asset.shopify_file.shopify_file_id)
+        except ShopifyFile.DoesNotExist:
+            missing.append(asset.id)
+    broken = sorted(set(missing) & unreadable)
+    if broken:
+        raise UnreadableAssetError(f"Asset files {broken} are not readable.")
+    if missing:
+        raise ExternalServiceError(f"Assets {sorted(missing)} are not uploaded to Shopify.")
+    return sorted(ids)
+
+
+def push_product(adapter: ShopifyAdapter, draft: ProductDraft, unreadable: Set[int] = frozenset()) -> PushResult:
+    """Create the draft's Shopify product, or send only the fields changed since the last push.
+
+    ``draft`` must come from ``with_sync_fields``, after its assets were staged;
+    ``unreadable`` are the asset ids staging could not read (see ``file_ids``). An
+    unchanged draft costs no Shopify call at all; ``PushResult.changed`` is empty
+    then, and ``None`` for a newly created product, whose price goes out in the same
+    push. The files attached to a product
+    are kept in its payload under ``"files"``, so a changed asset list only adds and
+    removes references.
+    """
+    fields = product_fields(draft)
+    hashes = field_hashes(fields)
+    files = file_ids(draft, unreadable)
+    product = published_product(draft)
+    if product is None:
+        result = adapter.create_product(draft_id=draft.id, title=draft.title, fields=fields)
+        result.field_hashes = {name: hashes[name] for name in CREATE_FIELDS}
+        # The product exists now; failing the draft would create it twice. The next re-sync retries what failed.
+        try:
+            result.payload = adapter.update_product(result.external_id, fields, ["price"], result.payload)
+        except ExternalServiceError:
+            pass
+        else:
+            result.field_hashes["price"] = hashes["price"]
+        try:
+            adapter.attach_files(result.external_id, files, [])
+        except ExternalServiceError:
+            del result.field_hashes["assets"]
+        else:
+            result.payload = {**result.payload, "files": files}
+        return result
+
+    changed = changed_fields(product, hashes)
+    payload = product.payload
+    if changed:
+        payload = adapter.update_product(product.shopify_product_id, fields, changed, payload)
+    if "assets" in changed:
+        attached = set(payload.get("files", []))
+        adapter.attach_files(product.shopify_product_id, sorted(set(files) - attached), sorted(attached - set(files)))
+        payload = {**payload, "files": files}
+    return PushResult(external_id=product.shopify_product_id, payload=payload, field_hashes=hashes, changed=changed)
+
+
+def out_of_sync_draft_ids(queryset: QuerySet, chunk_size: int):
+    """Yield lists of ids of published drafts whose content no longer matches their stored fingerprint."""
+    drafts = with_sync_fields(queryset.filter(status=ProductDraft.Status.PUSHED, shopify_product__isnull=False))
+    for chunk in chunked(drafts.order_by("id").iterator(chunk_size=chunk_size), chunk_size):
+        changed = [
+            draft.id
+            for draft in chunk
+            if draft.shopify_product.fingerprint != fingerprint(field_hashes(product_fields(draft)))
+        ]
+        if changed:
+            yield changed
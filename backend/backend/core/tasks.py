@@ -1,40 +1,568 @@
+import itertools
+from datetime import timedelta
+
 from celery import shared_task
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from .models import JobRun, ProductDraft, ShopifyProduct
-from .services import ExternalServiceError, ShopifyAdapter
+from .catalog import sync_templates
+from .drafts import chunked, claim_drafts, generate_matrix
+from .events import draft_status_events, publish_events
+from .imaging import process_assets
+from .jobs import compact_job_history
+from .media import UnreadableAssetError, stage_draft_assets
+from .models import (
+    JobRun,
+    OutboxMessage,
+    ProductDraft,
+    ShopifyProduct,
+    ShopifyWebhookEvent,
+)
+from .outbox import enqueue, enqueue_many, is_processed, mark_processed, relay_batch
+from .services import ExternalServiceError, GelatoAdapter, PushResult, ShopifyAdapter
+from .sync import (
+    BULK_CREATE_FIELDS,
+    field_hashes,
+    fingerprint,
+    out_of_sync_draft_ids,
+    product_fields,
+    published_product,
+    push_product,
+    with_sync_fields,
+)
+from .webhooks import consume_webhook_batch
 
+PUSH_MAX_RETRIES = 3
 
-@shared_task(bind=True, autoretry_for=(ExternalServiceError,), retry_backoff=True, retry_kwargs={"max_retries": 3})
-def push_draft_to_shopify(self, draft_id: int) -> str:
-    job = JobRun.objects.create(
-        task_name="push_draft_to_shopify",
-        reference_id=str(draft_id),
-        status=JobRun.Status.RUNNING,
+
+def _by_id(errors: dict[int, str]) -> dict[str, str]:
+    return {str(key): error for key, error in errors.items()}
+
+
+def _link_drafts(job: JobRun, draft_ids: list[int]) -> None:
+    job.drafts.add(*ProductDraft.objects.filter(id__in=draft_ids).values_list("id", flat=True))
+
+
+def _record_pushed(pushed: dict[int, PushResult], now) -> list[dict]:
+    """Upsert the Shopify products of pushed drafts and mark the drafts pushed; returns their events."""
+    ShopifyProduct.objects.bulk_create(
+        [
+            ShopifyProduct(
+                draft_id=draft_id,
+                shopify_product_id=result.external_id,
+                payload=result.payload,
+                field_hashes=result.field_hashes,
+                fingerprint=fingerprint(result.field_hashes) if result.field_hashes else "",
+            )
+            for draft_id, result in pushed.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["draft"],
+        update_fields=["shopify_product_id", "payload", "field_hashes", "fingerprint", "updated_at"],
     )
+    ProductDraft.objects.filter(id__in=pushed.keys()).update(status=ProductDraft.Status.PUSHED, updated_at=now)
+    return [
+        event
+        for draft_id, result in pushed.items()
+        for event in draft_status_events([draft_id], ProductDraft.Status.PUSHED, shopify_product_id=result.external_id)
+    ]
 
-    draft = ProductDraft.objects.get(id=draft_id)
-    adapter = ShopifyAdapter()
+
+@shared_task(
+    bind=True, autoretry_for=(ExternalServiceError,), retry_backoff=True, retry_kwargs={"max_retries": PUSH_MAX_RETRIES}
+)
+def push_draft_to_shopify(self, draft_id: int) -> str | None:
+    if is_processed(self.request.id):
+        return None
+    if not claim_drafts([draft_id]):
+        return None
+    job = media = None
     try:
-        result = adapter.create_product(draft_id=draft.id, title=draft.title)
+        job = JobRun.objects.create(
+            task_name="push_draft_to_shopify",
+            reference_id=str(draft_id),
+            status=JobRun.Status.RUNNING,
+        )
+        job.drafts.add(draft_id)
+        adapter = ShopifyAdapter()
+        media = stage_draft_assets(adapter, [draft_id])
+        draft = with_sync_fields(ProductDraft.objects.filter(id=draft_id)).get()
+        result = push_product(adapter, draft, media.unreadable)
         with transaction.atomic():
             ShopifyProduct.objects.update_or_create(
                 draft=draft,
                 defaults={
                     "shopify_product_id": result.external_id,
                     "payload": result.payload,
+                    "field_hashes": result.field_hashes,
+                    "fingerprint": fingerprint(result.field_hashes),
                 },
             )
             draft.status = ProductDraft.Status.PUSHED
             draft.save(update_fields=["status", "updated_at"])
+            mark_processed(self.request.id)
+            publish_events(draft_status_events([draft.id], draft.status, shopify_product_id=result.external_id))
         job.status = JobRun.Status.SUCCESS
-        job.detail = {"shopify_product_id": result.external_id}
+        job.detail = {"shopify_product_id": result.external_id, "changed": result.changed}
         job.save(update_fields=["status", "detail", "updated_at"])
         return result.external_id
     except Exception as exc:
-        draft.status = ProductDraft.Status.FAILED
-        draft.save(update_fields=["status", "updated_at"])
+        # Autoretry needs the draft back in QUEUED so the next attempt can claim it.
+        will_retry = isinstance(exc, ExternalServiceError) and self.request.retries < PUSH_MAX_RETRIES
+        status = ProductDraft.Status.QUEUED if will_retry else ProductDraft.Status.FAILED
+        ProductDraft.objects.filter(id=draft_id).update(status=status, updated_at=timezone.now())
+        publish_events(draft_status_events([draft_id], status))
+        if job is not None:
+            job.status = JobRun.Status.FAILED
+            job.detail = {"error": str(exc), "media_errors": _by_id(media.errors) if media else {}}
+            job.save(update_fields=["status", "detail", "updated_at"])
+        raise
+
+
+@shared_task(bind=True, max_retries=PUSH_MAX_RETRIES)
+def push_drafts_to_shopify_batch(self, draft_ids: list[int]) -> dict:
+    if is_processed(self.request.id):
+        return {"pushed": 0, "failed": 0, "duplicate": True}
+    job = JobRun.objects.create(
+        task_name="push_drafts_to_shopify_batch",
+        reference_id=self.request.id or "local",
+        status=JobRun.Status.RUNNING,
+        detail={"draft_ids": draft_ids, "attempt": self.request.retries},
+    )
+    _link_drafts(job, draft_ids)
+
+    claimed = [draft.id for draft in claim_drafts(draft_ids)]
+    skipped = sorted(set(draft_ids) - set(claimed))
+    try:
+        adapter = ShopifyAdapter()
+        media = stage_draft_assets(adapter, claimed)
+        drafts = list(with_sync_fields(ProductDraft.objects.filter(id__in=claimed)).order_by("id"))
+    except Exception as exc:
+        _fail_claimed(job, claimed, exc)
+        raise
+    pushed: dict[int, PushResult] = {}
+    retryable: dict[int, str] = {}
+    failed: dict[int, str] = {}
+    for draft in drafts:
+        try:
+            pushed[draft.id] = push_product(adapter, draft, media.unreadable)
+        except ExternalServiceError as exc:
+            retryable[draft.id] = str(exc)
+        except Exception as exc:  # noqa: BLE001
+            failed[draft.id] = str(exc)
+
+    will_retry = bool(retryable) and self.request.retries < self.max_retries
+    if not will_retry:
+        failed.update(retryable)
+
+    with transaction.atomic():
+        now = timezone.now()
+        events = _record_pushed(pushed, now)
+        ProductDraft.objects.filter(id__in=failed.keys()).update(status=ProductDraft.Status.FAILED, updated_at=now)
+        events += draft_status_events(failed, ProductDraft.Status.FAILED)
+        if will_retry:
+            ProductDraft.objects.filter(id__in=retryable.keys()).update(
+                status=ProductDraft.Status.QUEUED, updated_at=now
+            )
+            events += draft_status_events(retryable, ProductDraft.Status.QUEUED)
+        publish_events(events)
+
+        job.status = JobRun.Status.FAILED if failed or retryable else JobRun.Status.SUCCESS
+        job.detail = {
+            **job.detail,
+            "pushed": {str(draft_id): result.external_id for draft_id, result in pushed.items()},
+            "failed": {str(draft_id): error for draft_id, error in failed.items()},
+            "retrying": sorted(retryable) if will_retry else [],
+            "skipped": skipped,
+            "media_errors": _by_id(media.errors),
+        }
+        job.save(update_fields=["status", "detail", "updated_at"])
+        if not will_retry:
+            mark_processed(self.request.id)
+
+    if will_retry:
+        raise self.retry(args=[], kwargs={"draft_ids": sorted(retryable)}, countdown=2**self.request.retries)
+    return {"pushed": len(pushed), "failed": len(failed), "skipped": len(skipped)}
+
+
+@shared_task(bind=True)
+def push_drafts_to_shopify_bulk(self, draft_ids: list[int]) -> dict | None:
+    """Push a large selection of drafts to Shopify as one bulk operation.
+
+    ``/api/drafts/push`` picks this over the batch pushes from
+    ``SHOPIFY_BULK_OPERATION_THRESHOLD`` drafts on. The claimed drafts stay
+    ``pushing`` until ``finish_shopify_bulk_push`` has read the operation's results.
+    If no operation can be started (Shopify runs one bulk mutation per shop at a
+    time), the drafts are queued again as ordinary batch pushes.
+    """
+    if is_processed(self.request.id):
+        return None
+    job = JobRun.objects.create(
+        task_name="push_drafts_to_shopify_bulk",
+        reference_id=self.request.id or "local",
+        status=JobRun.Status.RUNNING,
+        detail={"draft_ids": []},
+    )
+    _link_drafts(job, draft_ids)
+    claimed = [draft.id for draft in claim_drafts(draft_ids)]
+
+    try:
+        drafts = list(with_sync_fields(ProductDraft.objects.filter(id__in=claimed)).order_by("id"))
+        # Drafts that already have a product only need an update, which the batch pushes send.
+        published = [draft.id for draft in drafts if published_product(draft) is not None]
+        drafts = [draft for draft in drafts if published_product(draft) is None]
+        created = [draft.id for draft in drafts]
+        job.detail = {
+            "draft_ids": created,
+            "skipped": sorted(set(draft_ids) - set(claimed)),
+            "updates": len(published),
+            "claimed_at": timezone.now().isoformat(),
+        }
+        operation = (
+            ShopifyAdapter().start_bulk_product_create([product_fields(draft) for draft in drafts]) if drafts else None
+        )
+    except ExternalServiceError as exc:
+        with transaction.atomic():
+            _requeue_as_batches(claimed)
+            job.status = JobRun.Status.FAILED
+            job.detail = {**job.detail, "error": str(exc), "fallback": "batch"}
+            job.save(update_fields=["status", "detail", "updated_at"])
+            mark_processed(self.request.id)
+        return {"operation_id": None, "fallback": "batch", "drafts": len(claimed)}
+    except Exception as exc:
+        _fail_claimed(job, claimed, exc)
+        raise
+    if published:
+        with transaction.atomic():
+            _requeue_as_batches(published)
+
+    with transaction.atomic():
+        if operation is None:
+            job.status = JobRun.Status.SUCCESS
+            job.save(update_fields=["status", "detail", "updated_at"])
+        else:
+            job.detail = {**job.detail, "operation_id": operation.id, "progress": {"total": len(created), "done": 0}}
+            job.save(update_fields=["detail", "updated_at"])
+            # Through the outbox, so the poll cannot get lost between marking this task done and sending it.
+            enqueue(finish_shopify_bulk_push, job_id=job.id)
+        mark_processed(self.request.id)
+    return {"operation_id": operation and operation.id, "drafts": len(created), "updates": len(published)}
+
+
+def _fail_claimed(job: JobRun, draft_ids: list[int], exc: Exception) -> None:
+    """Fail claimed drafts and their job when a push breaks before the drafts are sent."""
+    with transaction.atomic():
+        ProductDraft.objects.filter(id__in=draft_ids, status=ProductDraft.Status.PUSHING).update(
+            status=ProductDraft.Status.FAILED, updated_at=timezone.now()
+        )
+        publish_events(draft_status_events(draft_ids, ProductDraft.Status.FAILED))
         job.status = JobRun.Status.FAILED
-        job.detail = {"error": str(exc)}
+        job.detail = {**job.detail, "error": str(exc)}
+        job.save(update_fields=["status", "detail", "updated_at"])
+
+
+def _requeue_as_batches(draft_ids: list[int]) -> None:
+    ProductDraft.objects.filter(id__in=draft_ids, status=ProductDraft.Status.PUSHING).update(
+        status=ProductDraft.Status.QUEUED, updated_at=timezone.now()
+    )
+    enqueue_many(
+        push_drafts_to_shopify_batch,
+        [{"draft_ids": chunk} for chunk in chunked(draft_ids, settings.SHOPIFY_PUSH_BATCH_SIZE)],
+    )
+    publish_events(draft_status_events(draft_ids, ProductDraft.Status.QUEUED))
+
+
+@shared_task(bind=True, max_retries=None)
+def finish_shopify_bulk_push(self, job_id: int) -> dict | None:
+    """Poll the bulk operation of a ``push_drafts_to_shopify_bulk`` job and apply its results.
+
+    Runs again every ``SHOPIFY_BULK_POLL_INTERVAL`` seconds until the operation has
+    finished, refreshing the drafts' claim so ``fail_stale_pushes`` leaves them alone.
+    Result lines map back to drafts by line number; drafts without a successful line
+    are marked failed, as are all of them once ``SHOPIFY_BULK_OPERATION_TIMEOUT`` has passed.
+    """
+    job = JobRun.objects.filter(id=job_id, status=JobRun.Status.RUNNING).first()
+    if job is None:
+        return None
+    draft_ids = job.detail["draft_ids"]
+    adapter = ShopifyAdapter()
+    timed_out = timezone.now() - job.created_at > timedelta(seconds=settings.SHOPIFY_BULK_OPERATION_TIMEOUT)
+    try:
+        operation = adapter.bulk_operation(job.detail["operation_id"])
+    except ExternalServiceError as exc:
+        if not timed_out:
+            raise self.retry(exc=exc, countdown=settings.SHOPIFY_BULK_POLL_INTERVAL)
+        operation = None
+    if operation is not None and not operation.finished and not timed_out:
+        _keep_bulk_claim(job, operation.object_count)
+        raise self.retry(countdown=settings.SHOPIFY_BULK_POLL_INTERVAL)
+
+    pushed: dict[int, PushResult] = {}
+    failed: dict[int, str] = {}
+    if operation is not None and operation.finished and operation.results_url:
+        for line_number, result in adapter.bulk_results(operation.results_url):
+            if 0 <= line_number < len(draft_ids):
+                if isinstance(result, PushResult):
+                    pushed[draft_ids[line_number]] = result
+                else:
+                    failed[draft_ids[line_number]] = result
+    outcome = "timed out" if operation is None or not operation.finished else operation.error_code or operation.status
+    for draft_id in draft_ids:
+        if draft_id not in pushed and draft_id not in failed:
+            failed[draft_id] = f"No result from the bulk operation ({outcome})."
+
+    summary = {"pushed": len(pushed), "failed": len(failed)}
+    with transaction.atomic():
+        now = timezone.now()
+        # Compare-and-set, so a duplicate poll cannot apply the results twice.
+        if not JobRun.objects.filter(id=job.id, status=JobRun.Status.RUNNING).update(updated_at=now):
+            return None
+        events = []
+        for chunk in chunked(pushed.items(), settings.DRAFT_BULK_CHUNK_SIZE):
+            chunk = dict(chunk)
+            # Hashed now rather than at upload time; drafts are not edited while they are being pushed.
+            for draft in with_sync_fields(ProductDraft.objects.filter(id__in=chunk)):
+                chunk[draft.id].field_hashes = field_hashes(product_fields(draft), BULK_CREATE_FIELDS)
+            events += _record_pushed(chunk, now)
+        for chunk in chunked(failed, settings.DRAFT_BULK_CHUNK_SIZE):
+            ProductDraft.objects.filter(id__in=chunk).update(status=ProductDraft.Status.FAILED, updated_at=now)
+            events += draft_status_events(chunk, ProductDraft.Status.FAILED)
+        publish_events(events)
+
+        job.status = JobRun.Status.FAILED if failed else JobRun.Status.SUCCESS
+        job.detail = {
+            **job.detail,
+            **summary,
+            "outcome": outcome,
+            "progress": {"total": len(draft_ids), "done": len(draft_ids)},
+            "errors": {str(draft_id): error for draft_id, error in itertools.islice(failed.items(), 100)},
+        }
+        job.save(update_fields=["status", "detail", "updated_at"])
+    return summary
+
+
+def _keep_bulk_claim(job: JobRun, done: int) -> None:
+    """Record progress and, every half claim timeout, push back the drafts' ``updated_at``.
+
+    The last refresh is kept in ``detail["claimed_at"]``; the job's own ``updated_at``
+    moves with every progress update and says nothing about the drafts.
+    """
+    now = timezone.now()
+    claimed_at = parse_datetime(job.detail.get("claimed_at", "")) or job.created_at
+    refresh = now - claimed_at >= timedelta(seconds=settings.DRAFT_PUSH_CLAIM_TIMEOUT / 2)
+    if not refresh and done == job.detail["progress"]["done"]:
+        return
+    if refresh:
+        for chunk in chunked(job.detail["draft_ids"], settings.DRAFT_BULK_CHUNK_SIZE):
+            ProductDraft.objects.filter(id__in=chunk, status=ProductDraft.Status.PUSHING).update(updated_at=now)
+        job.detail["claimed_at"] = now.isoformat()
+    job.detail["progress"]["done"] = done
+    job.save(update_fields=["detail", "updated_at"])
+
+
+@shared_task(bind=True)
+def resync_drafts_to_shopify(self, draft_ids: list[int]) -> dict:
+    """Send the fields of published drafts that changed since their last push; unchanged drafts cost nothing.
+
+    A failed update leaves the draft ``pushed`` with its old fingerprint, so the
+    next re-sync tries again.
+    """
+    if is_processed(self.request.id):
+        return {"updated": 0, "unchanged": 0, "failed": 0, "duplicate": True}
+    published = ProductDraft.objects.filter(
+        id__in=draft_ids, status=ProductDraft.Status.PUSHED, shopify_product__isnull=False
+    )
+    adapter = ShopifyAdapter()
+    media = stage_draft_assets(adapter, list(published.values_list("id", flat=True)))
+    drafts = with_sync_fields(published).order_by("id")
+    updated: dict[int, PushResult] = {}
+    failed: dict[int, str] = {}
+    unchanged = 0
+    for draft in drafts:
+        try:
+            result = push_product(adapter, draft, media.unreadable)
+        except (ExternalServiceError, UnreadableAssetError) as exc:
+            failed[draft.id] = str(exc)
+            continue
+        if result.changed:
+            updated[draft.id] = result
+        else:
+            unchanged += 1
+
+    with transaction.atomic():
+        publish_events(_record_pushed(updated, timezone.now()))
+        job = JobRun.objects.create(
+            task_name="resync_drafts_to_shopify",
+            reference_id=self.request.id or "local",
+            status=JobRun.Status.FAILED if failed else JobRun.Status.SUCCESS,
+            detail={
+                "updated": {str(draft_id): result.changed for draft_id, result in updated.items()},
+                "failed": {str(draft_id): error for draft_id, error in failed.items()},
+                "unchanged": unchanged,
+                "media_errors": _by_id(media.errors),
+            },
+        )
+        _link_drafts(job, draft_ids)
+        mark_processed(self.request.id)
+    return {"updated": len(updated), "unchanged": unchanged, "failed": len(failed)}
+
+
+@shared_task
+def resync_shopify_products(draft_ids: list[int] | None = None, template_id: int | None = None) -> dict:
+    """Queue re-syncs for the published drafts whose content no longer matches their fingerprint.
+
+    Runs nightly from beat and for ``POST /api/drafts/resync``. Only drafts that
+    actually changed get a ``resync_drafts_to_shopify`` batch; the rest are read once.
+    """
+    drafts = ProductDraft.objects.all()
+    if draft_ids is not None:
+        drafts = drafts.filter(id__in=draft_ids)
+    if template_id is not None:
+        drafts = drafts.filter(template_id=template_id)
+    changed = batches = 0
+    for draft_ids_chunk in out_of_sync_draft_ids(drafts, settings.DRAFT_BULK_CHUNK_SIZE):
+        messages = enqueue_many(
+            resync_drafts_to_shopify,
+            [{"draft_ids": chunk} for chunk in chunked(draft_ids_chunk, settings.SHOPIFY_PUSH_BATCH_SIZE)],
+        )
+        changed += len(draft_ids_chunk)
+        batches += len(messages)
+    return {"changed": changed, "batches": batches}
+
+
+@shared_task
+def generate_drafts(job_id: int) -> dict | None:
+    """Expand a template x asset matrix into drafts for the ``JobRun`` created by ``/api/drafts/generate``.
+
+    The job is claimed with a compare-and-set, so a duplicate delivery is a no-op. A
+    job left ``running`` by a dead worker can be claimed again once it has made no
+    progress for ``DRAFT_PUSH_CLAIM_TIMEOUT`` seconds; ``resume_stale_generate_jobs``
+    queues it again then, and it resumes from its saved position.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.DRAFT_PUSH_CLAIM_TIMEOUT)
+    claimable = Q(status=JobRun.Status.QUEUED) | Q(status=JobRun.Status.RUNNING, updated_at__lt=stale)
+    if not JobRun.objects.filter(claimable, id=job_id).update(status=JobRun.Status.RUNNING, updated_at=timezone.now()):
+        return None
+    job = JobRun.objects.get(id=job_id)
+    try:
+        progress = generate_matrix(job)
+    except Exception as exc:
+        job.status = JobRun.Status.FAILED
+        job.detail = {**job.detail, "error": str(exc)}
         job.save(update_fields=["status", "detail", "updated_at"])
         raise
+    job.status = JobRun.Status.SUCCESS
+    job.save(update_fields=["status", "updated_at"])
+    return progress
+
+
+@shared_task
+def resume_stale_generate_jobs() -> int:
+    """Queue ``generate_drafts`` again for jobs whose worker died mid-run."""
+    cutoff = timezone.now() - timedelta(seconds=settings.DRAFT_PUSH_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        job_ids = list(
+            JobRun.objects.filter(
+                task_name="generate_drafts", status=JobRun.Status.RUNNING, updated_at__lt=cutoff
+            ).values_list("id", flat=True)
+        )
+        enqueue_many(generate_drafts, [{"job_id": job_id} for job_id in job_ids])
+    return len(job_ids)
+
+
+@shared_task(bind=True)
+def process_design_assets(self, asset_ids: list[int]) -> dict:
+    job = JobRun.objects.create(
+        task_name="process_design_assets",
+        reference_id=self.request.id or "local",
+        status=JobRun.Status.RUNNING,
+        detail={"asset_ids": asset_ids},
+    )
+    summary = process_assets(asset_ids)
+    job.status = JobRun.Status.FAILED if summary["failed"] else JobRun.Status.SUCCESS
+    job.detail = {"asset_ids": asset_ids, **summary}
+    job.save(update_fields=["status", "detail", "updated_at"])
+    return {"ready": len(summary["ready"]), "skipped": len(summary["skipped"]), "failed": len(summary["failed"])}
+
+
+@shared_task(bind=True)
+def sync_gelato_templates(self) -> dict:
+    job = JobRun.objects.create(
+        task_name="sync_gelato_templates",
+        reference_id=self.request.id or "local",
+        status=JobRun.Status.RUNNING,
+    )
+    try:
+        summary = sync_templates(GelatoAdapter().iter_template_pages())
+    except ExternalServiceError as exc:
+        job.status = JobRun.Status.FAILED
+        job.detail = {"error": str(exc)}
+        job.save(update_fields=["status", "detail", "updated_at"])
+        return {"error": str(exc)}
+    job.status = JobRun.Status.SUCCESS
+    job.detail = summary
+    job.save(update_fields=["status", "detail", "updated_at"])
+    return summary
+
+
+@shared_task
+def fail_stale_pushes() -> int:
+    """Mark drafts whose worker died mid-push as failed.
+
+    They are not re-queued: the remote product may already exist, and only a
+    deliberate re-push should risk creating it twice.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.DRAFT_PUSH_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        stale = ProductDraft.objects.filter(status=ProductDraft.Status.PUSHING, updated_at__lt=cutoff)
+        draft_ids = list(stale.values_list("id", flat=True))
+        ProductDraft.objects.filter(id__in=draft_ids, status=ProductDraft.Status.PUSHING).update(
+            status=ProductDraft.Status.FAILED, updated_at=timezone.now()
+        )
+        publish_events(draft_status_events(draft_ids, ProductDraft.Status.FAILED))
+    return len(draft_ids)
+
+
+@shared_task
+def relay_outbox() -> int:
+    """Drain pending outbox messages to the broker in batches until the table is empty."""
+    relayed = 0
+    while True:
+        sent = relay_batch()
+        relayed += sent
+        if sent < settings.OUTBOX_RELAY_BATCH_SIZE:
+            return relayed
+
+
+@shared_task
+def prune_outbox() -> int:
+    cutoff = timezone.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    deleted, _ = OutboxMessage.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
+
+
+@shared_task
+def consume_shopify_webhooks() -> dict:
+    """Apply buffered Shopify webhooks in batches until the buffer is empty."""
+    totals: dict[str, int] = {}
+    while True:
+        counts = consume_webhook_batch()
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+        if counts["events"] < settings.SHOPIFY_WEBHOOK_BATCH_SIZE:
+            return totals
+
+
+@shared_task
+def prune_shopify_webhooks() -> int:
+    cutoff = timezone.now() - timedelta(hours=settings.SHOPIFY_WEBHOOK_RETENTION_HOURS)
+    deleted, _ = ShopifyWebhookEvent.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
+
+
+@shared_task
+def compact_job_runs() -> dict:
+    return compact_job_history()
@@ -1,11 +1,78 @@
+import asyncio
+import base64
+import csv
+import hashlib
+import hmac
+import http.client
 import io
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
 
 import pytest
+import redis
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from core.models import ProductDraft, Template
-from core.tasks import push_draft_to_shopify
+from config.celery import app as celery_app
+from core.catalog import sync_templates
+from core.drafts import DraftProjection, DraftReader, claim_drafts
+from core.events import draft_status_events, get_event_bus
+from core.http import HttpClient, HttpError, MultipartFileBody, multipart_body
+from core.imaging import analyze_many
+from core.integrations import (
+    IntegrationError,
+    IntegrationStateCache,
+    IntegrationStore,
+    ShopifyService,
+    integration_state,
+)
+from core.jobs import compact_job_history
+from core.metrics import db_queries, external_request_seconds, task_seconds
+from core.models import (
+    AssetUpload,
+    DesignAsset,
+    IntegrationConnection,
+    JobRun,
+    JobRunDailyStat,
+    OutboxMessage,
+    ProductDraft,
+    ShopifyFile,
+    ShopifyProduct,
+    ShopifyWebhookEvent,
+    Template,
+)
+from core.ratelimit import ShopifyCostLimiter
+from core.renderers import FastJSONRenderer
+from core.serializers import DesignAssetSerializer, ProductDraftSerializer
+from core.services import BulkOperation, ExternalServiceError, ShopifyAdapter
+from core.tasks import (
+    consume_shopify_webhooks,
+    finish_shopify_bulk_push,
+    generate_drafts,
+    push_draft_to_shopify,
+    push_drafts_to_shopify_batch,
+    push_drafts_to_shopify_bulk,
+    relay_outbox,
+    resume_stale_generate_jobs,
+    resync_drafts_to_shopify,
+    resync_shopify_products,
+)
+from core.uploads import UploadOffsetMismatch, append_chunk, staging_path
 
 
 @pytest.mark.django_db
@@ -41,7 +108,1711 @@ def test_mock_flow():
     assert response.status_code == 201
     draft_id = response.json()[0]["id"]
 
+    assert client.post(f"/api/drafts/{draft_id}/push").status_code == 202
     push_draft_to_shopify(draft_id)
     draft = ProductDraft.objects.get(id=draft_id)
     assert draft.status == ProductDraft.Status.PUSHED
     assert draft.shopify_product.shopify_product_id.startswith("mock-shopify-")
+
+
+def _bulk_payload(template, asset_ids, count):
+    return {
+        "drafts": [
+            {"template_id": template.id, "title": f"Draft {index}", "price": "9.99", "asset_ids": asset_ids}
+            for index in range(count)
+        ]
+    }
+
+
+@pytest.mark.django_db
+def test_bulk_create_query_count_is_constant():
+    client = APIClient()
+    template = Template.objects.create(name="Test", gelato_template_id="gelato-test")
+    assets = [
+        DesignAsset.objects.create(file=f"assets/{index}.png", original_filename=f"{index}.png") for index in range(3)
+    ]
+    asset_ids = [asset.id for asset in assets]
+
+    counts = []
+    for size in (1, 10, 100):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post("/api/drafts/bulk", _bulk_payload(template, asset_ids, size), format="json")
+        assert response.status_code == 201
+        assert len(response.json()) == size
+        assert [asset["id"] for asset in response.json()[0]["assets"]] == asset_ids
+        counts.append(len(ctx.captured_queries))
+
+    assert len(set(counts)) == 1
+    assert ProductDraft.assets.through.objects.count() == 111 * 3
+
+
+@pytest.mark.django_db
+def test_bulk_create_rejects_unknown_references():
+    client = APIClient()
+    template = Template.objects.create(name="Test", gelato_template_id="gelato-test")
+
+    response = client.post("/api/drafts/bulk", _bulk_payload(template, [999], 2), format="json")
+    assert response.status_code == 400
+    assert "asset_ids" in response.json()["drafts"]["0"]
+    assert not ProductDraft.objects.exists()
+
+
+@pytest.fixture(autouse=True)
+def fresh_integration_state():
+    # Rolled-back test transactions send no signals, so drop rows cached by a previous test.
+    integration_state.invalidate()
+
+
+@pytest.fixture
+def eager_celery():
+    previous = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    yield
+    celery_app.conf.task_always_eager = previous
+
+
+def _make_drafts(count, template=None, status=ProductDraft.Status.DRAFT):
+    template = template or Template.objects.create(name="Test", gelato_template_id="gelato-test")
+    return ProductDraft.objects.bulk_create(
+        [ProductDraft(template=template, title=f"Draft {index}", price="9.99", status=status) for index in range(count)]
+    )
+
+
+@pytest.mark.django_db
+def test_batch_push_endpoint_pushes_chunks(eager_celery, settings):
+    settings.SHOPIFY_PUSH_BATCH_SIZE = 2
+    drafts = _make_drafts(5)
+
+    response = APIClient().post("/api/drafts/push", {"status": "draft"}, format="json")
+    assert response.status_code == 202
+    assert response.json()["draft_count"] == 5
+    assert len(response.json()["task_ids"]) == 3
+    assert relay_outbox() == 3
+    assert ProductDraft.objects.filter(status=ProductDraft.Status.PUSHED).count() == len(drafts)
+    assert JobRun.objects.filter(task_name="push_drafts_to_shopify_batch").count() == 3
+
+
+@pytest.mark.django_db
+def test_batch_push_retries_only_failed_drafts(monkeypatch):
+    drafts = _make_drafts(3, status=ProductDraft.Status.QUEUED)
+    flaky_id = drafts[1].id
+    calls = []
+    original = ShopifyAdapter.create_product
+
+    def create_product(self, draft_id, title, fields=None):
+        calls.append(draft_id)
+        if draft_id == flaky_id and calls.count(flaky_id) == 1:
+            raise ExternalServiceError("throttled")
+        return original(self, draft_id, title, fields)
+
+    monkeypatch.setattr(ShopifyAdapter, "create_product", create_product)
+    # Called with kwargs, as the outbox relay does.
+    push_drafts_to_shopify_batch.apply(kwargs={"draft_ids": [draft.id for draft in drafts]})
+
+    assert calls == [drafts[0].id, flaky_id, drafts[2].id, flaky_id]
+    assert ProductDraft.objects.filter(status=ProductDraft.Status.PUSHED).count() == 3
+    assert ShopifyProduct.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_draft_history_includes_batch_and_bulk_runs(settings):
+    settings.SHOPIFY_BULK_OPERATION_THRESHOLD = 3
+    drafts = _make_drafts(3, status=ProductDraft.Status.QUEUED)
+    push_draft_to_shopify.apply(args=[drafts[0].id])
+    push_drafts_to_shopify_batch.apply(kwargs={"draft_ids": [drafts[0].id, drafts[1].id]})
+    push_drafts_to_shopify_bulk.apply(kwargs={"draft_ids": [draft.id for draft in drafts]})
+
+    history = drafts[0].job_runs.order_by("id").values_list("task_name", flat=True)
+    assert list(history) == ["push_draft_to_shopify", "push_drafts_to_shopify_batch", "push_drafts_to_shopify_bulk"]
+    assert drafts[2].job_runs.get().task_name == "push_drafts_to_shopify_bulk"
+
+
+@pytest.mark.django_db
+def test_push_fails_claimed_drafts_when_staging_breaks(monkeypatch, settings):
+    settings.SHOPIFY_BULK_OPERATION_THRESHOLD = 3
+    drafts = _make_drafts(5, status=ProductDraft.Status.QUEUED)
+
+    def broken(*_args):
+        raise ValueError("zip() argument 2 is shorter than argument 1")
+
+    monkeypatch.setattr("core.tasks.stage_draft_assets", broken)
+    push_draft_to_shopify.apply(args=[drafts[0].id])
+    push_drafts_to_shopify_batch.apply(kwargs={"draft_ids": [drafts[1].id]})
+    monkeypatch.setattr("core.tasks.with_sync_fields", broken)
+    push_drafts_to_shopify_bulk.apply(kwargs={"draft_ids": [draft.id for draft in drafts[2:]]})
+
+    assert set(ProductDraft.objects.values_list("status", flat=True)) == {ProductDraft.Status.FAILED}
+    jobs = JobRun.objects.order_by("id")
+    assert [job.task_name for job in jobs] == [
+        "push_draft_to_shopify",
+        "push_drafts_to_shopify_batch",
+        "push_drafts_to_shopify_bulk",
+    ]
+    assert {(job.status, job.detail["error"]) for job in jobs} == {
+        (JobRun.Status.FAILED, "zip() argument 2 is shorter than argument 1")
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    routes: dict = {}
+    seen: list = []
+    drop_connections = False
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.seen.append({"port": self.client_address[1], "method": self.command, "path": self.path, "body": body})
+        status, payload = (
+            self.routes[self.path].pop(0) if len(self.routes[self.path]) > 1 else self.routes[self.path][0]
+        )
+        raw = isinstance(payload, bytes)
+        data = payload if raw else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        # Without a "Connection: close" header, like a server whose keep-alive timeout ran out.
+        self.close_connection = self.close_connection or self.drop_connections
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    StubHandler.routes = {}
+    StubHandler.seen = []
+    StubHandler.drop_connections = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+def test_shopify_oauth_state_matches_the_shop_and_is_single_use():
+    _url, state = ShopifyService.create_oauth_redirect("demo.myshopify.com", "http://localhost/callback")
+
+    with pytest.raises(IntegrationError):
+        async_to_sync(ShopifyService.averify_state)(state, "other.myshopify.com")
+    _url, state = ShopifyService.create_oauth_redirect("demo.myshopify.com", "http://localhost/callback")
+    async_to_sync(ShopifyService.averify_state)(state, "demo.myshopify.com")
+    with pytest.raises(IntegrationError):
+        async_to_sync(ShopifyService.averify_state)(state, "demo.myshopify.com")
+
+
+def test_http_client_reuses_keep_alive_connection(stub_server):
+    _server, base_url = stub_server
+    StubHandler.routes["/ping"] = [(200, {"ok": True})]
+    client = HttpClient(max_retries=0)
+
+    for _ in range(3):
+        assert client.request("GET", f"{base_url}/ping").json() == {"ok": True}
+
+    assert len({request["port"] for request in StubHandler.seen}) == 1
+    client.close()
+
+
+def test_http_client_retries_idempotent_requests(stub_server):
+    _server, base_url = stub_server
+    StubHandler.routes["/flaky"] = [(503, {}), (503, {}), (200, {"ok": True})]
+    client = HttpClient(max_retries=2, backoff_factor=0)
+
+    assert client.request("GET", f"{base_url}/flaky").status == 200
+    assert client.request("POST", f"{base_url}/flaky", json_body={}).status == 200
+    assert len(StubHandler.seen) == 4
+
+
+def test_http_client_resends_only_safe_requests_on_a_stale_socket(stub_server):
+    _server, base_url = stub_server
+    StubHandler.routes["/ping"] = [(200, {"ok": True})]
+    StubHandler.drop_connections = True
+    client = HttpClient(max_retries=0)
+
+    assert client.request("GET", f"{base_url}/ping").ok
+    with pytest.raises(HttpError):
+        client.request("POST", f"{base_url}/ping", json_body={})
+    assert client.request("GET", f"{base_url}/ping").ok
+    assert client.request("GET", f"{base_url}/ping").ok
+    assert client.request("POST", f"{base_url}/ping", json_body={}, retry=True).ok
+
+    assert [request["method"] for request in StubHandler.seen] == ["GET", "GET", "GET", "POST"]
+    client.close()
+
+
+def test_http_client_retries_a_stale_socket_only_once(stub_server):
+    server, base_url = stub_server
+    StubHandler.routes["/ping"] = [(200, {"ok": True})]
+    client = HttpClient(max_retries=0)
+    pool = client._pool_for("http", "127.0.0.1", server.server_port)
+    for _ in range(2):
+        stale = http.client.HTTPConnection("127.0.0.1", server.server_port)
+        stale.connect()
+        stale.sock.shutdown(socket.SHUT_RDWR)
+        pool.release(stale, reusable=True)
+
+    with pytest.raises(HttpError):
+        client.request("GET", f"{base_url}/ping")
+    assert StubHandler.seen == []
+    client.close()
+
+
+@pytest.mark.django_db
+def test_shopify_adapter_creates_product_over_http(stub_server, settings):
+    settings.USE_MOCK_APIS = False
+    _server, base_url = stub_server
+    product = {"id": "gid://shopify/Product/1", "title": "Tee", "handle": "tee"}
+    StubHandler.routes["/graphql.json"] = [(200, {"data": {"productCreate": {"product": product, "userErrors": []}}})]
+    adapter = ShopifyAdapter(shop="demo.myshopify.com", access_token="token", api_url=f"{base_url}/graphql.json")
+
+    result = adapter.create_product(draft_id=1, title="Tee")
+
+    assert result.external_id == "gid://shopify/Product/1"
+    assert json.loads(StubHandler.seen[0]["body"])["variables"] == {"product": {"title": "Tee", "status": "DRAFT"}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_cost_limiter_waits_for_bucket_to_refill(settings):
+    settings.SHOPIFY_THROTTLE_SAFETY_MARGIN = 0
+    clock = FakeClock()
+    limiter = ShopifyCostLimiter(
+        "pace.myshopify.com", backend=LocMemCache("throttle", {}), clock=clock, sleep=clock.sleep
+    )
+    limiter.update({"throttleStatus": {"maximumAvailable": 100, "currentlyAvailable": 25, "restoreRate": 50}})
+
+    assert limiter.acquire(20) == 0
+    assert limiter.acquire(30) == pytest.approx(0.5)
+    assert limiter.snapshot()["available"] == pytest.approx(0)
+
+
+def test_cost_limiter_only_touches_the_bucket_under_its_own_lock(settings):
+    class TakenOver(LocMemCache):
+        def set(self, key, value, timeout=None, **kwargs):
+            super().set(key, value, timeout, **kwargs)
+            # Our lock expires mid-update and another worker takes it.
+            super().set(f"{key}:lock", "other", timeout)
+
+    clock = FakeClock()
+    backend = TakenOver("throttle-lock", {})
+    limiter = ShopifyCostLimiter("lock.myshopify.com", backend=backend, clock=clock, sleep=clock.sleep)
+    backend.add(limiter.lock_key, "held")
+
+    def sleep(seconds):
+        clock.sleep(seconds)
+        if clock.now > 1010:  # well past LOCK_TIMEOUT_SECONDS of fake time
+            backend.delete(limiter.lock_key)
+
+    limiter.sleep = sleep
+    limiter.update({"throttleStatus": {"maximumAvailable": 100, "currentlyAvailable": 25, "restoreRate": 50}})
+
+    assert clock.now > 1010
+    assert limiter.snapshot()["available"] == pytest.approx(25)
+    assert backend.get(limiter.lock_key) == "other"
+
+
+@pytest.mark.django_db
+def test_shopify_adapter_paces_after_throttled_response(stub_server, settings):
+    settings.USE_MOCK_APIS = False
+    _server, base_url = stub_server
+    clock = FakeClock()
+    cost = {"requestedQueryCost": 10, "throttleStatus": {"maximumAvailable": 100, "restoreRate": 50}}
+    throttled = {
+        "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+        "extensions": {"cost": {**cost, "throttleStatus": {**cost["throttleStatus"], "currentlyAvailable": 0}}},
+    }
+    created = {
+        "data": {"productCreate": {"product": {"id": "gid://shopify/Product/2"}, "userErrors": []}},
+        "extensions": {"cost": {**cost, "throttleStatus": {**cost["throttleStatus"], "currentlyAvailable": 90}}},
+    }
+    StubHandler.routes["/graphql.json"] = [(200, throttled), (200, created)]
+    limiter = ShopifyCostLimiter(
+        "demo.myshopify.com", backend=LocMemCache("adapter", {}), clock=clock, sleep=clock.sleep
+    )
+    adapter = ShopifyAdapter(
+        shop="demo.myshopify.com", access_token="token", api_url=f"{base_url}/graphql.json", limiter=limiter
+    )
+
+    assert adapter.create_product(draft_id=2, title="Tee").external_id == "gid://shopify/Product/2"
+    assert len(StubHandler.seen) == 2
+    assert clock.now - 1000.0 >= 10 / 50
+    assert limiter.snapshot()["available"] == pytest.approx(90)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_gelato_integration_view(stub_server, settings):
+    _server, base_url = stub_server
+    settings.GELATO_API_URL = base_url
+    StubHandler.routes["/catalogs"] = [(401, {}), (200, {"data": []})]
+    client = APIClient()
+
+    response = client.post("/api/integrations/gelato", {"apiKey": "bad"}, format="json")
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid API key"}
+
+    response = client.post("/api/integrations/gelato", {"apiKey": "good"}, format="json")
+    assert response.status_code == 200
+    connection = IntegrationConnection.objects.get(provider=IntegrationConnection.Provider.GELATO)
+    assert IntegrationStore.get_secret(connection) == {"apiKey": "good"}
+    assert connection.last_error == ""
+
+    assert client.delete("/api/integrations/gelato").status_code == 204
+
+
+@pytest.mark.django_db
+def test_draft_list_keyset_pagination_and_filters():
+    drafts = _make_drafts(5)
+    drafts[0].status = ProductDraft.Status.PUSHED
+    drafts[0].save(update_fields=["status"])
+    client = APIClient()
+
+    seen = []
+    url = "/api/drafts?limit=2"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(draft["id"] for draft in response.json())
+        url = response.get("Link", "").split(";")[0].strip("<>") or None
+    assert seen == sorted((draft.id for draft in drafts), reverse=True)
+
+    response = client.get("/api/drafts", {"status": "pushed"})
+    assert [draft["id"] for draft in response.json()] == [drafts[0].id]
+    assert client.get("/api/drafts", {"cursor": "garbage"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_draft_list_field_projection():
+    draft = _make_drafts(1)[0]
+    asset = DesignAsset.objects.create(file="assets/a.png", original_filename="a.png")
+    draft.assets.add(asset)
+    client = APIClient()
+
+    response = client.get("/api/drafts", {"fields": "id,status,assets,template", "expand": ""})
+    assert response.json() == [{"id": draft.id, "status": "draft", "template": draft.template_id, "assets": [asset.id]}]
+
+    response = client.get(f"/api/drafts/{draft.id}", {"fields": "id,template", "expand": "template"})
+    assert response.json()["template"]["gelato_template_id"] == "gelato-test"
+    assert client.get("/api/drafts", {"fields": "nope"}).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{}, {"expand": ""}, {"fields": "id,title,assets", "expand": "assets"}])
+def test_draft_reader_matches_serializer_bytes(params):
+    template = Template.objects.create(name="Tee ☕", gelato_template_id="gelato-test", metadata={"dpi": 300.5})
+    drafts = _make_drafts(3, template=template)
+    assets = [
+        DesignAsset.objects.create(file=f"assets/{index}.png", original_filename=f"{index}.png", size_bytes=index)
+        for index in range(3)
+    ]
+    drafts[0].assets.set(assets)
+    drafts[1].assets.set(assets[1:])
+    drafts[2].description = "line\u2028break"
+    drafts[2].seo = {"title": "Über"}
+    drafts[2].save()
+
+    projection = DraftProjection.from_query(params)
+    reader = DraftReader(projection)
+    fast = FastJSONRenderer().render(reader.render(list(reader.queryset().order_by("id"))))
+    queryset = ProductDraft.objects.select_related("template").prefetch_related("assets").order_by("id")
+    reference = JSONRenderer().render(
+        ProductDraftSerializer(queryset, many=True, **projection.serializer_kwargs()).data
+    )
+
+    assert fast == reference
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.ASSET_UPLOAD_STAGING_DIR = str(tmp_path / "staging")
+    return settings.MEDIA_ROOT
+
+
+@pytest.mark.django_db
+def test_asset_upload_deduplicates_by_content_hash(media_root):
+    client = APIClient()
+    files = [
+        SimpleUploadedFile("a.png", b"same-bytes", content_type="image/png"),
+        SimpleUploadedFile("b.png", b"same-bytes", content_type="image/png"),
+        SimpleUploadedFile("c.png", b"other-bytes", content_type="image/png"),
+    ]
+    response = client.post("/api/assets/upload", {"files": files}, format="multipart")
+    assert response.status_code == 201
+    ids = [asset["id"] for asset in response.json()]
+    assert ids[0] == ids[1] != ids[2]
+    assert response.json()[0]["sha256"] == hashlib.sha256(b"same-bytes").hexdigest()
+
+    again = client.post(
+        "/api/assets/upload", {"files": [SimpleUploadedFile("d.png", b"other-bytes")]}, format="multipart"
+    )
+    assert again.json()[0]["id"] == ids[2]
+    assert DesignAsset.objects.count() == 2
+    assert len(list((media_root / "assets").iterdir())) == 2
+
+
+@pytest.mark.django_db
+def test_chunked_upload_resumes_and_completes(media_root, settings):
+    settings.ASSET_UPLOAD_CHUNK_SIZE = 4
+    client = APIClient()
+    payload = b"0123456789"
+    upload = client.post(
+        "/api/assets/uploads",
+        {"original_filename": "big.png", "mime_type": "image/png", "size_bytes": len(payload)},
+        format="json",
+    ).json()
+    url = f"/api/assets/uploads/{upload['id']}"
+
+    def put(start, end):
+        return client.generic(
+            "PUT",
+            url,
+            payload[start : end + 1],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{len(payload)}",
+        )
+
+    assert put(0, 3).json()["received_bytes"] == 4
+    conflict = put(8, 9)
+    assert conflict.status_code == 409
+    assert conflict.json()["received_bytes"] == 4
+    assert client.get(url).json()["received_bytes"] == 4
+    assert client.post(f"{url}/complete").status_code == 409
+    put(4, 7)
+    put(8, 9)
+
+    response = client.post(f"{url}/complete")
+    assert response.status_code == 201
+    asset = DesignAsset.objects.get(id=response.json()["id"])
+    assert asset.file.read() == payload
+    assert asset.sha256 == hashlib.sha256(payload).hexdigest()
+    assert not list((media_root.parent / "staging").iterdir())
+
+
+@pytest.mark.django_db
+def test_chunk_for_a_taken_offset_leaves_the_staged_bytes_alone(media_root):
+    upload = AssetUpload.objects.create(original_filename="big.png", size_bytes=8)
+    # Loaded by the losing request before the winning one stored its chunk.
+    stale = AssetUpload.objects.get(id=upload.id)
+    append_chunk(upload, io.BytesIO(b"abcd"), 0, 4)
+
+    with pytest.raises(UploadOffsetMismatch):
+        append_chunk(stale, io.BytesIO(b"wxy"), 0, 3)
+    assert stale.received_bytes == 4
+    assert staging_path(upload).read_bytes() == b"abcd"
+
+
+def _image_bytes(mode, size, image_format, **save_kwargs):
+    image_module = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    image_module.new(mode, size, "white").save(buffer, format=image_format, **save_kwargs)
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+def test_uploaded_assets_get_previews_and_print_metadata(
+    media_root, settings, eager_celery, django_capture_on_commit_callbacks
+):
+    settings.ASSET_PREVIEW_SIZES = [64, 256]
+    image_module = pytest.importorskip("PIL.Image")
+    files = [
+        SimpleUploadedFile("poster.png", _image_bytes("RGB", (600, 300), "PNG", dpi=(300, 300)), "image/png"),
+        SimpleUploadedFile("notes.txt", b"not an image", "text/plain"),
+    ]
+    with django_capture_on_commit_callbacks(execute=True):
+        response = APIClient().post("/api/assets/upload", {"files": files}, format="multipart")
+    assert response.status_code == 201
+
+    poster, notes = (DesignAsset.objects.get(id=item["id"]) for item in response.json())
+    assert (poster.width_px, poster.height_px, poster.dpi, poster.color_mode) == (600, 300, 300, "RGB")
+    assert poster.processing_status == DesignAsset.ProcessingStatus.READY
+    assert notes.processing_status == DesignAsset.ProcessingStatus.SKIPPED
+    with image_module.open(media_root / poster.previews["256"]) as preview:
+        assert (preview.format, preview.size) == ("WEBP", (256, 128))
+
+    data = DesignAssetSerializer(poster).data
+    assert data["previews"] == {"64": f"/media/{poster.previews['64']}", "256": f"/media/{poster.previews['256']}"}
+    _make_drafts(1)[0].assets.set([poster])
+    assert APIClient().get("/api/drafts").json()[0]["assets"] == [data]
+
+
+def test_image_analysis_in_process_pool_matches_serial(settings):
+    settings.ASSET_IMAGE_WORKERS = 2
+    sources = [
+        _image_bytes("CMYK", (400, 400), "JPEG", dpi=(150, 150)),
+        _image_bytes("RGBA", (100, 50), "PNG"),
+        b"garbage",
+    ]
+    pooled = analyze_many(sources, [32])
+    settings.ASSET_IMAGE_WORKERS = 1
+    assert pooled == analyze_many(sources, [32])
+    assert (pooled[0].color_mode, pooled[0].dpi, pooled[1].color_mode, pooled[1].dpi) == ("CMYK", 150, "RGBA", None)
+    assert pooled[2] == DesignAsset.ProcessingStatus.SKIPPED
+
+
+def _catalog(*items):
+    return [{"gelato_template_id": gelato_id, "name": name, "metadata": {"category": "x"}} for gelato_id, name in items]
+
+
+@pytest.mark.django_db
+def test_template_sync_upserts_changes_and_deactivates_removed():
+    first = sync_templates([_catalog(("tee", "Tee"), ("mug", "Mug")), _catalog(("bag", "Bag"))])
+    assert first == {"created": 3, "updated": 0, "deactivated": 0, "total": 3}
+
+    stamps = dict(Template.objects.values_list("id", "updated_at"))
+    unchanged = sync_templates([_catalog(("tee", "Tee"), ("mug", "Mug")), _catalog(("bag", "Bag"))])
+    assert unchanged == {"created": 0, "updated": 0, "deactivated": 0, "total": 3}
+    assert dict(Template.objects.values_list("id", "updated_at")) == stamps
+
+    changed = sync_templates([_catalog(("tee", "Tee v2"), ("mug", "Mug"))])
+    assert changed == {"created": 0, "updated": 1, "deactivated": 1, "total": 2}
+    assert Template.objects.get(gelato_template_id="tee").name == "Tee v2"
+    assert not Template.objects.get(gelato_template_id="bag").is_active
+
+
+@pytest.mark.django_db
+def test_template_list_serves_cached_catalog_with_etag(settings):
+    settings.USE_MOCK_APIS = True
+    cache.clear()
+    client = APIClient()
+
+    response = client.get("/api/templates")
+    assert response.status_code == 200
+    assert {item["gelato_template_id"] for item in response.json()} == {"gelato-tee-unisex", "gelato-poster-a3"}
+    etag = response["ETag"]
+
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get("/api/templates", HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert client.get("/api/templates").json() == response.json()
+    assert len(queries) == 0
+
+    sync_templates([_catalog(("gelato-tee-unisex", "Unisex Tee"))])
+    refreshed = client.get("/api/templates", HTTP_IF_NONE_MATCH=etag)
+    assert refreshed.status_code == 200
+    assert refreshed["ETag"] != etag
+    assert [item["name"] for item in refreshed.json()] == ["Unisex Tee"]
+
+
+@pytest.mark.django_db
+def test_integration_status_is_served_from_state_cache():
+    client = APIClient()
+    gelato = IntegrationStore.get_or_create(IntegrationConnection.Provider.GELATO)
+    IntegrationStore.set_secret(gelato, {"apiKey": "key"})
+    assert client.get("/api/integrations").status_code == 200
+
+    with CaptureQueriesContext(connection) as queries:
+        statuses = {item["provider"]: item["status"] for item in client.get("/api/integrations").json()["items"]}
+        assert integration_state.secret(IntegrationConnection.Provider.GELATO) == {"apiKey": "key"}
+    assert len(queries) == 0
+    assert statuses == {"shopify": "disconnected", "gelato": "connected"}
+
+    IntegrationStore.clear(gelato)
+    items = client.get("/api/integrations").json()["items"]
+    assert {item["provider"]: item["status"] for item in items}["gelato"] == "disconnected"
+
+
+@pytest.mark.django_db
+def test_integration_state_cache_reloads_after_ttl(settings):
+    settings.INTEGRATION_STATE_TTL = 30
+    clock = FakeClock()
+    state = IntegrationStateCache(clock=clock)
+    IntegrationConnection.objects.create(provider=IntegrationConnection.Provider.SHOPIFY, last_error="boom")
+    assert state.connection(IntegrationConnection.Provider.SHOPIFY).last_error == "boom"
+
+    IntegrationConnection.objects.update(last_error="")  # bypasses signals, like a write from another process
+    clock.sleep(29)
+    assert state.connection(IntegrationConnection.Provider.SHOPIFY).last_error == "boom"
+    clock.sleep(1)
+    assert state.connection(IntegrationConnection.Provider.SHOPIFY).last_error == ""
+
+
+@pytest.mark.django_db
+def test_push_writes_outbox_message_instead_of_calling_broker(eager_celery):
+    draft = _make_drafts(1)[0]
+    client = APIClient()
+
+    first = client.post(f"/api/drafts/{draft.id}/push")
+    second = client.post(f"/api/drafts/{draft.id}/push")
+    assert first.status_code == second.status_code == 202
+    assert second.json() == {**first.json(), "already_queued": True}
+    message = OutboxMessage.objects.get()
+    assert str(message.idempotency_key) == first.json()["task_id"]
+    assert message.dispatched_at is None
+    assert not JobRun.objects.exists()
+    assert client.post("/api/drafts/999999/push").status_code == 404
+
+    assert relay_outbox() == 1
+    message.refresh_from_db()
+    assert message.dispatched_at is not None and message.processed_at is not None
+    draft.refresh_from_db()
+    assert draft.status == ProductDraft.Status.PUSHED
+
+
+@pytest.mark.django_db
+def test_push_leaves_drafts_that_are_being_pushed_alone():
+    drafts = _make_drafts(2, status=ProductDraft.Status.PUSHING)
+    client = APIClient()
+
+    single = client.post(f"/api/drafts/{drafts[0].id}/push")
+    batch = client.post("/api/drafts/push", {"draft_ids": [draft.id for draft in drafts]}, format="json")
+    assert single.json()["already_queued"] is True
+    assert batch.json()["draft_count"] == 0
+    assert not OutboxMessage.objects.exists()
+    assert set(ProductDraft.objects.values_list("status", flat=True)) == {ProductDraft.Status.PUSHING}
+
+
+@pytest.mark.django_db
+def test_duplicate_task_delivery_is_ignored(eager_celery):
+    draft = _make_drafts(1)[0]
+    APIClient().post(f"/api/drafts/{draft.id}/push")
+    relay_outbox()
+
+    OutboxMessage.objects.update(dispatched_at=None)  # e.g. the relay died before marking the batch
+    assert relay_outbox() == 1
+    assert JobRun.objects.filter(task_name="push_draft_to_shopify").count() == 1
+    assert ShopifyProduct.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_outbox_relay_stops_on_broker_error(monkeypatch):
+    drafts = _make_drafts(2)
+    APIClient().post("/api/drafts/push", {"draft_ids": [draft.id for draft in drafts]}, format="json")
+
+    def broker_down(*_args, **_kwargs):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(push_drafts_to_shopify_batch, "apply_async", broker_down)
+    assert relay_outbox() == 0
+    message = OutboxMessage.objects.get()
+    assert (message.dispatched_at, message.attempts, message.last_error) == (None, 1, "broker unavailable")
+
+
+@pytest.mark.django_db
+def test_outbox_relay_skips_a_message_it_cannot_send_and_fails_it_eventually(eager_celery, settings):
+    settings.OUTBOX_MAX_ATTEMPTS = 2
+    poison = OutboxMessage.objects.create(task_name="core.tasks.does_not_exist")
+    draft = _make_drafts(1)[0]
+    APIClient().post(f"/api/drafts/{draft.id}/push")
+
+    assert relay_outbox() == 1
+    draft.refresh_from_db()
+    assert draft.status == ProductDraft.Status.PUSHED
+    poison.refresh_from_db()
+    assert (poison.attempts, poison.failed_at) == (1, None)
+
+    assert relay_outbox() == 0
+    poison.refresh_from_db()
+    assert poison.attempts == 2 and poison.failed_at is not None and poison.dispatched_at is None
+    assert relay_outbox() == 0
+    poison.refresh_from_db()
+    assert poison.attempts == 2
+
+
+@pytest.mark.django_db
+def test_claim_moves_queued_drafts_to_pushing_once():
+    queued = _make_drafts(3, status=ProductDraft.Status.QUEUED)
+    idle = _make_drafts(1, template=queued[0].template)[0]
+    ids = [draft.id for draft in queued] + [idle.id]
+
+    claimed = claim_drafts(ids)
+    assert [draft.id for draft in claimed] == [draft.id for draft in queued]
+    assert {draft.status for draft in claimed} == {ProductDraft.Status.PUSHING}
+    assert claim_drafts(ids) == []
+    assert push_drafts_to_shopify_batch.apply(args=[ids]).result == {"pushed": 0, "failed": 0, "skipped": 4}
+
+
+def test_concurrent_workers_push_each_draft_once(tmp_path):
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.push_claims",
+            "--drafts",
+            "60",
+            "--workers",
+            "6",
+            "--database",
+            str(tmp_path / "claims.sqlite3"),
+        ],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "duplicate remote calls: 0" in result.stdout
+
+
+def _job_run(task_name, status, days_ago, seconds):
+    job = JobRun.objects.create(task_name=task_name, reference_id="1", status=status)
+    started = timezone.now() - timedelta(days=days_ago)
+    JobRun.objects.filter(id=job.id).update(created_at=started, updated_at=started + timedelta(seconds=seconds))
+
+
+@pytest.mark.django_db
+def test_job_runs_compact_into_daily_stats(settings):
+    settings.JOBRUN_RETENTION_DAYS = 30
+    _job_run("push_draft_to_shopify", JobRun.Status.SUCCESS, 40, 2)
+    _job_run("push_draft_to_shopify", JobRun.Status.SUCCESS, 40, 4)
+    _job_run("push_draft_to_shopify", JobRun.Status.FAILED, 40, 1)
+    _job_run("push_draft_to_shopify", JobRun.Status.SUCCESS, 0, 3)
+    before = APIClient().get("/api/jobs/stats", {"days": 60}).json()
+
+    assert compact_job_history() == {"rows": 3, "days": 1}
+    assert compact_job_history() == {"rows": 0, "days": 0}
+    assert JobRun.objects.count() == 1
+    stat = JobRunDailyStat.objects.get(status=JobRun.Status.SUCCESS)
+    assert (stat.count, stat.total_seconds, stat.max_seconds) == (2, 6.0, 4.0)
+
+    response = APIClient().get("/api/jobs/stats", {"days": 60})
+    assert response.json() == before
+    assert response.json()["totals"] == {"push_draft_to_shopify": {"success": 3, "failed": 1}}
+    oldest = [item for item in response.json()["items"] if item["day"] == stat.day.isoformat()]
+    assert [(item["status"], item["count"], item["avg_seconds"]) for item in oldest] == [
+        ("success", 2, 3.0),
+        ("failed", 1, 1.0),
+    ]
+    recent = APIClient().get("/api/jobs/stats", {"days": 7, "task_name": "push_draft_to_shopify"}).json()
+    assert [item["count"] for item in recent["items"]] == [1]
+
+
+def test_event_stream_sends_published_events_and_keepalives(settings):
+    settings.EVENTS_KEEPALIVE_SECONDS = 0.2
+
+    async def scenario():
+        response = await AsyncClient().get("/api/events")
+        assert response["Content-Type"] == "text/event-stream"
+        stream = aiter(response.streaming_content)
+        chunks = [await anext(stream)]
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        get_event_bus().publish(draft_status_events([7], "pushed"))
+        chunks.append(await asyncio.wait_for(pending, 1))
+        chunks.append(await asyncio.wait_for(anext(stream), 1))
+        await stream.aclose()
+        return chunks
+
+    assert async_to_sync(scenario)() == [
+        b"retry: 3000\n\n",
+        b'event: draft.status\ndata: {"type": "draft.status", "draft_id": 7, "status": "pushed"}\n\n',
+        b": keepalive\n\n",
+    ]
+
+
+@pytest.mark.django_db
+def test_push_publishes_draft_and_job_events(eager_celery, monkeypatch, django_capture_on_commit_callbacks):
+    published = []
+    monkeypatch.setattr(
+        "core.events.get_event_bus", lambda: type("Bus", (), {"publish": staticmethod(published.extend)})
+    )
+    draft = _make_drafts(1)[0]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        APIClient().post(f"/api/drafts/{draft.id}/push")
+        relay_outbox()
+
+    assert [event["status"] for event in published if event["type"] == "draft.status"] == [
+        "queued",
+        "pushing",
+        "pushed",
+    ]
+    assert [event["status"] for event in published if event["type"] == "job"] == ["running", "success"]
+
+
+@pytest.mark.django_db
+def test_unreachable_event_bus_is_logged_and_does_not_break_the_push(
+    monkeypatch, caplog, django_capture_on_commit_callbacks
+):
+    def publish(_events):
+        raise redis.ConnectionError("Connection refused")
+
+    monkeypatch.setattr("core.events.get_event_bus", lambda: type("Bus", (), {"publish": staticmethod(publish)}))
+    draft = _make_drafts(1)[0]
+
+    with caplog.at_level("WARNING", logger="core.events"), django_capture_on_commit_callbacks(execute=True):
+        assert APIClient().post(f"/api/drafts/{draft.id}/push").status_code == 202
+
+    assert ProductDraft.objects.get(id=draft.id).status == ProductDraft.Status.QUEUED
+    assert "Could not publish 1 events" in caplog.text
+
+
+def _observations(histogram, *labels) -> tuple[int, float]:
+    values = histogram.snapshot().get(labels, [0, 0])
+    return values[-1], values[-2]
+
+
+@pytest.mark.django_db
+def test_metrics_record_request_query_counts_and_merge_other_processes():
+    client = APIClient()
+    _make_drafts(3)
+    before_count, before_queries = _observations(db_queries, "http", "api/drafts")
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get("/api/drafts").status_code == 200
+
+    assert _observations(db_queries, "http", "api/drafts") == (before_count + 1, before_queries + len(queries))
+
+    worker_key = "metrics:process:worker:1"
+    buckets = [0] * (len(task_seconds.buckets) + 1)
+    cache.set(worker_key, {task_seconds.name: {("core.tasks.bench", "SUCCESS"): [*buckets, 2.5, 2]}})
+    cache.set("metrics:processes", {worker_key: time.time()})
+    response = client.get("/api/metrics")
+
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.content.decode()
+    assert 'lazypod_task_duration_seconds_count{task="core.tasks.bench",state="SUCCESS"} 2' in body
+    assert 'lazypod_http_request_duration_seconds_count{method="GET",route="api/drafts",status="200"}' in body
+
+
+@pytest.mark.django_db
+def test_unreachable_metrics_cache_is_logged_and_does_not_break_the_request(monkeypatch, caplog, settings):
+    settings.METRICS_PUBLISH_INTERVAL = 0
+
+    def unreachable(*_args, **_kwargs):
+        raise redis.ConnectionError("Connection refused")
+
+    monkeypatch.setattr(cache, "set", unreachable)
+    with caplog.at_level("WARNING", logger="core.metrics"):
+        assert APIClient().get("/api/drafts").status_code == 200
+    assert "Could not publish the metrics snapshot" in caplog.text
+
+
+@pytest.mark.django_db
+def test_metrics_record_task_runs_and_outbound_requests(eager_celery, stub_server):
+    _server, base_url = stub_server
+    StubHandler.routes["/ping"] = [(200, {"ok": True})]
+    draft = _make_drafts(1, status=ProductDraft.Status.QUEUED)[0]
+    runs_before, _ = _observations(task_seconds, "core.tasks.push_draft_to_shopify", "SUCCESS")
+    calls_before, _ = _observations(external_request_seconds, "127.0.0.1", 200)
+
+    push_draft_to_shopify.delay(draft.id)
+    HttpClient(max_retries=0).request("GET", f"{base_url}/ping")
+
+    assert _observations(task_seconds, "core.tasks.push_draft_to_shopify", "SUCCESS")[0] == runs_before + 1
+    assert _observations(db_queries, "task", "core.tasks.push_draft_to_shopify")[1] > 0
+    assert _observations(external_request_seconds, "127.0.0.1", 200)[0] == calls_before + 1
+
+
+def test_benchmark_suite_flags_regressions_against_baseline():
+    from benchmarks.suite import compare, metric
+
+    baseline = {
+        "list.p50_ms": metric(10, "ms"),
+        "list.queries": metric(3, "queries"),
+        "push_eager.drafts_per_s": metric(100, "drafts/s", "higher"),
+    }
+    current = {
+        "list.p50_ms": metric(11, "ms"),
+        "list.queries": metric(4, "queries"),
+        "push_eager.drafts_per_s": metric(60, "drafts/s", "higher"),
+        "detail.p50_ms": metric(5, "ms"),
+    }
+
+    failures = compare(current, baseline, max_regression_pct=25)
+
+    assert [line.split(":")[0] for line in failures] == ["list.queries", "push_eager.drafts_per_s"]
+
+
+QUERY_GUARD_SIZES = (1, 5, 20)
+QUERY_GUARD_EXEMPT = {
+    "api/events": "streams until the client disconnects and never touches the database",
+    "api/drafts/export": "queries run while the body streams, after the middleware has counted; see the export test",
+}
+
+
+def _guard_assets(n, tag):
+    return DesignAsset.objects.bulk_create(
+        [DesignAsset(file=f"assets/{tag}-{index}.png", original_filename=f"{tag}-{index}.png") for index in range(n)]
+    )
+
+
+def _guard_drafts(n, tag, assets_per_draft=2):
+    template = Template.objects.create(name=tag, gelato_template_id=f"guard-{tag}")
+    assets = _guard_assets(assets_per_draft, tag)
+    drafts = _make_drafts(n, template=template)
+    for draft in drafts:
+        draft.assets.set(assets)
+    return drafts
+
+
+def _guard_upload(n, tag, client):
+    return AssetUpload.objects.create(original_filename=f"{tag}.png", mime_type="image/png", size_bytes=4)
+
+
+def _guard_complete(n, tag, client):
+    upload = _guard_upload(n, tag, client)
+    client.generic(
+        "PUT",
+        f"/api/assets/uploads/{upload.id}",
+        tag.encode()[:4].ljust(4, b"-"),
+        content_type="application/octet-stream",
+        HTTP_CONTENT_RANGE="bytes 0-3/4",
+    )
+    return client.post(f"/api/assets/uploads/{upload.id}/complete")
+
+
+def _guard_bulk(n, tag, client):
+    template = Template.objects.create(name=tag, gelato_template_id=f"guard-{tag}")
+    asset_ids = [asset.id for asset in _guard_assets(2, tag)]
+    drafts = [
+        {"template_id": template.id, "title": f"{tag} {i}", "price": "9.99", "asset_ids": asset_ids} for i in range(n)
+    ]
+    return client.post("/api/drafts/bulk", {"drafts": drafts}, format="json")
+
+
+def _guard_import(n, tag, client):
+    template = Template.objects.create(name=tag, gelato_template_id=f"guard-{tag}")
+    asset_ids = "|".join(str(asset.id) for asset in _guard_assets(2, tag))
+    rows = "".join(f"{template.id},{tag} {i},9.99,{asset_ids}\n" for i in range(n))
+    return client.post("/api/drafts/import", f"template_id,title,price,asset_ids\n{rows}", content_type="text/csv")
+
+
+def _post_webhook(client, payload, topic="products/update", event_id=None, secret="webhook-secret"):
+    body = json.dumps(payload).encode()
+    signature = base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+    headers = {
+        "X-Shopify-Topic": topic,
+        "X-Shopify-Hmac-Sha256": signature,
+        "X-Shopify-Shop-Domain": "demo.myshopify.com",
+    }
+    if event_id:
+        headers["X-Shopify-Event-Id"] = event_id
+    return client.post("/api/integrations/shopify/webhooks", body, content_type="application/json", headers=headers)
+
+
+def _guard_webhook(n, tag, client):
+    payload = {"id": 1, "title": tag, "variants": [{"id": i, "price": "9.99"} for i in range(n)]}
+    with override_settings(SHOPIFY_WEBHOOK_SECRET="webhook-secret"):
+        return _post_webhook(client, payload, event_id=tag)
+
+
+def _guard_detail(n, tag, client):
+    draft = _guard_drafts(1, tag, assets_per_draft=n)[0]
+    return client.get(f"/api/drafts/{draft.id}")
+
+
+def _guard_templates(n, tag, client):
+    Template.objects.bulk_create([Template(name=f"{tag} {i}", gelato_template_id=f"{tag}-{i}") for i in range(n)])
+    cache.clear()
+    return client.get("/api/templates")
+
+
+def _guard_job_stats(n, tag, client):
+    JobRun.objects.bulk_create([JobRun(task_name=f"{tag}.{i}", reference_id=str(i)) for i in range(n)])
+    return client.get("/api/jobs/stats")
+
+
+def _guard_shopify_connected(n, tag, client):
+    connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.SHOPIFY)
+    IntegrationStore.set_secret(connection, {"shop": "demo.myshopify.com", "accessToken": "token"})
+    return client.get("/api/integrations/shopify/throttle")
+
+
+QUERY_GUARD_SCENARIOS = {
+    "api/health": lambda n, tag, client: client.get("/api/health"),
+    "api/metrics": lambda n, tag, client: client.get("/api/metrics"),
+    "api/templates": _guard_templates,
+    "api/assets/upload": lambda n, tag, client: client.post(
+        "/api/assets/upload",
+        {"files": [SimpleUploadedFile(f"{tag}-{i}.txt", f"{tag}-{i}".encode()) for i in range(n)]},
+        format="multipart",
+    ),
+    "api/assets/uploads": lambda n, tag, client: client.post(
+        "/api/assets/uploads", {"original_filename": f"{tag}.png", "size_bytes": 10}, format="json"
+    ),
+    "api/assets/uploads/<uuid:upload_id>": lambda n, tag, client: client.get(
+        f"/api/assets/uploads/{_guard_upload(n, tag, client).id}"
+    ),
+    "api/assets/uploads/<uuid:upload_id>/complete": _guard_complete,
+    "api/drafts/bulk": _guard_bulk,
+    "api/drafts": lambda n, tag, client: _guard_drafts(n, tag) and client.get("/api/drafts", {"limit": n}),
+    "api/drafts/push": lambda n, tag, client: client.post(
+        "/api/drafts/push", {"draft_ids": [draft.id for draft in _guard_drafts(n, tag)]}, format="json"
+    ),
+    "api/drafts/resync": lambda n, tag, client: client.post(
+        "/api/drafts/resync", {"draft_ids": [draft.id for draft in _guard_drafts(n, tag)]}, format="json"
+    ),
+    "api/drafts/import": _guard_import,
+    "api/integrations/shopify/webhooks": _guard_webhook,
+    "api/drafts/generate": lambda n, tag, client: client.post(
+        "/api/drafts/generate",
+        {
+            "template_ids": [Template.objects.create(name=tag, gelato_template_id=f"guard-{tag}").id],
+            "asset_ids": [asset.id for asset in _guard_assets(n, tag)],
+            "title": "{template} {asset}",
+            "price": "9.99",
+        },
+        format="json",
+    ),
+    "api/jobs/<int:job_id>": lambda n, tag, client: client.get(
+        f"/api/jobs/{JobRun.objects.create(task_name=tag, reference_id=tag).id}"
+    ),
+    "api/drafts/<int:draft_id>": _guard_detail,
+    "api/drafts/<int:draft_id>/push": lambda n, tag, client: client.post(
+        f"/api/drafts/{_guard_drafts(1, tag)[0].id}/push"
+    ),
+    "api/jobs/stats": _guard_job_stats,
+    "api/integrations": lambda n, tag, client: client.get("/api/integrations"),
+    "api/integrations/gelato": lambda n, tag, client: client.delete("/api/integrations/gelato"),
+    "api/integrations/shopify/start": lambda n, tag, client: client.post(
+        "/api/integrations/shopify/start", {"shopDomain": "demo"}, format="json"
+    ),
+    "api/integrations/shopify/callback": lambda n, tag, client: client.get(
+        "/api/integrations/shopify/callback", {"shop": "demo.myshopify.com", "state": "bogus", "code": "x"}
+    ),
+    "api/integrations/shopify": lambda n, tag, client: client.delete("/api/integrations/shopify"),
+    "api/integrations/shopify/test": lambda n, tag, client: client.post("/api/integrations/shopify/test"),
+    "api/integrations/shopify/throttle": _guard_shopify_connected,
+}
+
+
+def test_query_guard_covers_every_route():
+    from core.urls import urlpatterns
+
+    routes = {f"api/{pattern.pattern}" for pattern in urlpatterns}
+    assert routes == set(QUERY_GUARD_SCENARIOS) | set(QUERY_GUARD_EXEMPT)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("route", sorted(QUERY_GUARD_SCENARIOS))
+def test_query_count_stays_flat_as_data_grows(route, eager_celery, media_root, settings):
+    settings.SHOPIFY_CLIENT_ID = settings.SHOPIFY_CLIENT_SECRET = "guard"
+    client = APIClient()
+    QUERY_GUARD_SCENARIOS[route](QUERY_GUARD_SIZES[0], "warmup", client)  # first use may create provider rows
+    counts = {}
+    for size in QUERY_GUARD_SIZES:
+        integration_state.invalidate()
+        before = _observations(db_queries, "http", route)
+        response = QUERY_GUARD_SCENARIOS[route](size, f"n{size}", client)
+        after = _observations(db_queries, "http", route)
+        assert response.status_code < 500, response.content
+        assert after[0] == before[0] + 1, "the scenario must hit its route exactly once"
+        counts[size] = after[1] - before[1]
+
+    assert len(set(counts.values())) == 1, f"{route} queries grow with the data: {counts}"
+
+
+def test_every_core_task_is_routed_to_a_worker_pool(settings):
+    from config.celery import app
+
+    core_tasks = sorted(name for name in app.tasks if name.startswith("core.tasks."))
+    queues = {name: app.amqp.router.route({}, name)["queue"].name for name in core_tasks}
+
+    assert set(core_tasks) == set(settings.CELERY_TASK_ROUTES)
+    assert queues["core.tasks.push_draft_to_shopify"] == queues["core.tasks.relay_outbox"] == "interactive"
+    assert queues["core.tasks.push_drafts_to_shopify_batch"] == "bulk"
+    assert queues["core.tasks.process_design_assets"] == "media"
+
+
+@pytest.mark.django_db
+def test_generate_drafts_expands_the_matrix_in_the_background(eager_celery, django_capture_on_commit_callbacks):
+    client = APIClient()
+    templates = [Template.objects.create(name=name, gelato_template_id=name) for name in ("Tee", "Mug")]
+    assets = _guard_assets(3, "cat")
+    payload = {
+        "template_ids": [template.id for template in templates],
+        "asset_ids": [asset.id for asset in assets],
+        "title": "{template} – {asset}",
+        "tags": ["{template}", "design-{index}"],
+        "price": "19.90",
+    }
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post("/api/drafts/generate", payload, format="json")
+        relay_outbox()
+
+    assert response.status_code == 202
+    job = client.get(f"/api/jobs/{response.json()['id']}").json()
+    assert job["status"] == JobRun.Status.SUCCESS
+    assert job["detail"]["progress"] == {"total": 6, "done": 6, "created": 6, "skipped": 0}
+    drafts = list(ProductDraft.objects.order_by("id").prefetch_related("assets"))
+    assert [draft.title for draft in drafts[:4]] == ["Tee – cat-0", "Tee – cat-1", "Tee – cat-2", "Mug – cat-0"]
+    assert drafts[4].tags == ["Mug", "design-5"]
+    assert [asset.id for asset in drafts[5].assets.all()] == [assets[2].id]
+    assert str(drafts[0].price) == "19.90"
+
+
+@pytest.mark.django_db
+def test_generate_drafts_validates_rules_and_references(settings):
+    client = APIClient()
+    template = Template.objects.create(name="Tee", gelato_template_id="tee")
+    asset = _guard_assets(1, "cat")[0]
+    base = {"template_ids": [template.id], "asset_ids": [asset.id], "title": "{template}", "price": "9.99"}
+
+    assert "title" in client.post("/api/drafts/generate", {**base, "title": "{secret}"}, format="json").json()
+    assert "title" in client.post("/api/drafts/generate", {**base, "title": "{index:q}"}, format="json").json()
+    unknown = client.post("/api/drafts/generate", {**base, "asset_ids": [asset.id, 999]}, format="json")
+    assert unknown.json() == {"asset_ids": ["Unknown assets [999]."]}
+    settings.DRAFT_GENERATE_MAX = 1
+    too_many = client.post("/api/drafts/generate", {**base, "asset_ids": [asset.id, asset.id + 1]}, format="json")
+    assert too_many.status_code == 400
+    assert not JobRun.objects.exists()
+
+
+@pytest.mark.django_db
+def test_generate_drafts_resumes_a_stale_job_and_ignores_duplicates(eager_celery, settings):
+    settings.DRAFT_BULK_CHUNK_SIZE = 2
+    template = Template.objects.create(name="Tee", gelato_template_id="tee")
+    assets = _guard_assets(5, "cat")
+    rule = {
+        "template_ids": [template.id],
+        "asset_ids": [asset.id for asset in assets],
+        "title": "{asset}",
+        "price": "9.99",
+    }
+    job = JobRun.objects.create(
+        task_name="generate_drafts",
+        reference_id="1x5",
+        status=JobRun.Status.RUNNING,
+        detail={"rule": rule, "progress": {"total": 5, "done": 2, "created": 2, "skipped": 0}},
+    )
+    assets[3].delete()
+
+    assert generate_drafts(job.id) is None  # still running elsewhere
+    assert resume_stale_generate_jobs() == 0
+    JobRun.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(hours=1))
+    assert resume_stale_generate_jobs() == 1
+    assert relay_outbox() == 1
+    job.refresh_from_db()
+    assert (job.status, job.detail["progress"]) == (
+        JobRun.Status.SUCCESS,
+        {"total": 5, "done": 5, "created": 4, "skipped": 1},
+    )
+    assert generate_drafts(job.id) is None
+
+    assert sorted(ProductDraft.objects.values_list("title", flat=True)) == ["cat-2", "cat-4"]
+
+
+def _import(body, content_type):
+    return APIClient().post("/api/drafts/import", body, content_type=content_type)
+
+
+@pytest.mark.django_db
+def test_csv_import_reports_rejected_rows_by_line(settings):
+    settings.DRAFT_BULK_CHUNK_SIZE = 2
+    template = Template.objects.create(name="Tee", gelato_template_id="tee")
+    first, second = _guard_assets(2, "cat")
+    body = (
+        "\ufefftemplate_id,title,description,tags,seo,price,asset_ids\n"
+        f'{template.id},Cat,"two\nlines",cats| summer,"{{""title"": ""Cat""}}",19.90,{first.id}|{second.id}\n'
+        f"{template.id},,,,,9.99,{first.id}\n"
+        "\n"
+        f"999,Ghost,,,,9.99,{first.id}\n"
+        f"{template.id},Broken,,,{{oops,9.99,{first.id}\n"
+        f"{template.id},Wide,,,,9.99,{first.id},extra\n"
+        f"{template.id},Plain,,,,5,{second.id}\n"
+    )
+
+    response = _import(body.encode(), "text/csv; charset=utf-8")
+
+    assert response.status_code == 201
+    report = response.json()
+    assert (report["created"], report["rejected"], report["errors_truncated"]) == (2, 4, False)
+    assert [(error["line"], sorted(error["errors"])) for error in report["errors"]] == [
+        (4, ["title"]),
+        (6, ["template_id"]),
+        (7, ["seo"]),
+        (8, ["non_field_errors"]),
+    ]
+    cat, plain = ProductDraft.objects.order_by("id").prefetch_related("assets")
+    assert (cat.description, cat.tags, cat.seo) == ("two\nlines", ["cats", "summer"], {"title": "Cat"})
+    assert [asset.id for asset in cat.assets.order_by("id")] == [first.id, second.id]
+    assert (plain.title, str(plain.price)) == ("Plain", "5.00")
+
+
+@pytest.mark.django_db
+def test_ndjson_import_accepts_body_or_upload_and_caps_the_error_list(settings):
+    settings.DRAFT_IMPORT_MAX_ERRORS = 1
+    template = Template.objects.create(name="Tee", gelato_template_id="tee")
+    asset = _guard_assets(1, "cat")[0]
+    good = json.dumps({"template_id": template.id, "title": "Cat", "price": "9.99", "asset_ids": [asset.id]})
+    body = f"{good}\nnot json\n[1]\n\n{good}\n".encode()
+
+    report = _import(body, "application/x-ndjson").json()
+    assert (report["created"], report["rejected"], report["errors_truncated"]) == (2, 2, True)
+    assert report["errors"][0]["line"] == 2
+
+    upload = SimpleUploadedFile("drafts.jsonl", body, content_type="application/octet-stream")
+    assert APIClient().post("/api/drafts/import", {"file": upload}, format="multipart").json()["created"] == 2
+    assert ProductDraft.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_import_rejects_unusable_files_without_creating_drafts():
+    template = Template.objects.create(name="Tee", gelato_template_id="tee")
+    asset = _guard_assets(1, "cat")[0]
+
+    assert _import(b"a,b\n", "application/json").status_code == 415
+    assert "asset_ids" in _import(b"template_id,title,price\n", "text/csv").json()["detail"]
+    invalid_utf8 = f"template_id,title,price,asset_ids\n{template.id},Cat,9.99,{asset.id}\n\xff\n".encode("latin-1")
+    response = _import(invalid_utf8, "text/csv")
+    assert response.json() == {"detail": "Line 3 is not valid UTF-8."}
+    assert not ProductDraft.objects.exists()
+
+
+@pytest.mark.django_db
+def test_import_keeps_committed_chunks_when_the_file_breaks_later(settings):
+    settings.DRAFT_BULK_CHUNK_SIZE = 2
+    template = Template.objects.create(name="Tee", gelato_template_id="tee")
+    asset = _guard_assets(1, "cat")[0]
+    row = f"{template.id},Cat,9.99,{asset.id}\n"
+    body = f"template_id,title,price,asset_ids\n{row}{row}{row}".encode() + b"\xff\n"
+
+    response = _import(body, "text/csv")
+
+    assert response.status_code == 400
+    assert response.json() == {
+        "created": 2,
+        "rejected": 0,
+        "errors": [],
+        "errors_truncated": False,
+        "detail": "Line 5 is not valid UTF-8.",
+    }
+    assert ProductDraft.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_export_streams_drafts_with_constant_queries_per_chunk(settings):
+    settings.DRAFT_BULK_CHUNK_SIZE = 2
+    drafts = _guard_drafts(5, "cat")
+    ProductDraft.objects.filter(id=drafts[0].id).update(tags=["a", "b"], seo={"title": "Cat"}, description="x, y")
+
+    async def download(params):
+        response = await AsyncClient().get("/api/drafts/export", params)
+        return response, [chunk async for chunk in response.streaming_content]
+
+    with CaptureQueriesContext(connection) as queries:
+        response, chunks = async_to_sync(download)({"format": "csv"})
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert len(chunks) == 3
+    assert len(queries) == 1 + 3  # the cursor, then the asset links of each chunk
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [int(row["id"]) for row in rows] == [draft.id for draft in drafts]
+    assert (rows[0]["tags"], rows[0]["seo"], rows[0]["description"]) == ("a|b", '{"title": "Cat"}', "x, y")
+
+    ProductDraft.objects.all().delete()
+    report = _import(b"".join(chunks), "text/csv").json()
+    assert (report["created"], report["rejected"]) == (5, 0)
+    assert ProductDraft.objects.filter(tags=["a", "b"], seo={"title": "Cat"}).count() == 1
+
+    _response, chunks = async_to_sync(download)({"format": "ndjson", "status": "pushed"})
+    assert chunks == []
+    assert async_to_sync(AsyncClient().get)("/api/drafts/export", {"format": "xml"}).status_code == 400
+
+
+def _bulk_shopify(monkeypatch, settings, base_url, threshold):
+    settings.USE_MOCK_APIS = False
+    settings.SHOPIFY_BULK_OPERATION_THRESHOLD = threshold
+    monkeypatch.setattr("core.services.shopify_graphql_url", lambda shop: f"{base_url}/graphql.json")
+    connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.SHOPIFY)
+    IntegrationStore.set_secret(connection, {"shop": "demo.myshopify.com", "accessToken": "token"})
+
+
+def _bulk_started(base_url):
+    target = {"url": f"{base_url}/upload", "resourceUrl": None, "parameters": [{"name": "key", "value": "tmp/vars"}]}
+    return [
+        (200, {"data": {"stagedUploadsCreate": {"stagedTargets": [target], "userErrors": []}}}),
+        (
+            200,
+            {
+                "data": {
+                    "bulkOperationRunMutation": {
+                        "bulkOperation": {"id": "gid://shopify/BulkOperation/1", "status": "CREATED"},
+                        "userErrors": [],
+                    }
+                }
+            },
+        ),
+    ]
+
+
+def _bulk_status(status, **fields):
+    node = {"id": "gid://shopify/BulkOperation/1", "status": status, "errorCode": None, "objectCount": "0"}
+    return (200, {"data": {"node": {"url": None, "partialDataUrl": None, **node, **fields}}})
+
+
+@pytest.mark.django_db
+def test_large_batch_push_runs_as_one_bulk_operation(stub_server, eager_celery, monkeypatch, settings):
+    _server, base_url = stub_server
+    _bulk_shopify(monkeypatch, settings, base_url, threshold=3)
+    drafts = _make_drafts(4)
+    results = [
+        {
+            "data": {"productCreate": {"product": {"id": "gid://shopify/Product/12"}, "userErrors": []}},
+            "__lineNumber": 2,
+        },
+        {
+            "data": {"productCreate": {"product": {"id": "gid://shopify/Product/10"}, "userErrors": []}},
+            "__lineNumber": 0,
+        },
+        {"data": {"productCreate": {"product": None, "userErrors": [{"message": "Title taken"}]}}, "__lineNumber": 1},
+    ]
+    StubHandler.routes["/graphql.json"] = _bulk_started(base_url) + [
+        _bulk_status("RUNNING", objectCount="1"),
+        _bulk_status("FAILED", errorCode="INTERNAL_SERVER_ERROR", partialDataUrl=f"{base_url}/results.jsonl"),
+    ]
+    StubHandler.routes["/upload"] = [(201, {})]
+    StubHandler.routes["/results.jsonl"] = [(200, b"".join(json.dumps(line).encode() + b"\n" for line in results))]
+
+    response = APIClient().post("/api/drafts/push", {"draft_ids": [draft.id for draft in drafts]}, format="json")
+    assert response.json()["mode"] == "bulk_operation"
+    assert len(response.json()["task_ids"]) == 1
+    relay_outbox()
+    assert set(ProductDraft.objects.values_list("status", flat=True)) == {"pushing"}
+    relay_outbox()  # the poll for the operation's results
+
+    statuses = dict(ProductDraft.objects.values_list("id", "status"))
+    assert [statuses[draft.id] for draft in drafts] == ["pushed", "failed", "pushed", "failed"]
+    assert ShopifyProduct.objects.get(draft=drafts[2]).shopify_product_id == "gid://shopify/Product/12"
+    job = JobRun.objects.get(task_name="push_drafts_to_shopify_bulk")
+    assert (job.status, job.detail["pushed"], job.detail["failed"]) == (JobRun.Status.FAILED, 2, 2)
+    assert job.detail["errors"][str(drafts[1].id)] == "Title taken"
+    assert "INTERNAL_SERVER_ERROR" in job.detail["errors"][str(drafts[3].id)]
+
+    paths = [request["path"] for request in StubHandler.seen]
+    assert paths.count("/graphql.json") == 4
+    upload = next(request["body"] for request in StubHandler.seen if request["path"] == "/upload")
+    assert b'name="key"\r\n\r\ntmp/vars' in upload
+    product = {
+        "title": "Draft 3",
+        "descriptionHtml": "",
+        "tags": [],
+        "seo": {},
+        "productType": "Test",
+        "status": "DRAFT",
+    }
+    assert json.dumps({"product": product}).encode() + b"\n" in upload
+
+
+@pytest.mark.django_db
+def test_bulk_push_fails_drafts_when_the_operation_times_out(stub_server, eager_celery, monkeypatch, settings):
+    _server, base_url = stub_server
+    _bulk_shopify(monkeypatch, settings, base_url, threshold=2)
+    settings.SHOPIFY_BULK_OPERATION_TIMEOUT = 0
+    StubHandler.routes["/graphql.json"] = _bulk_started(base_url) + [_bulk_status("RUNNING")]
+    StubHandler.routes["/upload"] = [(201, {})]
+    drafts = _make_drafts(2)
+
+    APIClient().post("/api/drafts/push", {"draft_ids": [draft.id for draft in drafts]}, format="json")
+    relay_outbox()
+    relay_outbox()
+
+    assert set(ProductDraft.objects.values_list("status", flat=True)) == {"failed"}
+    assert JobRun.objects.get(task_name="push_drafts_to_shopify_bulk").detail["outcome"] == "timed out"
+
+
+@pytest.mark.django_db
+def test_bulk_poll_refreshes_the_claim_while_progress_moves(eager_celery, monkeypatch, settings):
+    settings.DRAFT_PUSH_CLAIM_TIMEOUT = 60
+    drafts = _make_drafts(2, status=ProductDraft.Status.PUSHING)
+    long_ago = timezone.now() - timedelta(seconds=45)
+    ProductDraft.objects.update(updated_at=long_ago)
+    # Saved progress keeps the job's updated_at fresh; only claimed_at says when the drafts were touched.
+    job = JobRun.objects.create(
+        task_name="push_drafts_to_shopify_bulk",
+        status=JobRun.Status.RUNNING,
+        detail={
+            "draft_ids": [draft.id for draft in drafts],
+            "operation_id": "gid://shopify/BulkOperation/1",
+            "progress": {"total": 2, "done": 0},
+            "claimed_at": long_ago.isoformat(),
+        },
+    )
+    polls = iter([BulkOperation(id="op", status="RUNNING", object_count=1), BulkOperation(id="op", status="FAILED")])
+    seen = []
+
+    def poll(_adapter, _operation_id):
+        seen.append(set(ProductDraft.objects.values_list("updated_at", flat=True)))
+        return next(polls)
+
+    monkeypatch.setattr(ShopifyAdapter, "bulk_operation", poll)
+    finish_shopify_bulk_push.apply(kwargs={"job_id": job.id})
+
+    assert seen[0] == {long_ago}
+    assert min(seen[1]) > long_ago
+    job.refresh_from_db()
+    assert job.detail["claimed_at"] > long_ago.isoformat()
+
+
+@pytest.mark.django_db
+def test_bulk_push_falls_back_to_batches_when_no_operation_starts(eager_celery, monkeypatch, settings):
+    settings.SHOPIFY_BULK_OPERATION_THRESHOLD = 2
+    settings.SHOPIFY_PUSH_BATCH_SIZE = 2
+
+    def busy(_adapter, _titles):
+        raise ExternalServiceError("A bulk mutation operation for this app and shop is already in progress.")
+
+    drafts = _make_drafts(3)
+    monkeypatch.setattr(ShopifyAdapter, "start_bulk_product_create", busy)
+    APIClient().post("/api/drafts/push", {"draft_ids": [draft.id for draft in drafts]}, format="json")
+    relay_outbox()
+    job = JobRun.objects.get(task_name="push_drafts_to_shopify_bulk")
+    assert (job.status, job.detail["fallback"]) == (JobRun.Status.FAILED, "batch")
+    assert set(ProductDraft.objects.values_list("status", flat=True)) == {"queued"}
+
+    monkeypatch.undo()
+    relay_outbox()
+    assert set(ProductDraft.objects.values_list("status", flat=True)) == {"pushed"}
+    assert JobRun.objects.filter(task_name="push_drafts_to_shopify_batch").count() == 2
+
+    # Published drafts would be re-sent as updates; only new products go through the bulk operation.
+    ShopifyProduct.objects.all().delete()
+    ProductDraft.objects.update(status=ProductDraft.Status.DRAFT)
+    APIClient().post("/api/drafts/push", {"draft_ids": [draft.id for draft in drafts]}, format="json")
+    relay_outbox()
+    relay_outbox()
+    assert ShopifyProduct.objects.filter(shopify_product_id__startswith="mock-shopify-bulk-").count() == 3
+
+
+@pytest.mark.django_db
+def test_resync_sends_only_the_fields_that_changed(stub_server, eager_celery, monkeypatch, settings):
+    _server, base_url = stub_server
+    _bulk_shopify(monkeypatch, settings, base_url, threshold=0)
+    product = {"id": "gid://shopify/Product/7", "title": "Draft 0", "variants": {"nodes": [{"id": "gid://v/1"}]}}
+    StubHandler.routes["/graphql.json"] = [
+        (200, {"data": {"productCreate": {"product": product, "userErrors": []}}}),
+        (200, {"data": {"productVariantsBulkUpdate": {"productVariants": [], "userErrors": []}}}),
+        (200, {"data": {"productUpdate": {"product": {**product, "title": "Renamed"}, "userErrors": []}}}),
+    ]
+    [draft] = _make_drafts(1, status=ProductDraft.Status.QUEUED)
+    push_draft_to_shopify.apply(args=[draft.id])
+
+    def mutations():
+        calls = [json.loads(request["body"]) for request in StubHandler.seen]
+        StubHandler.seen.clear()
+        return [(call["query"].split("(")[0].split()[-1], call["variables"]) for call in calls]
+
+    # productCreate has no price; the same push sets it on the default variant.
+    [create, (name, variables)] = mutations()
+    assert create[0] == "productCreate"
+    assert (name, variables["variants"]) == ("productVariantsBulkUpdate", [{"id": "gid://v/1", "price": "9.99"}])
+
+    assert resync_drafts_to_shopify.apply(args=[[draft.id]]).result == {"updated": 0, "unchanged": 1, "failed": 0}
+    assert mutations() == []
+
+    ProductDraft.objects.filter(id=draft.id).update(title="Renamed")
+    resync_drafts_to_shopify.apply(args=[[draft.id]])
+    assert mutations() == [("productUpdate", {"product": {"id": "gid://shopify/Product/7", "title": "Renamed"}})]
+    assert ShopifyProduct.objects.get(draft=draft).payload["title"] == "Renamed"
+
+
+@pytest.mark.django_db
+def test_nightly_resync_queues_only_drafts_that_changed(eager_celery, settings, media_root):
+    settings.SHOPIFY_PUSH_BATCH_SIZE = 2
+    drafts = _make_drafts(5, status=ProductDraft.Status.QUEUED)
+    _make_drafts(1, template=drafts[0].template)
+    push_drafts_to_shopify_batch.apply(args=[[draft.id for draft in drafts]])
+
+    assert resync_shopify_products() == {"changed": 0, "batches": 0}
+
+    ProductDraft.objects.filter(id=drafts[1].id).update(price="12.50")
+    asset = DesignAsset.objects.create(
+        file=SimpleUploadedFile("new.png", b"png"), original_filename="new.png", mime_type="image/png", sha256="f" * 64
+    )
+    drafts[3].assets.add(asset)
+    response = APIClient().post("/api/drafts/resync", {"template_id": drafts[0].template_id}, format="json")
+    assert response.status_code == 202
+    relay_outbox()
+    relay_outbox()
+
+    job = JobRun.objects.filter(task_name="resync_drafts_to_shopify").latest("id")
+    assert job.detail["updated"] == {str(drafts[1].id): ["price"], str(drafts[3].id): ["assets"]}
+    assert resync_shopify_products() == {"changed": 0, "batches": 0}
+    assert set(ProductDraft.objects.filter(id__in=[d.id for d in drafts]).values_list("status", flat=True)) == {
+        "pushed"
+    }
+
+
+def test_multipart_file_body_streams_the_file_and_can_be_resent(tmp_path):
+    path = tmp_path / "art.png"
+    path.write_bytes(b"x" * (MultipartFileBody.block_size + 5))
+    body = MultipartFileBody(
+        {"key": "tmp/art"}, "file", "art.png", lambda: path.open("rb"), path.stat().st_size, "image/png"
+    )
+
+    sent = b"".join(body)
+    expected, content_type = multipart_body({"key": "tmp/art"}, "file", "art.png", path.read_bytes(), "image/png")
+    boundary = body.content_type.split("boundary=")[1].encode()
+    assert sent == expected.replace(content_type.split("boundary=")[1].encode(), boundary)
+    assert len(sent) == len(body) == int(body.headers()["Content-Length"])
+    assert b"".join(body) == sent
+
+
+@pytest.mark.django_db
+def test_batch_push_uploads_each_shared_asset_once(stub_server, eager_celery, monkeypatch, settings, media_root):
+    _server, base_url = stub_server
+    _bulk_shopify(monkeypatch, settings, base_url, threshold=0)
+    assets = [
+        DesignAsset.objects.create(
+            file=SimpleUploadedFile(f"art-{index}.png", b"img" * (index + 1)),
+            original_filename=f"art-{index}.png",
+            mime_type="image/png",
+            sha256=str(index) * 64,
+        )
+        for index in range(2)
+    ]
+    drafts = _make_drafts(4, status=ProductDraft.Status.QUEUED)
+    for draft in drafts:
+        draft.assets.set(assets)
+
+    def created(index):
+        product = {"id": f"gid://shopify/Product/{index}", "variants": {"nodes": [{"id": f"gid://v/{index}"}]}}
+        return (200, {"data": {"productCreate": {"product": product, "userErrors": []}}})
+
+    priced = (200, {"data": {"productVariantsBulkUpdate": {"productVariants": [], "userErrors": []}}})
+    attached = (200, {"data": {"fileUpdate": {"files": [], "userErrors": []}}})
+    targets = [
+        {
+            "url": f"{base_url}/upload",
+            "resourceUrl": f"{base_url}/staged/{index}",
+            "parameters": [{"name": "key", "value": f"tmp/{index}"}],
+        }
+        for index in range(2)
+    ]
+    files = [{"id": f"gid://shopify/MediaImage/{index}", "fileStatus": "UPLOADED"} for index in range(2)]
+    StubHandler.routes["/upload"] = [(201, {})]
+    StubHandler.routes["/graphql.json"] = [
+        (200, {"data": {"stagedUploadsCreate": {"stagedTargets": targets, "userErrors": []}}}),
+        (200, {"data": {"fileCreate": {"files": files, "userErrors": []}}}),
+        *[response for index in range(3) for response in (created(index), priced, attached)],
+    ]
+    push_drafts_to_shopify_batch.apply(args=[[draft.id for draft in drafts[:3]]])
+
+    uploads = [request["body"] for request in StubHandler.seen if request["path"] == "/upload"]
+    assert len(uploads) == 2
+    assert any(b"\r\n\r\nimgimg\r\n" in body for body in uploads)
+    calls = [json.loads(request["body"]) for request in StubHandler.seen if request["path"] == "/graphql.json"]
+    assert [file["fileSize"] for file in calls[0]["variables"]["input"]] == ["3", "6"]
+    assert [file["originalSource"] for file in calls[1]["variables"]["files"]] == [
+        f"{base_url}/staged/0",
+        f"{base_url}/staged/1",
+    ]
+    assert calls[4]["variables"]["files"] == [
+        {"id": f"gid://shopify/MediaImage/{index}", "referencesToAdd": ["gid://shopify/Product/0"]}
+        for index in range(2)
+    ]
+    assert ShopifyProduct.objects.get(draft=drafts[0]).payload["files"] == [file["id"] for file in files]
+
+    StubHandler.seen.clear()
+    StubHandler.routes["/graphql.json"] = [created(3), priced, attached]
+    push_drafts_to_shopify_batch.apply(args=[[drafts[3].id]])
+    assert [request["path"] for request in StubHandler.seen] == ["/graphql.json"] * 3
+    assert ShopifyFile.objects.count() == 2
+    assert set(ProductDraft.objects.values_list("status", flat=True)) == {"pushed"}
+
+
+@pytest.mark.django_db
+def test_unreadable_asset_fails_its_drafts_without_retrying(eager_celery, media_root):
+    stored = DesignAsset.objects.create(
+        file=SimpleUploadedFile("art.png", b"img"), original_filename="art.png", sha256="a"
+    )
+    missing = DesignAsset.objects.create(original_filename="lost.png", sha256="b")
+    deleted = DesignAsset.objects.create(
+        file=SimpleUploadedFile("gone.png", b"img"), original_filename="gone.png", sha256="c"
+    )
+    deleted.file.storage.delete(deleted.file.name)
+    drafts = _make_drafts(3, status=ProductDraft.Status.QUEUED)
+    for draft, asset in zip(drafts, (stored, missing, deleted)):
+        draft.assets.add(asset)
+
+    push_drafts_to_shopify_batch.apply(args=[[draft.id for draft in drafts]])
+
+    statuses = dict(ProductDraft.objects.values_list("id", "status"))
+    assert [statuses[draft.id] for draft in drafts] == ["pushed", "failed", "failed"]
+    job = JobRun.objects.get(task_name="push_drafts_to_shopify_batch")
+    assert job.detail["retrying"] == []
+    for draft, asset in ((drafts[1], missing), (drafts[2], deleted)):
+        assert "not readable" in job.detail["media_errors"][str(asset.id)]
+        assert "not readable" in job.detail["failed"][str(draft.id)]
+    assert ShopifyFile.objects.get().asset == stored
+
+
+@pytest.mark.django_db
+def test_shopify_webhook_requires_hmac_and_buffers_each_event_once(settings):
+    settings.SHOPIFY_WEBHOOK_SECRET = "webhook-secret"
+    client = APIClient()
+    payload = {"id": 7, "title": "Tee", "updated_at": "2026-01-01T10:00:00Z"}
+
+    assert _post_webhook(client, payload, event_id="e-1", secret="wrong").status_code == 401
+    assert _post_webhook(client, payload, event_id="e-1").status_code == 200
+    assert _post_webhook(client, payload, event_id="e-1").status_code == 200
+    settings.SHOPIFY_WEBHOOK_SECRET = ""
+    assert _post_webhook(client, payload, event_id="e-2").status_code == 401
+
+    event = ShopifyWebhookEvent.objects.get()
+    assert (event.event_id, event.topic, json.loads(event.body)) == ("e-1", "products/update", payload)
+
+
+@pytest.mark.django_db
+def test_webhook_consumer_ignores_malformed_payloads_and_keeps_going(settings):
+    settings.SHOPIFY_WEBHOOK_SECRET = "webhook-secret"
+    drafts = _make_drafts(4, status=ProductDraft.Status.PUSHED)
+    ShopifyProduct.objects.bulk_create(
+        [ShopifyProduct(draft=draft, shopify_product_id=f"gid://shopify/Product/{draft.id}") for draft in drafts]
+    )
+    client = APIClient()
+    at = "2026-01-01T10:00:00Z"
+
+    _post_webhook(client, {"id": drafts[0].id, "updated_at": at, "variants": [{"id": 1}]}, event_id="no-price")
+    _post_webhook(client, {"id": drafts[1].id, "updated_at": at, "tags": ["summer"]}, event_id="tag-list")
+    _post_webhook(client, {"id": drafts[2].id, "updated_at": 1767261600, "title": "Edited"}, event_id="epoch")
+    _post_webhook(
+        client, {"id": drafts[3].id, "updated_at": "2026-01-01T10:00:00", "title": "Edited"}, event_id="naive"
+    )
+    _post_webhook(client, {"id": drafts[3].id, "updated_at": at, "title": "Edited"}, event_id="fine")
+
+    counts = consume_shopify_webhooks()
+    assert (counts["events"], counts["updated"], counts["ignored"]) == (5, 1, 3)
+    assert ShopifyProduct.objects.get(draft=drafts[3]).payload["title"] == "Edited"
+    assert not ShopifyWebhookEvent.objects.filter(processed_at__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_webhook_consumer_coalesces_events_and_drops_stale_ones(eager_celery, settings):
+    settings.SHOPIFY_WEBHOOK_SECRET = "webhook-secret"
+    drafts = _make_drafts(2, status=ProductDraft.Status.QUEUED)
+    push_drafts_to_shopify_batch.apply(args=[[draft.id for draft in drafts]])
+    resync_shopify_products()
+    relay_outbox()
+    for index, draft in enumerate(drafts):
+        ShopifyProduct.objects.filter(draft=draft).update(shopify_product_id=f"gid://shopify/Product/{index}")
+    client = APIClient()
+
+    def update(product, title, at, event_id):
+        payload = {"id": product, "title": title, "product_type": "Test", "updated_at": at}
+        _post_webhook(client, {**payload, "variants": [{"price": "9.99"}]}, event_id=event_id)
+
+    update(0, "Edited in Shopify", "2026-01-01T10:02:00Z", "a-2")
+    update(0, "Draft 0", "2026-01-01T10:01:00Z", "a-1")
+    update(1, "Draft 1", "2026-01-01T10:01:00Z", "b-1")
+    _post_webhook(client, {"id": 1}, topic="products/delete", event_id="b-2")
+    update(99, "Not ours", "2026-01-01T10:01:00Z", "c-1")
+    _post_webhook(client, {"id": 5}, topic="orders/create", event_id="d-1")
+
+    counts = consume_shopify_webhooks()
+    assert counts == {"events": 6, "updated": 1, "deleted": 1, "drifted": 1, "stale": 0, "ignored": 2}
+    product = ShopifyProduct.objects.get(draft=drafts[0])
+    assert product.payload["title"] == "Edited in Shopify"
+    assert product.remote_updated_at.isoformat() == "2026-01-01T10:02:00+00:00"
+    assert not ShopifyProduct.objects.filter(draft=drafts[1]).exists()
+    assert ProductDraft.objects.get(id=drafts[1].id).status == ProductDraft.Status.DRAFT
+
+    # The draft's title wins again on the next re-sync; a late delivery of an older edit changes nothing.
+    assert resync_shopify_products() == {"changed": 1, "batches": 1}
+    update(0, "Older edit", "2026-01-01T10:00:00Z", "a-0")
+    assert consume_shopify_webhooks()["stale"] == 1
+    assert ShopifyProduct.objects.get(draft=drafts[0]).payload["title"] == "Edited in Shopify"
+    assert not ShopifyWebhookEvent.objects.filter(processed_at__isnull=True).exists()
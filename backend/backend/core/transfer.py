@@ -0,0 +1,221 @@
+import csv
+import io
+import json
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+
+from .drafts import _insert_drafts, chunked, draft_reference_errors
+from .models import ProductDraft
+from .serializers import DraftCreateItemSerializer
+
+CSV_COLUMNS = ("id", "status", "template_id", "title", "description", "tags", "seo", "price", "asset_ids")
+CSV_REQUIRED_COLUMNS = ("template_id", "title", "price", "asset_ids")
+CSV_LIST_SEPARATOR = "|"
+EXPORT_VALUE_FIELDS = ("id", "status", "template_id", "title", "description", "tags", "seo", "price")
+
+
+def decode_lines(stream: Iterable[bytes]) -> Iterator[str]:
+    """UTF-8 lines of a byte stream, read one at a time; a leading BOM is dropped."""
+    for number, raw in enumerate(stream, start=1):
+        try:
+            yield raw.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError as exc:
+            raise ParseError(f"Line {number} is not valid UTF-8.") from exc
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[tuple[int, dict]]:
+    """``(line number, row)`` pairs of a CSV file with a header row; blank lines are skipped.
+
+    A quoted cell may span lines; such a row is reported at its last line.
+    """
+    reader = csv.DictReader(lines)
+    try:
+        missing = [column for column in CSV_REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ParseError(f"CSV header is missing the columns {missing}.")
+        for row in reader:
+            yield reader.line_num, row
+    except csv.Error as exc:
+        raise ParseError(f"Line {reader.line_num}: {exc}.") from exc
+
+
+def read_ndjson(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """``(line number, line)`` pairs of newline-delimited JSON; blank lines are skipped."""
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            yield number, line
+
+
+def parse_csv_row(row: dict) -> dict:
+    if None in row:
+        raise serializers.ValidationError({"non_field_errors": ["More cells than header columns."]})
+    item = {key: value for key, value in row.items() if key in CSV_COLUMNS and value not in (None, "")}
+    for key in ("tags", "asset_ids"):
+        if key in item:
+            item[key] = [part.strip() for part in item[key].split(CSV_LIST_SEPARATOR) if part.strip()]
+    if "seo" in item:
+        try:
+            item["seo"] = json.loads(item["seo"])
+        except ValueError as exc:
+            raise serializers.ValidationError({"seo": [f"Invalid JSON: {exc}."]}) from exc
+    return item
+
+
+def parse_ndjson_row(line: str) -> dict:
+    try:
+        item = json.loads(line)
+    except ValueError as exc:
+        raise serializers.ValidationError({"non_field_errors": [f"Invalid JSON: {exc}."]}) from exc
+    if not isinstance(item, dict):
+        raise serializers.ValidationError({"non_field_errors": ["Expected a JSON object."]})
+    return item
+
+
+IMPORT_FORMATS = {
+    "csv": (read_csv, parse_csv_row),
+    "ndjson": (read_ndjson, parse_ndjson_row),
+}
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    rejected: int = 0
+    errors: list[dict] = field(default_factory=list)
+    # Why the file stopped being readable after some chunks were already created.
+    detail: str | None = None
+
+    def reject(self, line: int, errors) -> None:
+        self.rejected += 1
+        if len(self.errors) < settings.DRAFT_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self) -> dict:
+        report = {
+            "created": self.created,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "errors_truncated": self.rejected > len(self.errors),
+        }
+        if self.detail is not None:
+            report["detail"] = self.detail
+        return report
+
+
+def import_drafts(stream: Iterable[bytes], file_format: str, chunk_size: int | None = None) -> ImportReport:
+    """Create drafts from a CSV or NDJSON byte stream without holding more than a chunk in memory.
+
+    Rows are parsed one at a time and validated with ``DraftCreateItemSerializer``;
+    template and asset references are checked and the valid rows inserted once per
+    chunk, so the query count grows with the number of chunks only. Rejected rows are
+    reported by line number and do not stop the import. Each chunk commits on its
+    own, so a large file never holds the database's write lock for long. If the file
+    turns unreadable part-way, the chunks before that stay created and ``detail``
+    says where it stopped; a file that fails before anything is created raises ``ParseError``.
+    """
+    chunk_size = chunk_size or settings.DRAFT_BULK_CHUNK_SIZE
+    read, parse_row = IMPORT_FORMATS[file_format]
+    report = ImportReport()
+    # One serializer for every row, as ``ListSerializer`` does, instead of rebuilding its fields per row.
+    validator = DraftCreateItemSerializer()
+
+    try:
+        for chunk in chunked(read(decode_lines(stream)), chunk_size):
+            rejected = []
+            valid = []
+            for line, raw in chunk:
+                try:
+                    valid.append((line, validator.run_validation(parse_row(raw))))
+                except serializers.ValidationError as exc:
+                    rejected.append((line, exc.detail))
+
+            reference_errors = draft_reference_errors([item for _line, item in valid])
+            rejected.extend((valid[index][0], errors) for index, errors in reference_errors.items())
+            accepted = [item for index, (_line, item) in enumerate(valid) if index not in reference_errors]
+            if accepted:
+                with transaction.atomic():
+                    _insert_drafts(accepted)
+                report.created += len(accepted)
+            for line, errors in sorted(rejected, key=lambda entry: entry[0]):
+                report.reject(line, errors)
+    except ParseError as exc:
+        if not report.created:
+            raise
+        report.detail = str(exc.detail)
+    return report
+
+
+def _export_rows(queryset, chunk_size: int) -> Iterator[list[dict]]:
+    """Chunks of draft rows with their asset ids: a server-side cursor plus one query per chunk."""
+    rows = queryset.order_by("id").values(*EXPORT_VALUE_FIELDS).iterator(chunk_size=chunk_size)
+    through = ProductDraft.assets.through
+    for chunk in chunked(rows, chunk_size):
+        assets = {row["id"]: [] for row in chunk}
+        links = through.objects.filter(productdraft_id__in=assets).order_by("id")
+        for draft_id, asset_id in links.values_list("productdraft_id", "designasset_id"):
+            assets[draft_id].append(asset_id)
+        for row in chunk:
+            row["asset_ids"] = assets[row["id"]]
+        yield chunk
+
+
+def _csv_chunks(chunks: Iterator[list[dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for chunk in chunks:
+        for row in chunk:
+            writer.writerow(
+                [
+                    row["id"],
+                    row["status"],
+                    row["template_id"],
+                    row["title"],
+                    row["description"],
+                    CSV_LIST_SEPARATOR.join(row["tags"]),
+                    json.dumps(row["seo"]) if row["seo"] else "",
+                    row["price"],
+                    CSV_LIST_SEPARATOR.join(map(str, row["asset_ids"])),
+                ]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(chunks: Iterator[list[dict]]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(json.dumps({**row, "price": str(row["price"])}) + "\n" for row in chunk)
+
+
+EXPORT_FORMATS = {
+    "csv": (_csv_chunks, "text/csv; charset=utf-8"),
+    "ndjson": (_ndjson_chunks, "application/x-ndjson"),
+}
+
+
+async def export_drafts(queryset, file_format: str, chunk_size: int | None = None):
+    """Stream drafts as CSV or NDJSON, one chunk of rows per step.
+
+    An async iterator, because the ASGI handler would read a synchronous one to the
+    end before sending a byte. Each chunk is fetched in the request's sync thread, so
+    the database cursor stays on one connection for the whole download.
+    """
+    chunk_size = chunk_size or settings.DRAFT_BULK_CHUNK_SIZE
+    render, _content_type = EXPORT_FORMATS[file_format]
+    step = sync_to_async(next, thread_sensitive=True)
+    pieces = render(_export_rows(queryset, chunk_size))
+    finished = object()
+    try:
+        while (piece := await step(pieces, finished)) is not finished:
+            yield piece.encode()
+    finally:
+        await sync_to_async(pieces.close, thread_sensitive=True)()
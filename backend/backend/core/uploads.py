@@ -0,0 +1,164 @@
+import hashlib
+import os
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+
+from .models import AssetUpload, DesignAsset
+from .tasks import process_design_assets
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Computes a SHA-256 per uploaded file while the multipart body streams in.
+
+    It passes every chunk on unchanged, so Django's memory/temporary-file handlers
+    still decide where the bytes go. Digests are collected per field in upload order.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.digests: dict[str, list[str]] = {}
+        self._hasher = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self._hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.digests.setdefault(self.field_name, []).append(self._hasher.hexdigest())
+
+
+def hash_file(file) -> str:
+    hasher = hashlib.sha256()
+    for chunk in file.chunks(READ_BLOCK_SIZE):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def schedule_processing(assets: list[DesignAsset]) -> None:
+    """Queue previews and print metadata for new assets once the surrounding transaction commits."""
+    if assets:
+        transaction.on_commit(partial(process_design_assets.delay, [asset.id for asset in assets]))
+
+
+def store_assets(files: list, digests: list[str] | None = None) -> list[DesignAsset]:
+    """Create one asset per file, reusing existing assets with the same content hash.
+
+    Duplicates, both against stored assets and within ``files``, are never written
+    to storage. The result keeps the order of ``files``; new assets are queued for
+    processing as one batch.
+    """
+    if digests is None or len(digests) != len(files):
+        digests = [hash_file(uploaded_file) for uploaded_file in files]
+
+    known = {}
+    for asset in DesignAsset.objects.filter(sha256__in=set(digests)).order_by("id"):
+        known.setdefault(asset.sha256, asset)
+
+    created = []
+    for uploaded_file, digest in zip(files, digests):
+        if digest not in known:
+            known[digest] = DesignAsset(
+                file=uploaded_file,
+                original_filename=uploaded_file.name,
+                mime_type=getattr(uploaded_file, "content_type", None) or "application/octet-stream",
+                size_bytes=uploaded_file.size,
+                sha256=digest,
+            )
+            created.append(known[digest])
+    # FileField.pre_save still writes every file to storage during the bulk insert.
+    DesignAsset.objects.bulk_create(created)
+    schedule_processing(created)
+    return [known[digest] for digest in digests]
+
+
+class StagedFile(File):
+    """A finished staging file; exposes its path so FileSystemStorage moves it instead of copying."""
+
+    def temporary_file_path(self) -> str:
+        return self.file.name
+
+
+def staging_path(upload: AssetUpload) -> Path:
+    return Path(settings.ASSET_UPLOAD_STAGING_DIR) / str(upload.id)
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, expected: int):
+        super().__init__(f"Expected chunk at offset {expected}")
+        self.expected = expected
+
+
+def append_chunk(upload: AssetUpload, stream, start: int, length: int) -> int:
+    """Append ``length`` bytes from ``stream`` at ``start``, reading in fixed-size blocks.
+
+    The upload row stays locked while the chunk is written, so a second request for
+    the same offset waits and then gets ``UploadOffsetMismatch`` instead of writing
+    over the first one's bytes. SQLite ignores the lock; it is only used in development.
+    """
+    if start + length > upload.size_bytes:
+        raise ValueError("Chunk exceeds the declared upload size")
+
+    with transaction.atomic():
+        received = AssetUpload.objects.select_for_update().values_list("received_bytes", flat=True).get(id=upload.id)
+        if start != received:
+            upload.received_bytes = received
+            raise UploadOffsetMismatch(received)
+
+        path = staging_path(upload)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        written = 0
+        with open(path, "r+b" if path.exists() else "wb") as target:
+            target.seek(start)
+            target.truncate()
+            while written < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                target.write(block)
+                written += len(block)
+        AssetUpload.objects.filter(id=upload.id).update(received_bytes=start + written)
+    upload.received_bytes = start + written
+    return upload.received_bytes
+
+
+def complete_upload(upload: AssetUpload) -> tuple[DesignAsset, bool]:
+    """Turn a fully received upload into an asset. Returns ``(asset, created)``."""
+    path = staging_path(upload)
+    # Chunks arrive in separate requests, possibly on different workers, and hashlib
+    # state cannot be stored between them; one sequential read of the finished file it is.
+    with open(path, "rb") as staged:
+        digest = hash_file(File(staged))
+
+    existing = DesignAsset.objects.filter(sha256=digest).order_by("id").first()
+    with transaction.atomic():
+        if existing is not None:
+            asset, created = existing, False
+        else:
+            with open(path, "rb") as staged:
+                staged_file = StagedFile(staged, name=upload.original_filename)
+                asset = DesignAsset.objects.create(
+                    file=staged_file,
+                    original_filename=upload.original_filename,
+                    mime_type=upload.mime_type or "application/octet-stream",
+                    size_bytes=upload.size_bytes,
+                    sha256=digest,
+                )
+            created = True
+            schedule_processing([asset])
+        upload.asset = asset
+        upload.status = AssetUpload.Status.COMPLETE
+        upload.save(update_fields=["asset", "status", "updated_at"])
+    if path.exists():
+        os.remove(path)
+    return asset, created
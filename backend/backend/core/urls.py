@@ -1,33 +1,61 @@
 from django.urls import path
 
 from .views import (
+    AssetChunkedUploadCompleteView,
+    AssetChunkedUploadDetailView,
+    AssetChunkedUploadView,
     AssetUploadView,
+    DraftBatchPushView,
     DraftBulkCreateView,
     DraftDetailView,
+    DraftExportView,
+    DraftGenerateView,
+    DraftImportView,
     DraftListView,
     DraftPushView,
+    DraftResyncView,
+    EventStreamView,
     GelatoIntegrationView,
     IntegrationsView,
+    JobDetailView,
+    JobStatsView,
     ShopifyCallbackView,
     ShopifyIntegrationView,
     ShopifyStartView,
     ShopifyTestView,
+    ShopifyThrottleView,
     TemplateListView,
     health_view,
+    metrics_view,
+    shopify_webhook_view,
 )
 
 urlpatterns = [
     path("health", health_view),
     path("templates", TemplateListView.as_view()),
     path("assets/upload", AssetUploadView.as_view()),
+    path("assets/uploads", AssetChunkedUploadView.as_view()),
+    path("assets/uploads/<uuid:upload_id>", AssetChunkedUploadDetailView.as_view()),
+    path("assets/uploads/<uuid:upload_id>/complete", AssetChunkedUploadCompleteView.as_view()),
     path("drafts/bulk", DraftBulkCreateView.as_view()),
     path("drafts", DraftListView.as_view()),
+    path("drafts/push", DraftBatchPushView.as_view()),
+    path("drafts/resync", DraftResyncView.as_view()),
+    path("drafts/generate", DraftGenerateView.as_view()),
+    path("drafts/import", DraftImportView.as_view()),
+    path("drafts/export", DraftExportView.as_view()),
     path("drafts/<int:draft_id>", DraftDetailView.as_view()),
     path("drafts/<int:draft_id>/push", DraftPushView.as_view()),
+    path("events", EventStreamView.as_view()),
+    path("jobs/stats", JobStatsView.as_view()),
+    path("jobs/<int:job_id>", JobDetailView.as_view()),
+    path("metrics", metrics_view),
     path("integrations", IntegrationsView.as_view()),
     path("integrations/gelato", GelatoIntegrationView.as_view()),
     path("integrations/shopify/start", ShopifyStartView.as_view()),
     path("integrations/shopify/callback", ShopifyCallbackView.as_view()),
     path("integrations/shopify", ShopifyIntegrationView.as_view()),
     path("integrations/shopify/test", ShopifyTestView.as_view()),
+    path("integrations/shopify/throttle", ShopifyThrottleView.as_view()),
+    path("integrations/shopify/webhooks", shopify_webhook_view),
 ]
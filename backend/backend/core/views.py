@@ -1,31 +1,123 @@
+import json
+import re
 import urllib.parse
+from pathlib import PurePath
 
 from django.conf import settings
 from django.db import transaction
-from django.shortcuts import redirect
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework import status
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound, ParseError, UnsupportedMediaType
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .catalog import cached_template_list, catalog_version
+from .drafts import (
+    DraftProjection,
+    DraftReader,
+    bulk_create_drafts,
+    chunked,
+    validate_matrix_references,
+)
+from .events import draft_status_events, get_event_bus, publish_events
 from .integrations import (
     GelatoService,
     IntegrationError,
     IntegrationStore,
     ShopifyService,
+    amark_verified,
+    integration_state,
     integration_status_payload,
-    mark_verified,
 )
-from .models import DesignAsset, IntegrationConnection, ProductDraft, Template
+from .jobs import job_stats
+from .metrics import registry
+from .models import (
+    AssetUpload,
+    IntegrationConnection,
+    JobRun,
+    OutboxMessage,
+    ProductDraft,
+)
+from .outbox import enqueue, enqueue_many
+from .pagination import paginate_newest_first
+from .ratelimit import ShopifyCostLimiter
+from .renderers import FastJSONRenderer
 from .serializers import (
+    AssetUploadSerializer,
     BulkDraftCreateSerializer,
     DesignAssetSerializer,
+    DraftExportQuerySerializer,
+    DraftGenerateSerializer,
+    DraftListQuerySerializer,
+    DraftPushSerializer,
+    DraftResyncSerializer,
+    JobRunSerializer,
+    JobStatsQuerySerializer,
     ProductDraftSerializer,
     ShopifyStartSerializer,
-    TemplateSerializer,
 )
-from .services import GelatoAdapter
-from .tasks import push_draft_to_shopify
+from .tasks import (
+    generate_drafts,
+    push_draft_to_shopify,
+    push_drafts_to_shopify_batch,
+    push_drafts_to_shopify_bulk,
+    resync_shopify_products,
+)
+from .transfer import EXPORT_FORMATS, export_drafts, import_drafts
+from .uploads import (
+    HashingUploadHandler,
+    UploadOffsetMismatch,
+    append_chunk,
+    complete_upload,
+    store_assets,
+)
+from .webhooks import buffer_webhook
+
+CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+IMPORT_SUFFIXES = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+class AsyncIntegrationView(View):
+    """Async Django view for endpoints that wait on Gelato/Shopify.
+
+    DRF's ``APIView`` cannot await, so these views parse and render JSON themselves
+    and are CSRF-exempt like ``APIView`` with the default authentication classes.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+
+def _request_data(request) -> dict:
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+def _replace_query(request, **params) -> str:
+    query = request.GET.copy()
+    for key, value in params.items():
+        query[key] = value
+    return f"{request.path}?{query.urlencode()}"
 
 
 @api_view(["GET"])
@@ -33,34 +125,92 @@ def health_view(_request):
     return Response({"status": "ok"})
 
 
+def metrics_view(_request):
+    """Prometheus text exposition of request, task, query and outbound HTTP timings."""
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 class TemplateListView(APIView):
-    def get(self, _request):
-        if settings.USE_MOCK_APIS and not Template.objects.exists():
-            for item in GelatoAdapter().list_templates():
-                Template.objects.get_or_create(
-                    gelato_template_id=item["gelato_template_id"],
-                    defaults={"name": item["name"], "metadata": item["metadata"]},
-                )
-        templates = Template.objects.filter(is_active=True).order_by("id")
-        return Response(TemplateSerializer(templates, many=True).data)
+    """Active templates from the versioned catalog cache; ``If-None-Match`` gets a 304 until the catalog changes."""
+
+    def get(self, request):
+        etag = f'"templates-{catalog_version()}"'
+        client_etags = [tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))]
+        if etag in client_etags or "*" in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            version, data = cached_template_list()
+            etag = f'"templates-{version}"'
+            response = Response(data)
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
 
 
 class AssetUploadView(APIView):
     def post(self, request):
+        hashing = HashingUploadHandler(request._request)
+        request.upload_handlers.insert(0, hashing)
         files = request.FILES.getlist("files")
         if not files:
             return Response({"detail": "No files uploaded."}, status=status.HTTP_400_BAD_REQUEST)
 
-        created = []
-        for uploaded_file in files:
-            asset = DesignAsset.objects.create(
-                file=uploaded_file,
-                original_filename=uploaded_file.name,
-                mime_type=uploaded_file.content_type or "application/octet-stream",
-                size_bytes=uploaded_file.size,
+        assets = store_assets(files, hashing.digests.get("files"))
+        return Response(DesignAssetSerializer(assets, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class AssetChunkedUploadView(APIView):
+    def post(self, request):
+        serializer = AssetUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save()
+        return Response(AssetUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class AssetChunkedUploadDetailView(APIView):
+    def get(self, _request, upload_id):
+        upload = get_object_or_404(AssetUpload, id=upload_id)
+        return Response(AssetUploadSerializer(upload).data)
+
+    def put(self, request, upload_id):
+        upload = get_object_or_404(AssetUpload, id=upload_id, status=AssetUpload.Status.RECEIVING)
+        match = CONTENT_RANGE_RE.fullmatch(request.headers.get("Content-Range", ""))
+        if not match:
+            return Response(
+                {"detail": "Content-Range: bytes <start>-<end>/<total> is required."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            created.append(asset)
-        return Response(DesignAssetSerializer(created, many=True).data, status=status.HTTP_201_CREATED)
+        start, end, total = (int(value) for value in match.groups())
+        if total != upload.size_bytes or end < start:
+            return Response({"detail": "Content-Range does not match the upload."}, status=status.HTTP_400_BAD_REQUEST)
+        if end - start + 1 > settings.ASSET_UPLOAD_CHUNK_SIZE:
+            return Response({"detail": "Chunk is too large."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            append_chunk(upload, request.stream, start, end - start + 1)
+        except UploadOffsetMismatch as exc:
+            return Response(
+                {"detail": str(exc), "received_bytes": exc.expected},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(AssetUploadSerializer(upload).data)
+
+
+class AssetChunkedUploadCompleteView(APIView):
+    def post(self, _request, upload_id):
+        upload = get_object_or_404(AssetUpload, id=upload_id, status=AssetUpload.Status.RECEIVING)
+        if upload.received_bytes != upload.size_bytes:
+            return Response(
+                {"detail": "Upload is incomplete.", "received_bytes": upload.received_bytes},
+                status=status.HTTP_409_CONFLICT,
+            )
+        asset, created = complete_upload(upload)
+        return Response(
+            DesignAssetSerializer(asset).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
 
 
 class DraftBulkCreateView(APIView):
@@ -68,41 +218,243 @@ class DraftBulkCreateView(APIView):
         serializer = BulkDraftCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        created = []
+        created = bulk_create_drafts(serializer.validated_data["drafts"])
+        drafts = (
+            ProductDraft.objects.select_related("template")
+            .prefetch_related("assets")
+            .filter(id__in=[draft.id for draft in created])
+            .order_by("id")
+        )
+        return Response(ProductDraftSerializer(drafts, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class DraftImportView(APIView):
+    """Create drafts from a CSV or NDJSON file, sent as the request body or as the ``file`` form field.
+
+    The file is read line by line, so large imports need no more memory than a
+    chunk of rows. Rejected rows are listed by line number; the rest are created.
+    """
+
+    def post(self, request):
+        media_type = request.content_type.split(";")[0].strip()
+        if media_type == "multipart/form-data":
+            upload = request.FILES.get("file")
+            if upload is None:
+                raise ParseError("Upload the file as the 'file' field.")
+            file_format = IMPORT_CONTENT_TYPES.get(upload.content_type) or IMPORT_SUFFIXES.get(
+                PurePath(upload.name).suffix.lower()
+            )
+            stream = upload
+        else:
+            file_format = IMPORT_CONTENT_TYPES.get(media_type)
+            stream = request.stream or ()
+        if file_format is None:
+            raise UnsupportedMediaType(media_type, detail="Send text/csv or application/x-ndjson.")
+
+        report = import_drafts(stream, file_format)
+        if report.detail is not None:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif report.created:
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST if report.rejected else status.HTTP_200_OK
+        return Response(report.as_dict(), status=response_status)
+
+
+class DraftExportView(View):
+    """Download drafts as CSV or NDJSON; the body is streamed straight from a database cursor."""
+
+    async def get(self, request):
+        query = DraftExportQuerySerializer(data=request.GET)
+        if not query.is_valid():
+            return JsonResponse(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        drafts = ProductDraft.objects.all()
+        if "status" in params:
+            drafts = drafts.filter(status=params["status"])
+        if "template_id" in params:
+            drafts = drafts.filter(template_id=params["template_id"])
+        file_format = params["format"]
+        response = StreamingHttpResponse(
+            export_drafts(drafts, file_format), content_type=EXPORT_FORMATS[file_format][1]
+        )
+        response["Content-Disposition"] = f'attachment; filename="drafts.{file_format}"'
+        return response
+
+
+class DraftGenerateView(APIView):
+    """Queue one draft per template x asset pair; the drafts are created in the background."""
+
+    def post(self, request):
+        serializer = DraftGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rule = serializer.validated_data
+        validate_matrix_references(rule["template_ids"], rule["asset_ids"])
+
+        total = len(rule["template_ids"]) * len(rule["asset_ids"])
         with transaction.atomic():
-            for item in serializer.validated_data["drafts"]:
-                draft = ProductDraft.objects.create(
-                    template_id=item["template_id"],
-                    title=item["title"],
-                    description=item.get("description", ""),
-                    tags=item.get("tags", []),
-                    seo=item.get("seo", {}),
-                    price=item["price"],
-                )
-                draft.assets.set(item["asset_ids"])
-                created.append(draft)
-        return Response(ProductDraftSerializer(created, many=True).data, status=status.HTTP_201_CREATED)
+            job = JobRun.objects.create(
+                task_name="generate_drafts",
+                reference_id=f"{len(rule['template_ids'])}x{len(rule['asset_ids'])}",
+                detail={
+                    "rule": {**rule, "price": str(rule["price"])},
+                    "progress": {"total": total, "done": 0, "created": 0, "skipped": 0},
+                },
+            )
+            enqueue(generate_drafts, job_id=job.id)
+        return Response(JobRunSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
 
 class DraftListView(APIView):
-    def get(self, _request):
-        drafts = ProductDraft.objects.select_related("template").prefetch_related("assets").order_by("-created_at")
-        return Response(ProductDraftSerializer(drafts, many=True).data)
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request):
+        query = DraftListQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        projection = DraftProjection.from_query(request.query_params)
+
+        reader = DraftReader(projection)
+        drafts = reader.queryset()
+        if "status" in query.validated_data:
+            drafts = drafts.filter(status=query.validated_data["status"])
+        if "template_id" in query.validated_data:
+            drafts = drafts.filter(template_id=query.validated_data["template_id"])
+        limit = min(query.validated_data.get("limit", settings.DRAFT_PAGE_SIZE), settings.DRAFT_MAX_PAGE_SIZE)
+        page = paginate_newest_first(drafts, query.validated_data.get("cursor"), limit)
+
+        response = Response(reader.render(page.items))
+        if page.next_cursor:
+            response["X-Next-Cursor"] = page.next_cursor
+            next_url = request.build_absolute_uri(_replace_query(request, cursor=page.next_cursor))
+            response["Link"] = f'<{next_url}>; rel="next"'
+        return response
 
 
 class DraftDetailView(APIView):
-    def get(self, _request, draft_id: int):
-        draft = ProductDraft.objects.select_related("template").prefetch_related("assets").get(id=draft_id)
-        return Response(ProductDraftSerializer(draft).data)
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, draft_id: int):
+        reader = DraftReader(DraftProjection.from_query(request.query_params))
+        rows = list(reader.queryset().filter(id=draft_id))
+        if not rows:
+            raise NotFound()
+        return Response(reader.render(rows)[0])
 
 
 class DraftPushView(APIView):
     def post(self, _request, draft_id: int):
-        draft = ProductDraft.objects.get(id=draft_id)
-        draft.status = ProductDraft.Status.QUEUED
-        draft.save(update_fields=["status", "updated_at"])
-        task = push_draft_to_shopify.delay(draft.id)
-        return Response({"task_id": task.id, "draft_id": draft.id}, status=status.HTTP_202_ACCEPTED)
+        with transaction.atomic():
+            queued = (
+                ProductDraft.objects.filter(id=draft_id)
+                .exclude(status__in=[ProductDraft.Status.QUEUED, ProductDraft.Status.PUSHING])
+                .update(status=ProductDraft.Status.QUEUED, updated_at=timezone.now())
+            )
+            if queued:
+                message = enqueue(push_draft_to_shopify, draft_id=draft_id)
+                publish_events(draft_status_events([draft_id], ProductDraft.Status.QUEUED))
+            else:
+                get_object_or_404(ProductDraft, id=draft_id)
+                message = (
+                    OutboxMessage.objects.filter(task_name=push_draft_to_shopify.name, kwargs__draft_id=draft_id)
+                    .order_by("-id")
+                    .first()
+                )
+        return Response(
+            {
+                "task_id": str(message.idempotency_key) if message else None,
+                "draft_id": draft_id,
+                "already_queued": not queued,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class DraftBatchPushView(APIView):
+    def post(self, request):
+        serializer = DraftPushSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        filters = {}
+        if "draft_ids" in serializer.validated_data:
+            filters["id__in"] = serializer.validated_data["draft_ids"]
+        if "status" in serializer.validated_data:
+            filters["status"] = serializer.validated_data["status"]
+        if "template_id" in serializer.validated_data:
+            filters["template_id"] = serializer.validated_data["template_id"]
+
+        with transaction.atomic():
+            drafts = (
+                ProductDraft.objects.select_for_update(skip_locked=True)
+                .filter(**filters)
+                .exclude(status__in=[ProductDraft.Status.QUEUED, ProductDraft.Status.PUSHING])
+            )
+            draft_ids = list(drafts.order_by("id").values_list("id", flat=True))
+            ProductDraft.objects.filter(id__in=draft_ids).update(
+                status=ProductDraft.Status.QUEUED, updated_at=timezone.now()
+            )
+            threshold = settings.SHOPIFY_BULK_OPERATION_THRESHOLD
+            mode = "bulk_operation" if threshold and len(draft_ids) >= threshold else "batch"
+            if mode == "bulk_operation":
+                messages = [enqueue(push_drafts_to_shopify_bulk, draft_ids=draft_ids)]
+            else:
+                messages = enqueue_many(
+                    push_drafts_to_shopify_batch,
+                    [{"draft_ids": chunk} for chunk in chunked(draft_ids, settings.SHOPIFY_PUSH_BATCH_SIZE)],
+                )
+            publish_events(draft_status_events(draft_ids, ProductDraft.Status.QUEUED))
+        task_ids = [str(message.idempotency_key) for message in messages]
+        return Response(
+            {"task_ids": task_ids, "draft_count": len(draft_ids), "mode": mode}, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class DraftResyncView(APIView):
+    """Queue a re-sync of published drafts; only those whose content changed since their push are sent."""
+
+    def post(self, request):
+        serializer = DraftResyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        message = enqueue(resync_shopify_products, **serializer.validated_data)
+        return Response({"task_id": str(message.idempotency_key)}, status=status.HTTP_202_ACCEPTED)
+
+
+class JobDetailView(APIView):
+    def get(self, _request, job_id: int):
+        return Response(JobRunSerializer(get_object_or_404(JobRun, id=job_id)).data)
+
+
+class JobStatsView(APIView):
+    def get(self, request):
+        serializer = JobStatsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(job_stats(serializer.validated_data["days"], serializer.validated_data.get("task_name")))
+
+
+async def _event_stream():
+    yield "retry: 3000\n\n"
+    async with get_event_bus().subscribe() as receive:
+        while True:
+            events = await receive(settings.EVENTS_KEEPALIVE_SECONDS)
+            if events is None:
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+class EventStreamView(View):
+    """Server-sent events for draft status transitions and job updates.
+
+    A single connection carries the whole catalog, so clients can stop polling
+    ``GET /api/drafts``. Needs the ASGI server; idle streams get a keep-alive comment.
+    """
+
+    async def get(self, _request):
+        response = StreamingHttpResponse(_event_stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
 
 
 class IntegrationsView(APIView):
@@ -122,27 +474,27 @@ class IntegrationsView(APIView):
         )
 
 
-class GelatoIntegrationView(APIView):
-    def post(self, request):
-        api_key = str(request.data.get("apiKey", "")).strip()
+class GelatoIntegrationView(AsyncIntegrationView):
+    async def post(self, request):
+        api_key = str(_request_data(request).get("apiKey", "")).strip()
         if not api_key:
-            return Response({"detail": "API key is required"}, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({"detail": "API key is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.GELATO)
+        connection = await IntegrationStore.aget_or_create(IntegrationConnection.Provider.GELATO)
         try:
-            GelatoService.test_key(api_key)
-            IntegrationStore.set_secret(connection, {"apiKey": api_key})
-            mark_verified(connection)
-            return Response({"ok": True})
+            await GelatoService.atest_key(api_key)
+            await IntegrationStore.aset_secret(connection, {"apiKey": api_key})
+            await amark_verified(connection)
+            return JsonResponse({"ok": True})
         except IntegrationError as exc:
             connection.last_error = str(exc)
-            connection.save(update_fields=["last_error", "updated_at"])
-            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            await connection.asave(update_fields=["last_error", "updated_at"])
+            return JsonResponse({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-    def delete(self, _request):
-        connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.GELATO)
-        IntegrationStore.clear(connection)
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    async def delete(self, _request):
+        connection = await IntegrationStore.aget_or_create(IntegrationConnection.Provider.GELATO)
+        await IntegrationStore.aclear(connection)
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
 
 
 class ShopifyStartView(APIView):
@@ -159,12 +511,9 @@ class ShopifyStartView(APIView):
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ShopifyCallbackView(APIView):
-    authentication_classes = []
-    permission_classes = []
-
-    def get(self, request):
-        params = {key: value for key, value in request.query_params.items()}
+class ShopifyCallbackView(AsyncIntegrationView):
+    async def get(self, request):
+        params = {key: value for key, value in request.GET.items()}
         shop = params.get("shop", "")
         state = params.get("state", "")
         code = params.get("code", "")
@@ -173,25 +522,40 @@ class ShopifyCallbackView(APIView):
             return redirect(f"{settings.APP_URL}/integrations?shopify=error&reason=missing_params")
 
         try:
-            ShopifyService.verify_state(state, shop)
+            await ShopifyService.averify_state(state, shop)
             if not ShopifyService.verify_hmac(params, settings.SHOPIFY_CLIENT_SECRET):
                 raise IntegrationError("HMAC check failed")
-            access_token = ShopifyService.exchange_token(shop, code)
+            access_token = await ShopifyService.aexchange_token(shop, code)
         except IntegrationError as exc:
-            connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.SHOPIFY)
+            connection = await IntegrationStore.aget_or_create(IntegrationConnection.Provider.SHOPIFY)
             connection.last_error = str(exc)
-            connection.save(update_fields=["last_error", "updated_at"])
+            await connection.asave(update_fields=["last_error", "updated_at"])
             reason = urllib.parse.quote(str(exc))
             return redirect(f"{settings.APP_URL}/integrations?shopify=error&reason={reason}")
 
-        connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.SHOPIFY)
-        IntegrationStore.set_secret(connection, {"shop": shop, "accessToken": access_token})
+        connection = await IntegrationStore.aget_or_create(IntegrationConnection.Provider.SHOPIFY)
+        await IntegrationStore.aset_secret(connection, {"shop": shop, "accessToken": access_token})
         connection.metadata = {"shopDomain": shop}
         connection.last_error = ""
-        connection.save(update_fields=["metadata", "last_error", "updated_at"])
+        await connection.asave(update_fields=["metadata", "last_error", "updated_at"])
         return redirect(f"{settings.APP_URL}/integrations?shopify=connected")
 
 
+@csrf_exempt
+@require_POST
+def shopify_webhook_view(request):
+    """Receive a Shopify webhook: verify the HMAC of the raw body, buffer it, answer at once.
+
+    Applying it to products is left to ``consume_shopify_webhooks``, so the answer
+    costs one insert and stays well inside Shopify's five-second delivery timeout.
+    """
+    provided = request.headers.get("X-Shopify-Hmac-Sha256", "")
+    if not ShopifyService.verify_webhook_hmac(request.body, provided, settings.SHOPIFY_WEBHOOK_SECRET):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    buffer_webhook(request.headers, request.body)
+    return HttpResponse(status=status.HTTP_200_OK)
+
+
 class ShopifyIntegrationView(APIView):
     def delete(self, _request):
         connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.SHOPIFY)
@@ -199,17 +563,25 @@ class ShopifyIntegrationView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ShopifyTestView(APIView):
-    def post(self, _request):
-        connection = IntegrationStore.get_or_create(IntegrationConnection.Provider.SHOPIFY)
-        secret = IntegrationStore.get_secret(connection)
+class ShopifyThrottleView(APIView):
+    def get(self, _request):
+        secret = integration_state.secret(IntegrationConnection.Provider.SHOPIFY)
         if not secret:
             return Response({"detail": "Shopify is not connected"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ShopifyCostLimiter(secret["shop"]).snapshot())
+
+
+class ShopifyTestView(AsyncIntegrationView):
+    async def post(self, _request):
+        secret = await integration_state.asecret(IntegrationConnection.Provider.SHOPIFY)
+        if not secret:
+            return JsonResponse({"detail": "Shopify is not connected"}, status=status.HTTP_400_BAD_REQUEST)
+        connection = await IntegrationStore.aget_or_create(IntegrationConnection.Provider.SHOPIFY)
         try:
-            ShopifyService.test_connection(secret["shop"], secret["accessToken"])
-            mark_verified(connection)
-            return Response({"ok": True})
+            await ShopifyService.atest_connection(secret["shop"], secret["accessToken"])
+            await amark_verified(connection)
+            return JsonResponse({"ok": True})
         except IntegrationError as exc:
             connection.last_error = str(exc)
-            connection.save(update_fields=["last_error", "updated_at"])
-            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            await connection.asave(update_fields=["last_error", "updated_at"])
+            return JsonResponse({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,130 @@
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .events import draft_status_events, publish_events
+from .models import ProductDraft, ShopifyProduct, ShopifyWebhookEvent
+from .sync import drifted_fields, fingerprint
+
+PRODUCT_TOPICS = frozenset({"products/update", "products/delete"})
+
+
+def buffer_webhook(headers, body: bytes) -> None:
+    """Store a verified webhook for the consumer with a single insert; a redelivered event is ignored.
+
+    Shopify sends the same ``X-Shopify-Event-Id`` with every delivery of one event;
+    older deliveries without it fall back to the webhook id, then to the body hash.
+    """
+    event_id = (
+        headers.get("X-Shopify-Event-Id") or headers.get("X-Shopify-Webhook-Id") or hashlib.sha256(body).hexdigest()
+    )
+    ShopifyWebhookEvent.objects.bulk_create(
+        [
+            ShopifyWebhookEvent(
+                event_id=event_id,
+                topic=headers.get("X-Shopify-Topic", ""),
+                shop_domain=headers.get("X-Shopify-Shop-Domain", ""),
+                triggered_at=parse_datetime(headers.get("X-Shopify-Triggered-At", "")),
+                body=body.decode("utf-8", errors="replace"),
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _product_change(event: ShopifyWebhookEvent) -> tuple[str, datetime, dict] | None:
+    """``(product gid, when it happened, payload)`` of a product webhook, or None for anything else or malformed."""
+    if event.topic not in PRODUCT_TOPICS:
+        return None
+    try:
+        payload = json.loads(event.body)
+        product_id = payload.get("admin_graphql_api_id") or f"gid://shopify/Product/{payload['id']}"
+        happened = parse_datetime(payload.get("updated_at") or "") or event.triggered_at or event.created_at
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+    if timezone.is_naive(happened):
+        happened = timezone.make_aware(happened)
+    return product_id, happened, payload
+
+
+def consume_webhook_batch(batch_size: int | None = None) -> dict:
+    """Apply up to ``batch_size`` buffered webhooks, oldest first, and mark them processed.
+
+    Events are coalesced per product: only the newest one counts, and a delete beats
+    an update from the same instant. An event older than the last one applied to the
+    product is dropped, so late or reordered deliveries cannot roll it back. Deleted
+    products send their drafts back to ``draft``; an update copies title, handle and
+    status into the payload and forgets the hashes of fields edited in Shopify, so
+    the next re-sync restores the draft's values. A malformed event is counted as
+    ignored and marked processed like the rest. Rows are locked with ``SKIP
+    LOCKED``, so several consumers can share the buffer.
+    """
+    batch_size = batch_size or settings.SHOPIFY_WEBHOOK_BATCH_SIZE
+    counts = {"events": 0, "updated": 0, "deleted": 0, "drifted": 0, "stale": 0, "ignored": 0}
+    with transaction.atomic():
+        events = list(
+            ShopifyWebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by("id")[:batch_size]
+        )
+        counts["events"] = len(events)
+        latest: dict[str, tuple[datetime, bool, dict]] = {}
+        for event in events:
+            change = _product_change(event)
+            if change is None:
+                counts["ignored"] += 1
+                continue
+            product_id, happened, payload = change
+            candidate = (happened, event.topic == "products/delete", payload)
+            if product_id not in latest or candidate[:2] > latest[product_id][:2]:
+                latest[product_id] = candidate
+
+        now = timezone.now()
+        products = ShopifyProduct.objects.select_related("draft__template").filter(shopify_product_id__in=latest)
+        deleted: list[ShopifyProduct] = []
+        updated: list[ShopifyProduct] = []
+        for product in products:
+            happened, is_delete, payload = latest[product.shopify_product_id]
+            if product.remote_updated_at and happened <= product.remote_updated_at:
+                counts["stale"] += 1
+            elif is_delete:
+                deleted.append(product)
+            else:
+                try:
+                    drifted = drifted_fields(product.draft, payload)
+                except (ArithmeticError, AttributeError, KeyError, TypeError, ValueError):
+                    # A payload Shopify does not send, e.g. a variant without a price; counted as ignored below.
+                    continue
+                if drifted:
+                    counts["drifted"] += 1
+                    product.field_hashes = {
+                        name: value for name, value in product.field_hashes.items() if name not in drifted
+                    }
+                    product.fingerprint = fingerprint(product.field_hashes)
+                remote = {key: payload[key] for key in ("title", "handle", "status") if key in payload}
+                product.payload = {**product.payload, **remote}
+                product.remote_updated_at = happened
+                product.updated_at = now
+                updated.append(product)
+
+        ShopifyProduct.objects.bulk_update(
+            updated, ["payload", "field_hashes", "fingerprint", "remote_updated_at", "updated_at"]
+        )
+        if deleted:
+            ShopifyProduct.objects.filter(id__in=[product.id for product in deleted]).delete()
+            drafts = ProductDraft.objects.filter(
+                id__in=[product.draft_id for product in deleted], status=ProductDraft.Status.PUSHED
+            )
+            reset = list(drafts.values_list("id", flat=True))
+            drafts.update(status=ProductDraft.Status.DRAFT, updated_at=now)
+            publish_events(draft_status_events(reset, ProductDraft.Status.DRAFT))
+        ShopifyWebhookEvent.objects.filter(id__in=[event.id for event in events]).update(processed_at=now)
+        counts["updated"] = len(updated)
+        counts["deleted"] = len(deleted)
+    counts["ignored"] += len(latest) - len(updated) - len(deleted) - counts["stale"]
+    return counts
@@ -1,8 +1,8 @@
-import type { DesignAsset, IntegrationListResponse, ProductDraft, Template } from '../types/api';
+import type { DesignAsset, DraftFilters, DraftImportReport, IntegrationListResponse, JobRun, Page, ProductDraft, Template } from '../types/api';
 
-const API_BASE = import.meta.env.VITE_API_BASE_URL ?? 'http://localhost:8000/api';
+export const API_BASE = import.meta.env.VITE_API_BASE_URL ?? 'http://localhost:8000/api';
 
-async function request<T>(path: string, init?: RequestInit): Promise<T> {
+async function send(path: string, init?: RequestInit): Promise<Response> {
   const response = await fetch(`${API_BASE}${path}`, {
     ...init,
     credentials: 'include',
@@ -18,7 +18,11 @@ async function request<T>(path: string, init?: RequestInit): Promise<T> {
     }
     throw new Error(detail);
   }
+  return response;
+}
 
+async function request<T>(path: string, init?: RequestInit): Promise<T> {
+  const response = await send(path, init);
   if (response.status === 204) {
     return undefined as T;
   }
@@ -26,10 +30,37 @@ async function request<T>(path: string, init?: RequestInit): Promise<T> {
   return response.json() as Promise<T>;
 }
 
+function withQuery(path: string, params: Record<string, string | number | undefined>): string {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined) query.set(key, String(value));
+  });
+  const encoded = query.toString();
+  return encoded ? `${path}${path.includes('?') ? '&' : '?'}${encoded}` : path;
+}
+
+// List endpoints return one keyset page; the cursor of the next one comes in `X-Next-Cursor`.
+async function requestPage<T>(path: string): Promise<Page<T>> {
+  const response = await send(path);
+  return { items: (await response.json()) as T[], nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
+async function requestAllPages<T>(path: string): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const page: Page<T> = await requestPage<T>(withQuery(path, { cursor: cursor ?? undefined }));
+    items.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return items;
+}
+
 export const api = {
   health: () => request<{ status: string }>('/health'),
   templates: () => request<Template[]>('/templates'),
-  drafts: () => request<ProductDraft[]>('/drafts'),
+  drafts: (filters: DraftFilters = {}) => requestAllPages<ProductDraft>(withQuery('/drafts', filters)),
+  draftsPage: (filters: DraftFilters = {}, cursor?: string) => requestPage<ProductDraft>(withQuery('/drafts', { ...filters, cursor })),
   draft: (id: number) => request<ProductDraft>(`/drafts/${id}`),
   uploadAssets: async (files: File[]) => {
     const formData = new FormData();
@@ -46,7 +77,27 @@ export const api = {
       asset_ids: number[];
     }>;
   }) => request<ProductDraft[]>('/drafts/bulk', { method: 'POST', body: JSON.stringify(payload), headers: { 'Content-Type': 'application/json' } }),
-  pushDraft: (id: number) => request<{ task_id: string; draft_id: number }>(`/drafts/${id}/push`, { method: 'POST' }),
+  generateDrafts: (payload: {
+    template_ids: number[];
+    asset_ids: number[];
+    title: string;
+    description?: string;
+    price: string;
+    tags?: string[];
+  }) => request<JobRun>('/drafts/generate', { method: 'POST', body: JSON.stringify(payload), headers: { 'Content-Type': 'application/json' } }),
+  importDrafts: async (file: File) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    return request<DraftImportReport>('/drafts/import', { method: 'POST', body: formData });
+  },
+  draftExportUrl: (format: 'csv' | 'ndjson' = 'csv') => `${API_BASE}/drafts/export?format=${format}`,
+  resyncDrafts: (filters: { draft_ids?: number[]; template_id?: number } = {}) => request<{ task_id: string }>('/drafts/resync', {
+    method: 'POST',
+    body: JSON.stringify(filters),
+    headers: { 'Content-Type': 'application/json' },
+  }),
+  job: (id: number) => request<JobRun>(`/jobs/${id}`),
+  pushDraft: (id: number) => request<{ task_id: string | null; draft_id: number; already_queued: boolean }>(`/drafts/${id}/push`, { method: 'POST' }),
   integrations: () => request<IntegrationListResponse>('/integrations'),
   connectGelato: (apiKey: string) => request<{ ok: boolean }>('/integrations/gelato', {
     method: 'POST',
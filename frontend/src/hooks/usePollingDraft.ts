@@ -1,12 +1,46 @@
-import { useQuery } from '@tanstack/react-query';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
+import { useEffect, useState } from 'react';
 
-import { api } from '../api/client';
+import { API_BASE, api } from '../api/client';
+import type { DraftStatusEvent, ProductDraft } from '../types/api';
 
 export function usePollingDraft(draftId: number | null) {
+  const queryClient = useQueryClient();
+  const [streaming, setStreaming] = useState(false);
+
+  useEffect(() => {
+    if (!draftId || typeof EventSource === 'undefined') {
+      return undefined;
+    }
+    const source = new EventSource(`${API_BASE}/events`, { withCredentials: true });
+    source.onopen = () => setStreaming(true);
+    source.onerror = () => setStreaming(false);
+    source.addEventListener('draft.status', (message) => {
+      const event = JSON.parse((message as MessageEvent<string>).data) as DraftStatusEvent;
+      if (event.draft_id !== draftId) {
+        return;
+      }
+      queryClient.setQueryData<ProductDraft>(['draft', draftId], (draft) =>
+        draft ? { ...draft, status: event.status } : draft,
+      );
+      if (event.status === 'pushed' || event.status === 'failed') {
+        void queryClient.invalidateQueries({ queryKey: ['draft', draftId] });
+      }
+    });
+    return () => {
+      source.close();
+      setStreaming(false);
+    };
+  }, [draftId, queryClient]);
+
   return useQuery({
     queryKey: ['draft', draftId],
     queryFn: () => api.draft(draftId as number),
     enabled: Boolean(draftId),
-    refetchInterval: (query) => (query.state.data?.status === 'queued' ? 1500 : false),
+    refetchInterval: (query) => {
+      const status = query.state.data?.status;
+      // The event stream keeps the cache current; polling is only the fallback while it is down.
+      return !streaming && (status === 'queued' || status === 'pushing') ? 1500 : false;
+    },
   });
 }
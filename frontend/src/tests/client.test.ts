@@ -0,0 +1,30 @@
+import { afterEach, describe, expect, it, vi } from 'vitest';
+import { api } from '../api/client';
+
+function page(items: Array<{ id: number }>, nextCursor?: string) {
+  return new Response(JSON.stringify(items), {
+    status: 200,
+    headers: nextCursor ? { 'Content-Type': 'application/json', 'X-Next-Cursor': nextCursor } : { 'Content-Type': 'application/json' },
+  });
+}
+
+describe('api.drafts', () => {
+  afterEach(() => {
+    vi.unstubAllGlobals();
+  });
+
+  it('follows the cursor until the last page', async () => {
+    const fetchMock = vi.fn()
+      .mockResolvedValueOnce(page([{ id: 3 }, { id: 2 }], 'c2'))
+      .mockResolvedValueOnce(page([{ id: 1 }]));
+    vi.stubGlobal('fetch', fetchMock);
+
+    const drafts = await api.drafts({ status: 'draft' });
+
+    expect(drafts.map((draft) => draft.id)).toEqual([3, 2, 1]);
+    expect(fetchMock.mock.calls.map(([url]) => String(url).split('/api')[1])).toEqual([
+      '/drafts?status=draft',
+      '/drafts?status=draft&cursor=c2',
+    ]);
+  });
+});
@@ -12,6 +12,13 @@ export type DesignAsset = {
   original_filename: string;
   mime_type: string;
   size_bytes: number;
+  sha256: string;
+  width_px: number | null;
+  height_px: number | null;
+  dpi: number | null;
+  color_mode: string;
+  previews: Record<string, string>;
+  processing_status: 'pending' | 'ready' | 'skipped' | 'failed';
   created_at: string;
 };
 
@@ -21,7 +28,7 @@ export type ProductDraft = {
   description: string;
   tags: string[];
   seo: Record<string, unknown>;
-  status: 'draft' | 'queued' | 'pushed' | 'failed';
+  status: 'draft' | 'queued' | 'pushing' | 'pushed' | 'failed';
   price: string;
   template: Template;
   assets: DesignAsset[];
@@ -29,6 +36,17 @@ export type ProductDraft = {
   updated_at: string;
 };
 
+export type DraftFilters = {
+  status?: ProductDraft['status'];
+  template_id?: number;
+  limit?: number;
+};
+
+export type Page<T> = {
+  items: T[];
+  nextCursor: string | null;
+};
+
 export type IntegrationStatus = 'connected' | 'disconnected' | 'error';
 
 export type IntegrationItem = {
@@ -41,3 +59,29 @@ export type IntegrationItem = {
 export type IntegrationListResponse = {
   items: IntegrationItem[];
 };
+
+export type DraftStatusEvent = {
+  type: 'draft.status';
+  draft_id: number;
+  status: ProductDraft['status'];
+  shopify_product_id?: string;
+};
+
+export type JobRun = {
+  id: number;
+  task_name: string;
+  reference_id: string;
+  status: 'queued' | 'running' | 'success' | 'failed';
+  detail: Record<string, unknown> & {
+    progress?: { total: number; done: number; created: number; skipped: number };
+  };
+  created_at: string;
+  updated_at: string;
+};
+
+export type DraftImportReport = {
+  created: number;
+  rejected: number;
+  errors: Array<{ line: number; errors: Record<string, string[]> }>;
+  errors_truncated: boolean;
+};